@@ -1,34 +1,82 @@
 import fnmatch
+import mmap
 import os
+import re
 import subprocess
+import tempfile
 from enum import Enum
 from typing import List, Literal, Optional, Union
 
 from jinja2 import Template
-from pydantic import BaseModel, Extra, HttpUrl, conint, model_validator
+from pydantic import BaseModel, Extra, HttpUrl, confloat, conint, field_validator, model_validator
 
+from .cache import cache_key, get_similarity_cache
 from .defaults import default
+from .providers import GenerationRequest, available_providers, get_provider
+from .scheduler import Deadline, DeadlineExceeded, scheduler
+from .structured import CHANGE_TYPES, assemble_message, commit_schema, parse_fields
+from .thinking import split_thinking
 
 
 # Custom exceptions to be raised when using openai_compatible provider.
 class MissingModelError(ValueError):
-    def __init__(self):
-        self.message = "The model cannot be None for the 'openai_compatible' provider."
+    def __init__(self, provider: str = "openai_compatible"):
+        self.message = f"The model cannot be None for the '{provider}' provider."
         super().__init__(self.message)
 
 
 class MissingHostError(ValueError):
-    def __init__(self):
-        self.message = "The 'host' field is required and must be a valid URL when using the 'openai_compatible' provider."
+    def __init__(self, provider: str = "openai_compatible"):
+        self.message = f"The 'host' field is required and must be a valid URL when using the '{provider}' provider."
         super().__init__(self.message)
 
 
-def get_diff() -> str:
+def decode_diff_block(block) -> str:
+    """Decode one file of a diff, legacy non UTF-8 files fall back to latin-1"""
+    try:
+        return str(block, "utf-8")
+    except UnicodeDecodeError:
+        return str(block, "latin-1")
+
+
+def read_diff(args: List[str], ignored_patterns: Optional[List[str]] = None) -> str:
+    """Run a git diff command and return its output, without the ignored files.
+
+    The raw output is streamed to a temporary file and memory-mapped; file
+    boundaries are located on the bytes and only the kept files are decoded,
+    so large ignored blobs and mixed encodings cost neither decoding nor copies.
+    """
+    with tempfile.TemporaryFile() as raw:
+        subprocess.run(args, stdout=raw, stderr=subprocess.DEVNULL)
+        if not raw.tell():
+            return ""
+        with mmap.mmap(raw.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+            size = len(mapped)
+            start = 0 if mapped[:10] == b"diff --git" else mapped.find(b"\ndiff --git") + 1 or size
+            view = memoryview(mapped)
+            blocks = []
+            try:
+                while start < size:
+                    end = mapped.find(b"\ndiff --git", start) + 1 or size
+                    header_end = mapped.find(b"\n", start, end)
+                    parts = mapped[start : end if header_end == -1 else header_end].split()
+                    # Example: diff --git a/file.txt b/file.txt, the path comes after b/
+                    current_file = parts[3][2:].decode("utf-8", "replace") if len(parts) > 3 else None
+                    if current_file is not None and not (
+                        ignored_patterns and matches_pattern(current_file, ignored_patterns)
+                    ):
+                        blocks.append(decode_diff_block(view[start:end]))
+                    start = end
+            finally:
+                view.release()
+    return "".join(blocks)
+
+
+def get_diff(ignored_patterns: Optional[List[str]] = None) -> str:
     """Retrieve the staged changes in the git repository."""
-    diff = subprocess.run(
-        ["git", "diff", "--staged", "-M"], capture_output=True, text=True
-    )
-    return diff.stdout
+    from .git_backend import get_git
+
+    return get_git().staged_diff(ignored_patterns)
 
 
 def matches_pattern(file_path: str, ignored_patterns: List[str]) -> bool:
@@ -63,13 +111,100 @@ def filter_diff(diff_output: str, ignored_patterns: List):
     return "\n".join(filtered_diff)
 
 
-def get_context_size(diff: str, system: str) -> int:
-    """Based on the git diff and system prompt estimate ollama context window needed"""
+def get_context_size(diff: str, system: str, max_ctx: Optional[int] = None) -> int:
+    """Based on the git diff and system prompt estimate ollama context window needed.
+
+    `max_ctx` is the model's real context length when known, 128000 otherwise.
+    """
     input_len = len(system) + len(diff)
-    num_ctx = int(min(max(input_len * 2.64, 1024), 128000))
+    num_ctx = int(min(max(input_len * 2.64, 1024), max_ctx or 128000))
     return num_ctx
 
 
+# Diffs estimated above this many tokens are checked against the model's context length
+WINDOW_CHECK_TOKENS = 2048
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough token count of a text, around 4 characters per token"""
+    return len(text) // 4 + 1
+
+
+# Answer budget when none is configured: a title and a body growing slowly with the diff
+MIN_OUTPUT_TOKENS = 160
+MAX_OUTPUT_TOKENS = 640
+TITLE_OUTPUT_TOKENS = 48
+STRUCTURED_OUTPUT_TOKENS = 32  # Keys and quotes of a structured answer
+# Models that reason before answering, a small budget would be spent before the message
+REASONING_MODELS = ("qwen3", "deepseek-r1", "qwq", "gpt-oss", "gpt-5", "gemini-2.5", "magistral", "reasoning", "thinking")
+# What models tend to add after the message, sent as stop sequences (OpenAI and Groq take 4 at most)
+STOP_SEQUENCES = ["\n\nExplanation", "\n\n**Explanation", "\n\nThis commit message", "\n\n---"]
+# Sign-offs models end their answer with, only ever matched on its last paragraph
+TRAILING_CHATTER = re.compile(
+    r"(?:---+|(?:\*\*|#+\s*)?explanation\b.*|(?:note:\s*)?this commit message\b.*"
+    r"|i hope\b.*|let me know\b.*|feel free to\b.*)\Z",
+    re.IGNORECASE | re.DOTALL,
+)
+PARAGRAPH_BREAK = re.compile(r"\n[ \t]*\n")
+
+
+def may_reason(model) -> bool:
+    """Whether `model` can think before answering, unknown models with a reasoning name included"""
+    if model.think is False:
+        return False
+    if model.think or model.reasoning_effort:
+        return True
+    name = (model.model or "").lower().rsplit("/", 1)[-1]
+    return name.startswith(("o1", "o3", "o4")) or any(hint in name for hint in REASONING_MODELS)
+
+
+def output_budget(diff: str, model) -> Optional[int]:
+    """`max_tokens` derived from the size of the diff, None for reasoning models"""
+    if may_reason(model):
+        return None
+    if model.cutoff == "title":
+        budget = TITLE_OUTPUT_TOKENS
+    else:
+        budget = min(MIN_OUTPUT_TOKENS + estimate_tokens(diff) // 32, MAX_OUTPUT_TOKENS)
+    # The title is still written in full in a structured answer, whatever the cutoff
+    return budget + STRUCTURED_OUTPUT_TOKENS if model.structured else budget
+
+
+def stop_sequences(model) -> List[str]:
+    """Stop sequences for the cutoff policy, none when they could match inside the reasoning or the JSON"""
+    if model.cutoff == "none" or model.structured or may_reason(model):
+        return []
+    return ["\n\n"] if model.cutoff == "title" else list(STOP_SEQUENCES)
+
+
+def generation_options(diff: str, model) -> dict:
+    """Options of the model, with the answer budget and the stop sequences when not configured"""
+    options = model.options.dict() if model.options else {}
+    if not options.get("max_tokens"):
+        options["max_tokens"] = output_budget(diff, model)
+    if options.get("stop") is None:
+        options["stop"] = stop_sequences(model) or None
+    return options
+
+
+def cut_message(response: str, cutoff: str = "body") -> str:
+    """Drop what follows the message: everything after the title, or the chatter after the body"""
+    thinking, answer = split_thinking(response)
+    if cutoff == "title":
+        answer = next((line.strip() for line in answer.splitlines() if line.strip()), "")
+    elif cutoff == "body":
+        # Last paragraphs are dropped while they are sign-offs, the title paragraph never is
+        answer = answer.rstrip()
+        while True:
+            breaks = list(PARAGRAPH_BREAK.finditer(answer))
+            if not breaks or not TRAILING_CHATTER.match(answer, breaks[-1].end()):
+                break
+            answer = answer[: breaks[-1].start()].rstrip()
+    else:
+        return response
+    return f"<think>{thinking}</think>{answer}" if thinking else answer
+
+
 class EmojiSteps(Enum):
     """If emoji should be performed in the same step as the message or in a separated one"""
 
@@ -86,11 +221,108 @@ class LModelOptions(BaseModel):
     max_tokens: Optional[conint(ge=1)] = (
         None  # Ensure max_tokens is a positive integer if provided
     )
+    stop: Optional[List[str]] = None  # Replaces the stop sequences of the cutoff policy
 
     class Config:
         extra = Extra.allow  # Allows for extra arguments
 
 
+class RateLimitConfig(BaseModel):
+    """Client side rate limits and retry policy for a provider and key"""
+
+    requests_per_minute: Optional[conint(ge=1)] = None
+    tokens_per_minute: Optional[conint(ge=1)] = None
+    max_retries: conint(ge=0) = 3
+    backoff_base: float = 1.0  # Seconds, doubled on every retry
+    backoff_max: float = 60.0
+
+
+class BatchConfig(BaseModel):
+    """Micro-batching of concurrent requests to the same host"""
+
+    window_ms: float = 5.0  # How long the first request waits for others to join
+    max_batch_size: conint(ge=1) = 16
+    http2: bool = True  # Multiplex the batch on one connection (openai_compatible, when h2 is installed)
+
+
+class StructuredConfig(BaseModel):
+    """JSON answers constrained by a schema, the message is assembled locally from their fields"""
+
+    types: List[str] = CHANGE_TYPES  # Allowed change types
+    # Jinja template over title, type and emoji, "{{ emoji }} {{ title }}" by default ("{{ title }}" without emoji)
+    title_format: Optional[str] = None
+
+
+class PreprocessConfig(BaseModel):
+    """Diff drivers replacing the blocks of the files they recognize with compact summaries"""
+
+    enabled: bool = True
+    disabled_drivers: List[str] = []  # Driver names, e.g. ["lockfile"]
+    gitattributes: bool = True  # Leave out files marked linguist-generated, linguist-vendored, -diff or commitcraft-ignore
+
+
+class CacheConfig(BaseModel):
+    """Cache of generated messages matched by diff similarity, survives rebases and cherry-picks"""
+
+    enabled: bool = True
+    path: str = os.path.join(".commitcraft", "cache.db")
+    reuse: bool = True  # Return the cached message of the same normalized diff as is
+    few_shot_threshold: Optional[confloat(ge=0, le=1)] = 0.8  # Give a similar change's message to the model as an example
+    max_entries: conint(ge=1) = 5000
+
+
+class HistoryConfig(BaseModel):
+    """Past commits retrieved from a local index and shown to the model as examples of the house style"""
+
+    enabled: bool = True
+    path: str = os.path.join(".commitcraft", "history.db")
+    top_k: conint(ge=1) = 3
+    max_tokens: conint(ge=1) = 400  # Budget for all the examples together
+    max_commits: conint(ge=1) = 2000  # Most recent commits kept in the index
+    min_score: confloat(ge=0, le=1) = 0.1  # Below it a past commit is too different to be shown
+
+
+class CascadeConfig(BaseModel):
+    """A small model drafts the message, the configured one is only asked when the draft fails the checks"""
+
+    enabled: bool = True
+    provider: Optional[str] = None  # Provider profile name or provider type of the draft model
+    model: Optional[str] = None
+    max_title_length: conint(ge=10) = 72
+    conventional: bool = False  # The title must follow Conventional Commits
+    mention_paths: bool = True  # The message must name a changed file or module
+    min_score: confloat(ge=0, le=1) = 1.0  # Share of the checks a draft must pass to be kept
+
+
+class RouteConfig(BaseModel):
+    """A band of diff sizes sent to its own model, bounds are inclusive and optional"""
+
+    min_tokens: Optional[conint(ge=0)] = None  # Estimated tokens of the diff, ignored files excluded
+    max_tokens: Optional[conint(ge=0)] = None
+    min_files: Optional[conint(ge=0)] = None  # Files changed
+    max_files: Optional[conint(ge=0)] = None
+    provider: Optional[str] = None  # Provider profile name or provider type
+    model: Optional[str] = None
+
+    def matches(self, tokens: int, files: int) -> bool:
+        return (
+            (self.min_tokens is None or tokens >= self.min_tokens)
+            and (self.max_tokens is None or tokens <= self.max_tokens)
+            and (self.min_files is None or files >= self.min_files)
+            and (self.max_files is None or files <= self.max_files)
+        )
+
+
+def select_route(routes: List[RouteConfig], diff: str) -> Optional[RouteConfig]:
+    """First route whose band contains the size of `diff`"""
+    tokens = estimate_tokens(diff)
+    files = len(re.findall(r"(?m)^diff --git ", diff))
+    for route in routes:
+        if route.matches(tokens, files):
+            return route
+    return None
+
+
 class Provider(str, Enum):
     """The supported LLM Providers"""
 
@@ -100,12 +332,13 @@ class Provider(str, Enum):
     google = "google"
     groq = "groq"
     openai_compatible = "openai_compatible"
+    llama_cpp = "llama_cpp"
 
 
 class LModel(BaseModel):
     """The model object containin the provider, model name, system prompt, option and host"""
 
-    provider: Provider = Provider.ollama
+    provider: Union[Provider, str] = Provider.ollama  # str for provider plugins
     model: Optional[str] = (
         None  # Most providers have default, required for openai_compatible
     )
@@ -115,35 +348,50 @@ class LModel(BaseModel):
         None  # required for openai_compatible
     )
     api_key: Optional[str] = None
+    rate_limit: Optional[RateLimitConfig] = None
+    timeout: Optional[float] = None  # Seconds for the whole request, retries included
+    connect_timeout: Optional[float] = None
+    think: Optional[bool] = None  # False disables reasoning on supporting providers
+    reasoning_effort: Optional[str] = None  # e.g. "low", "medium", "high"
+    batch: Optional[BatchConfig] = None  # Enables micro-batching when set
+    max_diff_tokens: Optional[conint(ge=256)] = None  # Larger diffs keep their most relevant hunks
+    cutoff: Literal["body", "title", "none"] = "body"  # What is kept of the answer, see cut_message
+    structured: Optional[StructuredConfig] = None  # Enables schema constrained JSON answers when set
+
+    @field_validator("provider", mode="before")
+    @classmethod
+    def check_provider_registered(cls, value):
+        # Built-in providers become Provider members, plugins stay plain strings
+        value = getattr(value, "value", value)
+        try:
+            return Provider(value)
+        except ValueError:
+            if value not in available_providers():
+                raise ValueError(f"Unknown provider '{value}'")
+            return value
+
+    @property
+    def provider_name(self) -> str:
+        return getattr(self.provider, "value", self.provider)
 
     @model_validator(mode='after')
     def set_model_default(self):
         # If 'model' is not provided, set it based on 'provider'
         if not self.model:
-            if self.provider == Provider.ollama:
-                self.model = "qwen3"
-            elif self.provider == Provider.ollama_cloud:
-                self.model = "qwen3-coder:480b-cloud"
-            elif self.provider == Provider.groq:
-                self.model = "qwen/qwen3-32b"
-            elif self.provider == Provider.google:
-                self.model = "gemini-2.5-flash"
-            elif self.provider == Provider.openai:
-                self.model = "gpt-3.5-turbo"
+            self.model = get_provider(self.provider).default_model
         return self
 
     @model_validator(mode='after')
     def validate_provider_requirements(self):
-        # Enforce that 'model' is not None when using openai_compatible
-        if self.provider == Provider.openai_compatible:
-            if not self.model:
-                raise MissingModelError()
+        # Enforce that 'model' is not None for providers without a default (openai_compatible, llama_cpp)
+        if get_provider(self.provider).requires_model and not self.model:
+            raise MissingModelError(self.provider_name)
         return self
 
     @model_validator(mode='after')
     def check_host_for_oai_custom(self):
-        if self.provider == Provider.openai_compatible and not self.host:
-            raise MissingHostError()
+        if get_provider(self.provider).requires_host and not self.host:
+            raise MissingHostError(self.provider_name)
         return self
 
 
@@ -179,18 +427,17 @@ def clue_parser(input: CommitCraftInput) -> dict[str, str | bool]:
     return clues_and_input
 
 
-def commit_craft(
+def build_prompts(
     input: CommitCraftInput,
-    models: LModel = LModel(),  # Will support multiple models in 1.1.0 but for now only one
+    model: LModel,
     context: dict[str, str] = {},
     emoji: Optional[EmojiConfig] = None,
-    debug_prompt: bool = False,
-) -> str:
-    """CommitCraft generates a system message and requests a commit message based on staged changes"""
+) -> tuple[str, str]:
+    """Render the (system_prompt, prompt) pair sent to the model"""
 
     system_prompt = (
-        models.system_prompt
-        if models.system_prompt
+        model.system_prompt
+        if model.system_prompt
         else default.get("system_prompt", "")
     )
     system_prompt = Template(system_prompt)
@@ -207,191 +454,200 @@ def commit_craft(
             elif emoji.emoji_convention:
                 system_prompt += f"\n\n{emoji.emoji_convention}"
 
+    if model.structured:
+        system_prompt += "\n\n" + Template(default.get("structured_output", "")).render(
+            types=", ".join(model.structured.types)
+        )
+
+    # Qwen3 soft switch, honoured whatever the provider in front of the model
+    if model.think is False and "qwen3" in (model.model or "").lower():
+        prompt += "\n/no_think"
+    return system_prompt, prompt
+
+
+def response_schema(model: LModel) -> Optional[dict]:
+    """Schema constraining the answer, None when not structured or the provider can't enforce one"""
+    if model.structured and get_provider(model.provider).capabilities.structured_output:
+        return commit_schema(model.structured.types)
+    return None  # A structured model still gets the instructions and its answer is parsed
+
+
+def structured_message(response: str, model: LModel, emoji: bool = True) -> str:
+    """Message assembled from a structured answer, the answer as is when it isn't one"""
+    thinking, answer = split_thinking(response)
+    fields = parse_fields(answer) if model.structured else None
+    if fields is None:
+        return response
+    title_format = model.structured.title_format or ("{{ emoji }} {{ title }}" if emoji else "{{ title }}")
+    answer = assemble_message(fields, title_format)
+    return f"<think>{thinking}</think>{answer}" if thinking else answer
+
+
+def finish_message(response: str, model: LModel, emoji: bool = True) -> str:
+    """Final message of an answer: assembled when structured, then cut by the model's policy"""
+    return cut_message(structured_message(response, model, emoji), model.cutoff)
+
+
+def commit_craft(
+    input: CommitCraftInput,
+    models: LModel = LModel(),  # Will support multiple models in 1.1.0 but for now only one
+    context: dict[str, str] = {},
+    emoji: Optional[EmojiConfig] = None,
+    debug_prompt: bool = False,
+    deadline: Optional[Deadline] = None,
+    cache: Optional[CacheConfig] = None,
+    history: Optional[HistoryConfig] = None,
+    hint: Optional[str] = None,
+) -> str:
+    """CommitCraft generates a system message and requests a commit message based on staged changes.
+
+    `hint` is a draft to improve, with the problems found in it.
+    """
+
     model = models
-    model_options = model.options.dict() if model.options else {}
+    provider = get_provider(model.provider)
+    model_options = generation_options(input.diff, model)
+    # The deadline bounds the whole request (model lookup and retries included),
+    # the HTTP timeouts bound each attempt so a saturated host can't hang forever.
+    if deadline is None:
+        deadline = Deadline(model.timeout)
+
+    # Model metadata is looked up once, here, and handed to the provider with the request
+    large_diff = estimate_tokens(input.diff) > WINDOW_CHECK_TOKENS
+    info = None
+    if large_diff or provider.needs_model_info:
+        from .model_catalog import LIST_TIMEOUT, get_catalog
+
+        remaining = deadline.remaining()
+        info = get_catalog().info(model, LIST_TIMEOUT if remaining is None else min(LIST_TIMEOUT, remaining))
+    prompt_input = input
+    diff_budget = model.max_diff_tokens
+    if large_diff and info and info.context_length:
+        # Large diffs are also fitted to the model's real context window, when the provider reports it
+        overhead = estimate_tokens("".join(build_prompts(input.model_copy(update={"diff": ""}), model, context, emoji)))
+        answer = model_options.get("max_tokens") or 1024
+        window_budget = max(info.context_length - overhead - answer, 256)
+        diff_budget = min(diff_budget, window_budget) if diff_budget else window_budget
+    if diff_budget and estimate_tokens(input.diff) > diff_budget:
+        from .ranking import fit_diff
+
+        prompt_input = input.model_copy(
+            update={"diff": fit_diff(input.diff, diff_budget)}
+        )
+    system_prompt, prompt = build_prompts(prompt_input, model, context, emoji)
+
+    # Near-duplicate tier: the same change rebased, cherry-picked or applied on
+    # another branch reuses the message generated the first time, a similar
+    # one is only shown it as an example.
+    similar_cache = None
+    if cache and cache.enabled and input.diff.strip():
+        similar_cache = get_similarity_cache(cache.path, cache.max_entries)
+        cache_scope = cache_key(
+            system_prompt,
+            input.dict(exclude={"diff"}),
+            model.provider_name,
+            model.model,
+        )
+        if cache.reuse and not debug_prompt:
+            message = similar_cache.exact(cache_scope, input.diff)
+            if message:
+                return message
+        match = similar_cache.nearest(cache_scope, input.diff) if cache.few_shot_threshold is not None else None
+        if match and match[1] >= cache.few_shot_threshold:
+            _, example = split_thinking(match[0])
+            prompt += f"\n{default.get('similar_change', '')}:\n{example}\n"
+
+    if history and history.enabled and input.diff.strip():
+        from .history import HistoryIndex
+
+        examples = HistoryIndex(history.path).examples(
+            input.diff, history.top_k, history.max_tokens, history.min_score
+        )
+        if examples:
+            prompt += f"\n{default.get('history_examples', '')}:\n" + "\n---\n".join(examples) + "\n"
+
+    if hint:
+        prompt += f"\n{default.get('draft_hint', '')}:\n{hint}\n"
+
     if debug_prompt:
         return f"system_prompt:\n{system_prompt}\n\n prompt:\n{prompt}"
-    match model.provider:
-        case "ollama":
-            import ollama
-
-            # Ollama local instance initialization
-            client_args = {}
-            host_val = str(model.host) if model.host else os.getenv("OLLAMA_HOST")
-            if host_val:
-                client_args["host"] = host_val
-
-            # API key support for authenticated Ollama instances
-            ollama_api_key = (
-                model.api_key if model.api_key else os.getenv("OLLAMA_API_KEY")
-            )
-            if ollama_api_key:
-                client_args["headers"] = {"Authorization": f"Bearer {ollama_api_key}"}
-
-            Ollama = ollama.Client(**client_args)
-
-            if "num_ctx" in model_options.keys():
-                if model_options["num_ctx"]:
-                    return Ollama.generate(
-                        model=model.model,
-                        system=system_prompt,
-                        prompt=prompt,
-                        options=model_options,
-                    )["response"]
-                else:
-                    model_options["num_ctx"] = get_context_size(prompt, system_prompt)
-                    return Ollama.generate(
-                        model=model.model,
-                        system=system_prompt,
-                        prompt=prompt,
-                        options=model_options,
-                    )["response"]
-            else:
-                model_options["num_ctx"] = get_context_size(prompt, system_prompt)
-                return Ollama.generate(
-                    model=model.model,
-                    system=system_prompt,
-                    prompt=prompt,
-                    options=model_options,
-                )["response"]
-
-        case "ollama_cloud":
-            import ollama
-
-            # Ollama Cloud configuration per https://docs.ollama.com/cloud#python
-            client_args = {
-                "host": "https://ollama.com"
-            }
-
-            # Cloud requires API key authentication
-            ollama_api_key = (
-                model.api_key if model.api_key else os.getenv("OLLAMA_API_KEY")
-            )
-            if ollama_api_key:
-                client_args["headers"] = {"Authorization": f"Bearer {ollama_api_key}"}
-
-            Ollama = ollama.Client(**client_args)
-
-            # Ollama Cloud uses chat API, not generate API
-            messages = [
-                {"role": "system", "content": system_prompt},
-                {"role": "user", "content": prompt}
-            ]
-
-            # Filter options for chat API (cloud doesn't use num_ctx)
-            chat_options = {k: v for k, v in model_options.items() if k != "num_ctx"}
-
-            response = Ollama.chat(
-                model=model.model,
-                messages=messages,
-                options=chat_options if chat_options else None,
-            )
-            return response["message"]["content"]
-
-        case "groq":
-            from groq import Groq
-
-            client = Groq(
-                api_key=model.api_key if model.api_key else os.getenv("GROQ_API_KEY")
-            )
-            groq_configs = ("top_p", "temperature", "max_tokens")
-            groq_options = {
-                config: model_options.get(config) if model_options.get(config) else None
-                for config in (set(tuple(model_options.keys())) & set(groq_configs))
-            }
-            return (
-                client.chat.completions.create(
-                    messages=[
-                        {"role": "system", "content": system_prompt},
-                        {"role": "user", "content": prompt},
-                    ],
-                    model=model.model,
-                    stream=False,
-                    **groq_options,
-                )
-                .choices[0]
-                .message.content
-            )
-
-        case "google":
-            from google import genai
-            from google.genai import types
-
-            client = genai.Client(
-                api_key=model.api_key if model.api_key else os.getenv("GOOGLE_API_KEY")
-            )
-
-            google_config = {}
-            if system_prompt:
-                google_config["system_instruction"] = system_prompt
-
-            if model_options:
-                if model_options.get("temperature"):
-                    google_config["temperature"] = model_options.get("temperature")
-                if model_options.get("max_tokens"):
-                    google_config["max_output_tokens"] = model_options.get("max_tokens")
-                if model_options.get("top_p"):
-                    google_config["top_p"] = model_options.get("top_p")
-
-            response = client.models.generate_content(
-                model=model.model,
-                contents=prompt,
-                config=types.GenerateContentConfig(**google_config),
-            )
-            return response.text
-
-        case "openai":
-            from openai import OpenAI
-
-            client = OpenAI(
-                api_key=model.api_key if model.api_key else os.getenv("OPENAI_API_KEY")
-            )
-            openai_configs = ("top_p", "temperature", "max_tokens")
-            openai_options = {
-                config: model_options.get(config) if model_options.get(config) else None
-                for config in (set(tuple(model_options.keys())) & set(openai_configs))
-            }
-            return (
-                client.chat.completions.create(
-                    messages=[
-                        {"role": "system", "content": system_prompt},
-                        {"role": "user", "content": prompt},
-                    ],
-                    model=model.model,
-                    stream=False,
-                    **openai_options,
-                )
-                .choices[0]
-                .message.content
-            )
-
-        case "openai_compatible":
-            from openai import OpenAI
-
-            client = OpenAI(
-                api_key=model.api_key
-                if model.api_key
-                else os.getenv("CUSTOM_API_KEY", default="nokey"),
-                base_url=str(model.host),
-            )
-            openai_configs = ("top_p", "temperature", "max_tokens")
-            openai_options = {
-                config: model_options.get(config) if model_options.get(config) else None
-                for config in (set(tuple(model_options.keys())) & set(openai_configs))
-            }
-            return (
-                client.chat.completions.create(
-                    messages=[
-                        {"role": "system", "content": system_prompt},
-                        {"role": "user", "content": prompt},
-                    ],
-                    model=model.model,
-                    stream=False,
-                    **openai_options,
-                )
-                .choices[0]
-                .message.content
-            )
 
-        case _:
-            raise NotImplementedError("provider not found")
+    # Every provider call goes through the shared scheduler, which applies the
+    # configured rate limits and retries 429s and transient 5xx errors.
+    rate_limit = model.rate_limit if model.rate_limit else RateLimitConfig()
+    limit_key = (model.provider_name, str(model.host or ""), model.api_key or "")
+    request_tokens = estimate_tokens(system_prompt + prompt) + (
+        model_options.get("max_tokens") or 0
+    )
+
+    timeout_args = {}
+    if model.timeout or model.connect_timeout:
+        import httpx
+
+        timeout_args["timeout"] = httpx.Timeout(
+            model.timeout, connect=model.connect_timeout or model.timeout
+        )
+
+    def send(request):
+        return scheduler.call(
+            limit_key, rate_limit, request, tokens=request_tokens, deadline=deadline
+        )
+
+    response = provider.submit(
+        GenerationRequest(
+            model=model,
+            system_prompt=system_prompt,
+            prompt=prompt,
+            options=model_options,
+            response_schema=response_schema(model),
+            model_info=info,
+            deadline=deadline,
+            timeout_args=timeout_args,
+            send=send,
+        )
+    )
+    if response:
+        response = finish_message(response, model, bool(emoji and emoji.emoji_convention))
+    if similar_cache and response and response.strip():
+        similar_cache.store(cache_scope, input.diff, response)
+    return response
+
+
+def commit_cascade(
+    input: CommitCraftInput,
+    draft_model: LModel,
+    model: LModel,
+    cascade: CascadeConfig,
+    context: dict[str, str] = {},
+    emoji: Optional[EmojiConfig] = None,
+    debug_prompt: bool = False,
+    deadline: Optional[Deadline] = None,
+    cache: Optional[CacheConfig] = None,
+    history: Optional[HistoryConfig] = None,
+) -> str:
+    """Draft the message with `draft_model` and keep it when it passes the local checks.
+
+    Otherwise `model` writes the message, with the draft and its problems as a hint.
+    A failing draft model is skipped, the deadline is shared by both calls.
+    """
+    from .cascade import draft_problems, draft_score
+
+    if debug_prompt:
+        return commit_craft(input, model, context, emoji, debug_prompt, deadline, cache, history)
+    if deadline is None:
+        deadline = Deadline(model.timeout)
+
+    hint = None
+    try:
+        draft = commit_craft(input, draft_model, context, emoji, deadline=deadline, cache=cache, history=history)
+    except DeadlineExceeded:
+        raise
+    except Exception:
+        draft = None
+    if draft:
+        _, message = split_thinking(draft)
+        problems = draft_problems(message, input.diff, cascade)
+        if draft_score(problems) >= cascade.min_score:
+            return draft
+        hint = message + "\n\nProblems:\n" + "\n".join(f"- {problem}" for problem in problems.values() if problem)
+    return commit_craft(input, model, context, emoji, deadline=deadline, cache=cache, history=history, hint=hint)
@@ -1,5 +1,4 @@
 import os
-import re
 import random
 import threading
 
@@ -9,8 +8,11 @@ if not os.environ.get('NO_COLOR'):
     os.environ.setdefault('FORCE_COLOR', '1')
 
 from dotenv import load_dotenv
-from commitcraft import commit_craft, get_diff, CommitCraftInput, LModelOptions, EmojiConfig, LModel, filter_diff
+from commitcraft import commit_craft, get_diff, CommitCraftInput, LModelOptions, EmojiConfig, LModel, CacheConfig, HistoryConfig, PreprocessConfig, RouteConfig, StructuredConfig, CascadeConfig, commit_cascade, select_route, Deadline, DeadlineExceeded
 from .config_handler import interactive_config
+from .thinking import split_thinking
+from .profiling import Profiler
+import click
 import typer
 from typing import Optional
 from typing_extensions import Annotated
@@ -73,14 +75,20 @@ LOADING_MESSAGES = [
     "[success]Crafting the perfect commit (no pressure)...[/success]",
 ]
 
-def rotating_status(callable_func, *args, **kwargs):
+def rotating_status(callable_func, *args, deadline: Optional[Deadline] = None, **kwargs):
     """
     Execute a function with a rotating loading message that changes every 3 seconds.
+
+    A given deadline is forwarded to the function; waiting stops when it expires
+    and Ctrl-C cancels it, closing the in-flight request.
     """
     result = [None]
     exception = [None]
     finished = threading.Event()
 
+    if deadline is not None:
+        kwargs["deadline"] = deadline
+
     def run_function():
         try:
             result[0] = callable_func(*args, **kwargs)
@@ -104,14 +112,31 @@ def rotating_status(callable_func, *args, **kwargs):
         console=err_console,
         refresh_per_second=10
     ) as live:
-        while not finished.is_set():
-            # Wait for 3 seconds or until finished
-            if finished.wait(timeout=3.0):
-                break
-
-            # Rotate to next message
-            message_index = (message_index + 1) % len(messages)
-            live.update(Spinner("dots", text=messages[message_index], style="success"))
+        try:
+            while not finished.is_set():
+                # Wait for 3 seconds, until finished or until the deadline
+                wait_time = 3.0
+                remaining = deadline.remaining() if deadline else None
+                if remaining is not None:
+                    wait_time = min(wait_time, remaining)
+                if finished.wait(timeout=wait_time):
+                    break
+
+                if deadline and deadline.expired:
+                    deadline.cancel()
+                    break
+
+                # Rotate to next message
+                message_index = (message_index + 1) % len(messages)
+                live.update(Spinner("dots", text=messages[message_index], style="success"))
+        except KeyboardInterrupt:
+            if deadline:
+                deadline.cancel()
+            raise
+
+    # Give a cancelled request a moment to unwind, never block past that
+    if deadline is not None and deadline.expired and not finished.wait(timeout=5.0):
+        raise DeadlineExceeded("Request deadline exceeded")
 
     # Wait for thread to complete
     thread.join()
@@ -192,6 +217,224 @@ def load_config():
     # 3. Merge
     return merge_configs(global_config, project_config)
 
+def resolve_model_config(config: dict, provider: Optional[str] = None) -> tuple[LModel, Optional[str]]:
+    """
+    Pick the model configuration for a `--provider` value.
+
+    Returns the LModel and the provider override still to apply: None when
+    `provider` named a provider profile, the provider type otherwise.
+    """
+    providers_map = config.get('providers', {})
+
+    # Check if 'provider' argument matches a named provider configuration
+    if provider and provider in providers_map:
+        # Load the named provider config
+        base_model_config = dict(providers_map[provider])
+
+        # Resolve API Key dynamically based on nickname
+        # Format: NICKNAME_API_KEY (e.g., REMOTE_API_KEY)
+        nickname = provider
+        env_key = f"{nickname.upper()}_API_KEY"
+
+        resolved_api_key = os.getenv(env_key)
+        if resolved_api_key:
+            base_model_config['api_key'] = resolved_api_key
+
+        # Initialize LModel using the named config
+        # The nickname must not override 'provider', the profile already set it
+        return LModel(**base_model_config), None
+
+    # Fallback to default [models] block or use standard provider defaults
+    base_model_config = config.get('models') if config.get('models') else {}
+    return LModel(**base_model_config), provider # Apply CLI override (e.g. 'ollama', 'openai')
+
+def resolve_draft_model(config: dict, cascade: CascadeConfig) -> LModel:
+    """Draft model of the cascade, a provider profile or type like `--provider`"""
+    draft_config, provider_override = resolve_model_config(config, cascade.provider)
+    if not provider_override and not cascade.model:
+        return draft_config
+    return LModel(**{
+        **draft_config.model_dump(exclude_none=True),
+        "provider": provider_override if provider_override else draft_config.provider,
+        "model": cascade.model if cascade.model else draft_config.model,
+    })
+
+def resolve_context(context: dict) -> dict:
+    """Fill the context values left empty with the project context built by `CommitCraft context build`"""
+    from .project_context import project_context
+
+    built_context = project_context()
+    if not built_context:
+        return context
+    return {**built_context, **{key: value for key, value in context.items() if value}}
+
+def refresh_history(history: HistoryConfig):
+    """Index the commits made since the last run"""
+    from .history import HistoryIndex
+
+    try:
+        HistoryIndex(history.path).update(history.max_commits)
+    except Exception:
+        pass  # Retrieve from the index as it is when git can't be read
+
+def check_model(model_config: LModel):
+    """Warn about a `--model` missing from the provider's cached model list, never asks the provider"""
+    from .model_catalog import get_catalog, known_model, suggest_models
+
+    models = get_catalog().cached(model_config.provider_name, model_config.host and str(model_config.host), model_config.api_key)
+    if not models or known_model(model_config.model, models):
+        return
+    suggestions = suggest_models(model_config.model, models)
+    hint = f", did you mean {', '.join(suggestions)}?" if suggestions else ""
+    err_console.print(f"[warning]Model '{model_config.model}' is not listed by {model_config.provider_name}{hint}[/warning]", highlight=False)
+
+def load_env():
+    """Load `.env`, then `CommitCraft.env` which overrides it"""
+    load_dotenv(os.path.join(os.getcwd(), ".env"))
+    load_dotenv(os.path.join(os.getcwd(), "CommitCraft.env"))
+
+def ignored_patterns(ignore: Optional[str] = None) -> list:
+    """Patterns of `.commitcraft/.ignore` and the comma separated `ignore` option"""
+    patterns = []
+    if os.path.exists('./.commitcraft/.ignore'):
+        with open('./.commitcraft/.ignore') as ignore_file:
+            patterns = list(set([pattern.strip() for pattern in ignore_file.readlines()]))
+    if ignore:
+        patterns = list(set([pattern.strip() for pattern in ignore.split(',')] + patterns))
+    return patterns
+
+def generate(diff: str, params: dict, profiler: Optional[Profiler] = None) -> Optional[str]:
+    """
+    Generate the message of `diff` from the main command options, None if the deadline expired.
+
+    `params` holds the values of the main command parameters, command line and environment included.
+    """
+    profiler = profiler or Profiler()
+    config_file, provider, model = params['config_file'], params['provider'], params['model']
+    num_ctx, temperature, max_tokens = params['num_ctx'], params['temperature'], params['max_tokens']
+    system_prompt, host, timeout = params['system_prompt'], params['host'], params['timeout']
+    think, reasoning_effort = params['think'], params['reasoning_effort']
+    max_diff_tokens, debug_prompt, no_cache = params['max_diff_tokens'], params['debug_prompt'], params['no_cache']
+    cutoff, structured = params['cutoff'], params['structured']
+
+    with profiler.stage("load_config"):
+        # Determine if the context file is provided or try to load the default
+        config = load_file(config_file) if config_file else load_config()
+
+    with profiler.stage("preprocess"):
+        # Lockfiles and other recognized formats are summarized, generated and vendored files left out
+        preprocess_config = PreprocessConfig(**config.get('preprocess', {}))
+        if preprocess_config.enabled:
+            from .preprocess import preprocess_diff
+
+            diff = preprocess_diff(diff, preprocess_config.disabled_drivers, attributes=preprocess_config.gitattributes)
+
+    with profiler.stage("context"):
+        context_info = config.get('context') if config.get('context', False) else {'project_name' : params['project_name'], 'project_language' : params['project_language'], 'project_description' : params['project_description'], 'commit_guidelines' : params['commit_guide']}
+        context_info = resolve_context(context_info)
+
+        emoji_config = EmojiConfig(**config.get('emoji')) if config.get('emoji') else EmojiConfig(emoji_steps='single', emoji_convention='simple')
+
+        cache_config = CacheConfig(**config.get('cache')) if config.get('cache') and not no_cache else None
+
+        # Past commits are only retrieved once the index was built with `CommitCraft history build`
+        history_config = HistoryConfig(**config.get('history', {}))
+        if history_config.enabled and os.path.exists(history_config.path):
+            refresh_history(history_config)
+        else:
+            history_config = None
+
+        # Routing and the cascade only apply when no model was picked explicitly
+        explicit_model = bool(provider or model)
+
+        # Route the diff to a model by its size
+        if not explicit_model and config.get('routing'):
+            route = select_route([RouteConfig(**route) for route in config['routing']], diff)
+            if route:
+                provider, model = route.provider, route.model
+
+        # Determine model config
+        model_config, cli_provider_override = resolve_model_config(config, provider)
+
+        # Construct the model options
+        lmodel_options = LModelOptions(
+            num_ctx=num_ctx if num_ctx else None,
+            temperature=temperature if temperature else None,
+            max_tokens=max_tokens if max_tokens else None,
+            #**extra_model_options  # Merge extra model options here
+        )
+
+        cli_options = lmodel_options.dict()
+        config_options = model_config.options.dict() if model_config.options else {}
+        model_options = {config: cli_options.get(config) if cli_options.get(config, False) else config_options.get(config) for config in set(list(cli_options.keys()) + list(config_options.keys()))}
+
+        structured_config = model_config.structured
+        if structured is not None:
+            structured_config = (structured_config or StructuredConfig()) if structured else None
+
+        model_config = LModel(
+            provider=cli_provider_override if cli_provider_override else model_config.provider,
+            model=model if model else model_config.model, # Allow overriding model even for named profile
+            system_prompt=system_prompt if system_prompt else model_config.system_prompt,
+            host=host if host else model_config.host,
+            api_key=model_config.api_key, # Preserve resolved key
+            rate_limit=model_config.rate_limit,
+            batch=model_config.batch,
+            timeout=timeout if timeout else model_config.timeout,
+            connect_timeout=model_config.connect_timeout,
+            think=think if think is not None else model_config.think,
+            reasoning_effort=reasoning_effort if reasoning_effort else model_config.reasoning_effort,
+            max_diff_tokens=max_diff_tokens if max_diff_tokens else model_config.max_diff_tokens,
+            cutoff=cutoff if cutoff else model_config.cutoff,
+            structured=structured_config,
+            options=LModelOptions(**model_options)
+        )
+        if model:
+            check_model(model_config)
+
+        # A small model drafts first, the configured one only refines failed drafts
+        cascade_config = CascadeConfig(**config['cascade']) if config.get('cascade') else None
+        draft_config = None
+        if cascade_config and cascade_config.enabled and not explicit_model:
+            draft_config = resolve_draft_model(config, cascade_config)
+            if (draft_config.provider_name, draft_config.model, draft_config.host) == (model_config.provider_name, model_config.model, model_config.host):
+                draft_config = None  # Routed to the draft model already
+
+        # Construct the request using provided arguments or defaults
+        input = CommitCraftInput(
+            diff=diff,
+            bug=params['bug_desc'] if params['bug_desc'] else params['bug'],
+            feat=params['feat_desc'] if params['feat_desc'] else params['feat'],
+            docs=params['docs_desc'] if params['docs_desc'] else params['docs'],
+            refact=params['refact_desc'] if params['refact_desc'] else params['refact'],
+            custom_clue=params['context_clue'] if params['context_clue'] else False
+
+        )
+
+    # Call the commit_craft function with rotating loading messages
+    # The deadline is created even without timeout so Ctrl-C can cancel the request
+    deadline = Deadline(model_config.timeout)
+    try:
+        with profiler.stage("commit_craft"):
+            if draft_config:
+                response = rotating_status(
+                    commit_cascade,
+                    input, draft_config, model_config, cascade_config, context_info, emoji_config, debug_prompt,
+                    deadline=deadline, cache=cache_config, history=history_config
+                )
+            else:
+                response = rotating_status(
+                    commit_craft,
+                    input, model_config, context_info, emoji_config, debug_prompt,
+                    deadline=deadline, cache=cache_config, history=history_config
+                )
+    except DeadlineExceeded:
+        # Degrade to an empty message so `git commit` is never blocked
+        err_console.print(f"[warning]CommitCraft timed out after {model_config.timeout}s, no message generated.[/warning]")
+        response = None
+
+    return response
+
 @app.callback(invoke_without_command=True)
 def main(
     ctx: typer.Context,
@@ -240,13 +483,24 @@ def main(
         bool,
         typer.Option(is_flag=True, help="Return the [yellow]prompt[/yellow], don't send any request to the model")
     ] = False,
+    no_cache: Annotated[
+        bool,
+        typer.Option(is_flag=True, help="Skip the near-duplicate [yellow]message cache[/yellow] configured in the [cyan]cache[/cyan] section")
+    ] = False,
+    profile: Annotated[
+        Optional[str],
+        typer.Option(
+            metavar="DIR",
+            help="Write a [yellow]cProfile[/yellow] .pstats file, a [yellow]tracemalloc[/yellow] allocations report and a wall-clock breakdown of the run to [cyan]DIR[/cyan]"
+        )
+    ] = None,
 
     provider:  Annotated[
         Optional[str],
         typer.Option(
             rich_help_panel='Model Config',
             envvar="COMMITCRAFT_PROVIDER",
-            help="Provider for the AI model (supported: [magenta]ollama[/magenta], [magenta]ollama_cloud[/magenta], [magenta]groq[/magenta], [magenta]google[/magenta], [magenta]openai[/magenta], [magenta]openai_compatible[/magenta])",
+            help="Provider for the AI model (supported: [magenta]ollama[/magenta], [magenta]ollama_cloud[/magenta], [magenta]groq[/magenta], [magenta]google[/magenta], [magenta]openai[/magenta], [magenta]openai_compatible[/magenta], [magenta]llama_cpp[/magenta])",
             show_default="ollama"
         )
     ] = None,
@@ -271,6 +525,31 @@ def main(
             help="HTTP or HTTPS host for the provider, required for custom provider, not used for groq"
         )
     ] = None,
+    timeout: Annotated[
+        Optional[float],
+        typer.Option(
+            rich_help_panel='Model Config',
+            envvar="COMMITCRAFT_TIMEOUT",
+            help="Deadline in seconds for the whole request, on expiry an [yellow]empty message[/yellow] is returned"
+        )
+    ] = None,
+    max_diff_tokens: Annotated[
+        Optional[int],
+        typer.Option(
+            rich_help_panel='Model Config',
+            envvar="COMMITCRAFT_MAX_DIFF_TOKENS",
+            help="Token budget for the diff, larger diffs keep their [yellow]most relevant hunks[/yellow] and list the rest like [cyan]git diff --stat[/cyan]"
+        )
+    ] = None,
+    cutoff: Annotated[
+        Optional[str],
+        typer.Option(
+            rich_help_panel='Model Config',
+            envvar="COMMITCRAFT_CUTOFF",
+            click_type=click.Choice(["body", "title", "none"]),
+            help="What is kept of the answer: [cyan]body[/cyan] drops the notes models add after the message, [cyan]title[/cyan] keeps the first line only, [cyan]none[/cyan] keeps everything"
+        )
+    ] = None,
     show_thinking: Annotated[
         bool,
         typer.Option(
@@ -280,6 +559,34 @@ def main(
             help="Show the model's thinking process if available"
         )
     ] = False,
+    structured: Annotated[
+        Optional[bool],
+        typer.Option(
+            "--structured/--no-structured",
+            rich_help_panel='Model Config',
+            envvar="COMMITCRAFT_STRUCTURED",
+            help="Ask for a [yellow]JSON answer[/yellow] constrained by a schema (title, body, type, emoji) and assemble the message locally",
+            show_default="from config"
+        )
+    ] = None,
+    think: Annotated[
+        Optional[bool],
+        typer.Option(
+            "--think/--no-think",
+            rich_help_panel='Model Config',
+            envvar="COMMITCRAFT_THINK",
+            help="Enable or disable reasoning on supporting providers ([magenta]ollama[/magenta] think, Qwen3 [cyan]/no_think[/cyan], reasoning effort, Gemini thinking budget)",
+            show_default="provider default"
+        )
+    ] = None,
+    reasoning_effort: Annotated[
+        Optional[str],
+        typer.Option(
+            rich_help_panel='Model Config',
+            envvar="COMMITCRAFT_REASONING_EFFORT",
+            help="Reasoning effort for models supporting it (e.g. [cyan]low[/cyan], [cyan]medium[/cyan], [cyan]high[/cyan])"
+        )
+    ] = None,
 
     bug: Annotated[
         bool,
@@ -373,116 +680,28 @@ def main(
             os.environ['NO_COLOR'] = '1'
             os.environ.pop('FORCE_COLOR', None)
 
-        # Load .env first
-        load_dotenv(os.path.join(os.getcwd(), ".env"))
-        # Load CommitCraft.env if it exists (overrides .env)
-        load_dotenv(os.path.join(os.getcwd(), "CommitCraft.env"))
-
-        # Get the git diff
-        diff = get_diff()
-        if os.path.exists('./.commitcraft/.ignore'):
-            with open('./.commitcraft/.ignore') as ignore_file:
-                ignored_patterns = list(set([pattern.strip() for pattern in ignore_file.readlines()]))
-            if ignore:
-                ignored_patterns = list(set([pattern.strip() for pattern in ignore.split(',')] + ignored_patterns))
-            diff = filter_diff(diff, ignored_patterns)
+        with Profiler(profile) as profiler:
+            with profiler.stage("dotenv"):
+                load_env()
 
-        elif ignore:
-            diff = filter_diff(diff, [pattern.strip() for pattern in ignore.split(',')])
+            with profiler.stage("get_diff"):
+                diff = get_diff(ignored_patterns(ignore))
 
-        # Determine if the context file is provided or try to load the default
-        #print(str(config_file))
-        config = load_file(config_file) if config_file else load_config()
+            response = generate(diff, ctx.params, profiler)
 
-        context_info = config.get('context') if config.get('context', False) else {'project_name' : project_name, 'project_language' : project_language, 'project_description' : project_description, 'commit_guidelines' : commit_guide}
+            if response is not None:
+                with profiler.stage("split_thinking"):
+                    # Split <think> blocks from the answer
+                    thinking_content, response = split_thinking(response)
 
-        emoji_config = EmojiConfig(**config.get('emoji')) if config.get('emoji') else EmojiConfig(emoji_steps='single', emoji_convention='simple')
-        
-        # Determine model config
-        providers_map = config.get('providers', {})
-        
-        # Check if 'provider' argument matches a named provider configuration
-        if provider and provider in providers_map:
-            # Load the named provider config
-            base_model_config = providers_map[provider]
-            
-            # Resolve API Key dynamically based on nickname
-            # Format: NICKNAME_API_KEY (e.g., REMOTE_API_KEY)
-            nickname = provider
-            env_key = f"{nickname.upper()}_API_KEY"
-            
-            resolved_api_key = os.getenv(env_key)
-            if resolved_api_key:
-                base_model_config['api_key'] = resolved_api_key
-            
-            # Initialize LModel using the named config
-            # We must be careful not to override 'provider' with the nickname in the next step
-            model_config = LModel(**base_model_config)
-            
-            # CLI override logic needs adjustment:
-            # If user provided --provider <nickname>, we effectively used it to pick the config.
-            # We should NOT use 'provider' variable to overwrite model_config.provider unless it was a standard provider.
-            # But 'provider' variable holds the nickname string now.
-            # So when updating LModel below, we should use model_config.provider instead of 'provider' variable
-            # IF we found a match in providers_map.
-            cli_provider_override = None # Do not override provider with nickname
-            
-        else:
-            # Fallback to default [models] block or use standard provider defaults
-            base_model_config = config.get('models') if config.get('models') else {}
-            model_config = LModel(**base_model_config)
-            cli_provider_override = provider # Apply CLI override (e.g. 'ollama', 'openai')
-
-        # Construct the model options
-        lmodel_options = LModelOptions(
-            num_ctx=num_ctx if num_ctx else None,
-            temperature=temperature if temperature else None,
-            max_tokens=max_tokens if max_tokens else None,
-            #**extra_model_options  # Merge extra model options here
-        )
+        if profiler.paths:
+            err_console.print(f"[info]Profile written to {', '.join(profiler.paths)}[/info]", highlight=False)
+        if response is None:
+            return
 
-        cli_options = lmodel_options.dict()
-        config_options = model_config.options.dict() if model_config.options else {}
-        model_options = {config: cli_options.get(config) if cli_options.get(config, False) else config_options.get(config) for config in set(list(cli_options.keys()) + list(config_options.keys()))}
-
-        model_config = LModel(
-            provider=cli_provider_override if cli_provider_override else model_config.provider,
-            model=model if model else model_config.model, # Allow overriding model even for named profile
-            system_prompt=system_prompt if system_prompt else model_config.system_prompt,
-            host=host if host else model_config.host,
-            api_key=model_config.api_key, # Preserve resolved key
-            options=LModelOptions(**model_options)
-        )
-
-        # Construct the request using provided arguments or defaults
-        input = CommitCraftInput(
-            diff=diff,
-            bug=bug_desc if bug_desc else bug,
-            feat=feat_desc if feat_desc else feat,
-            docs=docs_desc if docs_desc else docs,
-            refact=refact_desc if refact_desc else refact,
-            custom_clue=context_clue if context_clue else False
-
-        )
-
-        # Call the commit_craft function with rotating loading messages
-        response = rotating_status(
-            commit_craft,
-            input, model_config, context_info, emoji_config, debug_prompt
-        )
-        
-        # Process <think> tags
-        think_pattern = r"<think>(.*?)</think>"
-        think_match = re.search(think_pattern, response, re.DOTALL)
-        
-        if think_match:
-            thinking_content = think_match.group(1).strip()
-            # Remove the thinking part from the response
-            response = re.sub(think_pattern, "", response, flags=re.DOTALL).strip()
-            
-            if show_thinking:
-                err_console.print("[thinking_title]Thinking Process:[/thinking_title]")
-                err_console.print(f"[thinking_content]{thinking_content}[/thinking_content]\n")
+        if thinking_content and show_thinking:
+            err_console.print("[thinking_title]Thinking Process:[/thinking_title]")
+            err_console.print(f"[thinking_content]{thinking_content}[/thinking_content]\n")
 
         typer.echo(response)
 
@@ -506,6 +725,324 @@ def config():
     """
     interactive_config()
 
+@app.command('models')
+def models(
+    refresh: Annotated[bool, typer.Option(is_flag=True, help="Ask the providers again instead of using the cached lists")] = False,
+    timeout: Annotated[float, typer.Option(help="Seconds allowed to each provider")] = 5.0,
+    config_file: Annotated[
+        Optional[str],
+        typer.Option(help="Path to the config file (TOML, YAML, or JSON)")
+    ] = None,
+):
+    """
+    [bold cyan]List the models of every configured provider.[/bold cyan]
+
+    The [cyan][models][/cyan] provider and every named provider are listed concurrently. Lists are cached in the
+    app directory for 6 hours ([cyan]COMMITCRAFT_MODELS_TTL[/cyan] seconds), the wizard and the [yellow]--model[/yellow] check use them.
+    """
+    from .model_catalog import get_catalog
+    from .providers import get_provider
+
+    load_env()
+    config = load_file(config_file) if config_file else load_config()
+    profiles = {"models": resolve_model_config(config)[0]}
+    for nickname in config.get('providers', {}):
+        profiles[nickname] = resolve_model_config(config, nickname)[0]
+
+    targets = {}
+    for name, profile in profiles.items():
+        provider = get_provider(profile.provider)
+        if provider.capabilities.model_listing:
+            api_key = profile.api_key or (os.getenv(provider.api_key_env) if provider.api_key_env else None)
+            targets[name] = (profile.provider_name, profile.host and str(profile.host), api_key)
+
+    results = get_catalog().fetch_all(set(targets.values()), timeout=timeout, refresh=refresh)
+    for name, target in targets.items():
+        listed = results[target]
+        host = f" {target[1]}" if target[1] else ""
+        if listed is None:
+            err_console.print(f"[warning]{name}[/warning] [dim]({target[0]}{host})[/dim]: could not list the models", highlight=False)
+            continue
+        console.print(f"[info]{name}[/info] [dim]({target[0]}{host}, {len(listed)} models)[/dim]", highlight=False)
+        for model_name in listed:
+            console.print(f"  {model_name}", markup=False, highlight=False)
+
+@app.command('server')
+def server(
+    host: Annotated[Optional[str], typer.Option(help="Interface to listen on", show_default="127.0.0.1")] = None,
+    port: Annotated[Optional[int], typer.Option(help="Port to listen on", show_default="8808")] = None,
+    max_concurrency: Annotated[Optional[int], typer.Option(help="Simultaneous requests per backend", show_default="2")] = None,
+    config_file: Annotated[
+        Optional[str],
+        typer.Option(
+            help="Path to the config file ([cyan]TOML[/cyan], [cyan]YAML[/cyan], or [cyan]JSON[/cyan])",
+            show_default='tries to open [cyan].commitcraft[/cyan] folder in the root of the repo'
+        )
+    ] = None,
+):
+    """
+    [bold cyan]Serve commit message generation over HTTP.[/bold cyan]
+
+    Runs CommitCraft as a shared service for CI jobs and IDE plugins, using the same configuration as the CLI.
+
+    [bold]Endpoints:[/bold]
+    • [green]POST /generate[/green]: JSON body with the [cyan]CommitCraftInput[/cyan] fields ([yellow]diff[/yellow], bug, feat, docs, refact, custom_clue) and optional [yellow]provider[/yellow] / [yellow]model[/yellow]
+    • [green]GET /metrics[/green]: Prometheus metrics
+    • [green]GET /health[/green]: Liveness probe
+
+    Identical requests are coalesced, responses are cached and each backend gets a concurrency limit.
+    """
+    from .server import CommitCraftService, ServerConfig, make_server
+
+    load_env()
+
+    config = load_file(config_file) if config_file else load_config()
+    settings = ServerConfig(**(config.get('server') or {}))
+    settings = settings.model_copy(update={
+        key: value for key, value in {"host": host, "port": port, "max_concurrency": max_concurrency}.items() if value is not None
+    })
+
+    routes = [RouteConfig(**route) for route in config.get('routing') or []]
+
+    def resolve_model(provider: Optional[str], model: Optional[str], diff: str = "") -> LModel:
+        if not provider and not model and routes:
+            route = select_route(routes, diff)
+            if route:
+                provider, model = route.provider, route.model
+        model_config, provider_override = resolve_model_config(config, provider)
+        if not provider_override and not model:
+            return model_config
+        return LModel(**{
+            **model_config.model_dump(exclude_none=True),
+            "provider": provider_override if provider_override else model_config.provider,
+            "model": model if model else model_config.model,
+        })
+
+    service = CommitCraftService(
+        resolve_model=resolve_model,
+        context=resolve_context(config.get('context') or {}),
+        emoji=EmojiConfig(**config.get('emoji')) if config.get('emoji') else EmojiConfig(emoji_steps='single', emoji_convention='simple'),
+        settings=settings,
+    )
+    httpd = make_server(service, settings.host, settings.port)
+    err_console.print(f"[success]CommitCraft server listening on[/success] [cyan]http://{settings.host}:{settings.port}[/cyan]")
+    try:
+        httpd.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        httpd.server_close()
+
+batch_app = typer.Typer(
+    rich_markup_mode="rich",
+    help="[bold cyan]Generate messages for existing commits through a provider batch API.[/bold cyan]",
+)
+app.add_typer(batch_app, name="batch")
+
+def _batch_model(config: dict, job) -> LModel:
+    """Rebuild the model of a saved batch job, resolving its API key again"""
+    model_config, _ = resolve_model_config(config, job.profile)
+    return LModel(**{**job.model, "api_key": model_config.api_key})
+
+def _print_batch_job(job):
+    counts = job.request_counts
+    progress = f" ({counts.get('completed', 0)}/{counts.get('total', len(job.commits))})" if counts else ""
+    err_console.print(f"[info]{job.id}[/info] [dim]{job.revisions}[/dim] {len(job.commits)} commits, [success]{job.status}[/success]{progress}", highlight=False)
+
+@batch_app.command('submit')
+def batch_submit(
+    revisions: Annotated[str, typer.Argument(help="Commits to describe, as a git revision range (e.g. [cyan]v1.0..HEAD[/cyan])")],
+    provider: Annotated[Optional[str], typer.Option(envvar="COMMITCRAFT_PROVIDER", help="Provider or named provider profile with a batch API ([magenta]openai[/magenta], [magenta]groq[/magenta])")] = None,
+    model: Annotated[Optional[str], typer.Option(envvar="COMMITCRAFT_MODEL", help="Model name")] = None,
+    ignore: Annotated[Optional[str], typer.Option(help="Files or file patterns to [red]ignore[/red] (comma separated)")] = None,
+    config_file: Annotated[
+        Optional[str],
+        typer.Option(
+            help="Path to the config file ([cyan]TOML[/cyan], [cyan]YAML[/cyan], or [cyan]JSON[/cyan])",
+            show_default='tries to open [cyan].commitcraft[/cyan] folder in the root of the repo'
+        )
+    ] = None,
+):
+    """
+    [bold cyan]Submit a batch job for a range of commits.[/bold cyan]
+
+    Writes one request per commit (its diff against the parent) to a JSONL file, uploads it and starts a batch job.
+    The job state is kept in [cyan].commitcraft/batches/[/cyan], so [yellow]status[/yellow] and [yellow]results[/yellow] can resume it later.
+    """
+    from .backfill import advance_job, create_job
+
+    load_env()
+
+    config = load_file(config_file) if config_file else load_config()
+    model_config, provider_override = resolve_model_config(config, provider)
+    if provider_override or model:
+        model_config = LModel(**{
+            **model_config.model_dump(exclude_none=True),
+            "provider": provider_override if provider_override else model_config.provider,
+            "model": model if model else model_config.model,
+        })
+
+    try:
+        job = create_job(
+            revisions,
+            model_config,
+            context=resolve_context(config.get('context') or {}),
+            emoji=EmojiConfig(**config.get('emoji')) if config.get('emoji') else EmojiConfig(emoji_steps='single', emoji_convention='simple'),
+            ignored_patterns=ignored_patterns(ignore),
+            profile=provider,
+            preprocess=PreprocessConfig(**config.get('preprocess', {})),
+        )
+    except ValueError as e:
+        err_console.print(f"[danger]{e}[/danger]")
+        raise typer.Exit(1)
+
+    job = advance_job(job, model_config)
+    _print_batch_job(job)
+    typer.echo(job.id)
+
+@batch_app.command('status')
+def batch_status(
+    job_id: Annotated[Optional[str], typer.Argument(help="Job to refresh", show_default="lists every job")] = None,
+    config_file: Annotated[Optional[str], typer.Option(help="Path to the config file")] = None,
+):
+    """
+    [bold cyan]Show batch jobs, or refresh the state of one.[/bold cyan]
+
+    Refreshing resumes an interrupted job: a missing upload or submission is done first.
+    """
+    from .backfill import advance_job, list_jobs, load_job
+
+    if job_id is None:
+        for job in list_jobs():
+            _print_batch_job(job)
+        return
+
+    load_env()
+    config = load_file(config_file) if config_file else load_config()
+
+    job = load_job(job_id)
+    job = advance_job(job, _batch_model(config, job))
+    _print_batch_job(job)
+
+@batch_app.command('results')
+def batch_results(
+    job_id: Annotated[str, typer.Argument(help="Job to collect")],
+    wait: Annotated[bool, typer.Option(is_flag=True, help="Poll until the job finishes")] = False,
+    poll_interval: Annotated[float, typer.Option(help="Seconds between polls with [yellow]--wait[/yellow]")] = 30.0,
+    timeout: Annotated[Optional[float], typer.Option(help="Give up waiting after this many seconds")] = None,
+    show_thinking: Annotated[bool, typer.Option(is_flag=True, help="Keep the model's thinking process in the output")] = False,
+    config_file: Annotated[Optional[str], typer.Option(help="Path to the config file")] = None,
+):
+    """
+    [bold cyan]Print the messages of a finished batch job.[/bold cyan]
+
+    Outputs one JSON object per commit, oldest first: [cyan]{"commit": ..., "message": ...}[/cyan], or [cyan]"error"[/cyan] for failed requests.
+    """
+    import json
+    from .backfill import advance_job, load_job, wait_for_job
+
+    load_env()
+    config = load_file(config_file) if config_file else load_config()
+
+    job = load_job(job_id)
+    model_config = _batch_model(config, job)
+    if wait:
+        job = wait_for_job(job, model_config, poll_interval=poll_interval, timeout=timeout, on_poll=_print_batch_job)
+    else:
+        job = advance_job(job, model_config)
+
+    if not job.done:
+        _print_batch_job(job)
+        err_console.print("[warning]The batch job is not finished yet, use --wait to poll until it is.[/warning]")
+        raise typer.Exit(1)
+    if job.status != "completed":
+        _print_batch_job(job)
+        raise typer.Exit(1)
+
+    for sha in job.commits:
+        if sha in job.results:
+            thinking_content, message = split_thinking(job.results[sha])
+            if show_thinking and thinking_content:
+                message = f"<think>{thinking_content}</think>\n{message}"
+            typer.echo(json.dumps({"commit": sha, "message": message}))
+        else:
+            typer.echo(json.dumps({"commit": sha, "error": job.errors.get(sha, "missing from the batch output")}))
+
+context_app = typer.Typer(
+    rich_markup_mode="rich",
+    help="[bold cyan]Build the compact project context used in the system prompt.[/bold cyan]",
+)
+app.add_typer(context_app, name="context")
+
+def _print_project_context(rendered: dict):
+    for key in ("project_language", "project_description", "commit_guidelines"):
+        if rendered.get(key):
+            console.print(f"[info]{key}[/info]:", highlight=False)
+            console.print(rendered[key], markup=False, highlight=False)
+
+@context_app.command('build')
+def context_build():
+    """
+    [bold cyan]Derive the project context from the repository.[/bold cyan]
+
+    Collects the languages and main modules of the tracked files and the conventions of the recent commit messages
+    (Conventional Commits types and scopes, gitmoji, title length, bodies) into [cyan].commitcraft/project_context.json[/cyan].
+
+    The context is refreshed incrementally as HEAD moves and fills the [yellow]project_language[/yellow],
+    [yellow]project_description[/yellow] and [yellow]commit_guidelines[/yellow] values your configuration leaves empty.
+    """
+    from .project_context import build_context, render_context, save_context
+
+    context = build_context()
+    save_context(context)
+    err_console.print(f"[success]Project context built from {sum(context.files.values())} files and {len(context.messages)} commits.[/success]", highlight=False)
+    _print_project_context(render_context(context))
+
+@context_app.command('show')
+def context_show():
+    """
+    [bold cyan]Show the project context, refreshed to the current HEAD.[/bold cyan]
+    """
+    from .project_context import project_context
+
+    rendered = project_context()
+    if not rendered:
+        err_console.print("[warning]No project context yet, run[/warning] [cyan]CommitCraft context build[/cyan]")
+        raise typer.Exit(1)
+    _print_project_context(rendered)
+
+history_app = typer.Typer(
+    rich_markup_mode="rich",
+    help="[bold cyan]Index past commits used as examples of the house style.[/bold cyan]",
+)
+app.add_typer(history_app, name="history")
+
+@history_app.command('build')
+def history_build(
+    config_file: Annotated[
+        Optional[str],
+        typer.Option(help="Path to the config file (TOML, YAML, or JSON)")
+    ] = None,
+):
+    """
+    [bold cyan]Index the commit history for few-shot examples.[/bold cyan]
+
+    Stores the message and a fingerprint of the diff of the last [yellow]max_commits[/yellow] commits in
+    [cyan].commitcraft/history.db[/cyan]. Once built, the index is updated incrementally before every generation
+    and the [yellow]top_k[/yellow] past commits most similar to the staged changes are added to the prompt.
+    """
+    from .history import HistoryIndex
+
+    config = load_file(config_file) if config_file else load_config()
+    history_config = HistoryConfig(**config.get('history', {}))
+    index = HistoryIndex(history_config.path)
+    with Live(Spinner("dots", text="Indexing commits..."), console=err_console, transient=True) as live:
+        added = index.update(
+            history_config.max_commits,
+            progress=lambda done, total: live.update(Spinner("dots", text=f"Indexing commits {done}/{total}")),
+        )
+    err_console.print(f"[success]{added} commits indexed in {history_config.path}.[/success]", highlight=False)
+
 @app.command('hook')
 def hook(
     uninstall: Annotated[
@@ -542,27 +1079,122 @@ def hook(
     else:
         _install_hook(global_hook, interactive=not no_interactive)
 
+HOOK_CLUES = {
+    'b': ('bug', "Describe the bug fix (optional): "),
+    'f': ('feat', "Describe the feature (optional): "),
+    'd': ('docs', "Describe the documentation change (optional): "),
+    'r': ('refact', "Describe the refactoring (optional): "),
+}
+
+def _prompt_clues() -> list:
+    """Ask the CommitClues on the terminal, the hook's stdin is not the terminal"""
+    try:
+        tty = open("/dev/tty", "r+")
+    except OSError:
+        return []  # No terminal (GUI client, CI), generate without clues
+    with tty:
+        tty.write(
+            "CommitCraft: What type of commit is this?\n"
+            "  [b] Bug fix\n"
+            "  [f] Feature\n"
+            "  [d] Documentation\n"
+            "  [r] Refactoring\n"
+            "  [n] None (no specific type)\n"
+            "Your choice (b/f/d/r/n) [n]: "
+        )
+        tty.flush()
+        choice = tty.readline().strip().lower()
+        if choice not in HOOK_CLUES:
+            return []
+        clue, question = HOOK_CLUES[choice]
+        tty.write(question)
+        tty.flush()
+        description = tty.readline().strip()
+    return [f"--{clue}-desc", description] if description else [f"--{clue}"]
+
+def _write_message(msg_file: str, message: str):
+    """Prepend `message` to the commit message file, replaced atomically"""
+    with open(msg_file) as f:
+        current = f.read()
+    with open(msg_file + ".tmp", "w") as f:
+        f.write(f"{message}\n\n# AI-generated commit message above. Edit as needed.\n{current}")
+    os.replace(msg_file + ".tmp", msg_file)
+
+@app.command('hook-run')
+def hook_run(
+    msg_file: Annotated[str, typer.Argument(help="Commit message file, given by git")],
+    source: Annotated[str, typer.Argument(help="Source of the commit message, given by git")] = "",
+    hook_version: Annotated[Optional[str], typer.Option(help="Version that installed the hook")] = None,
+    no_interactive: Annotated[bool, typer.Option("--no-interactive", is_flag=True, help="Don't prompt for CommitClues")] = False,
+    global_hook: Annotated[bool, typer.Option("--global", is_flag=True, help="The hook was installed globally")] = False,
+):
+    """
+    [bold cyan]Run the prepare-commit-msg hook.[/bold cyan]
+
+    Called by the hook installed with [cyan]CommitCraft hook[/cyan]: checks the hook version, skips rebases, merges,
+    squashes and amends, prompts for CommitClues and prepends the generated message to [yellow]MSG_FILE[/yellow],
+    all in one process reading the staged diff once. The main command options are read from the environment
+    ([cyan]COMMITCRAFT_MODEL[/cyan], ...). Errors never block the commit.
+    """
+    from .git_backend import get_git
+
+    if hook_version:
+        try:
+            import importlib.metadata
+            installed_version = importlib.metadata.version("commitcraft")
+        except Exception:
+            installed_version = None
+        if installed_version and installed_version != hook_version:
+            update_command = "CommitCraft hook" + (" --global" if global_hook else "") + (" --no-interactive" if no_interactive else "")
+            err_console.print(f"[warning]⚠️  CommitCraft hook is outdated[/warning] [dim](hook: [bold red]{hook_version}[/bold red], installed: [bold green]{installed_version}[/bold green])[/dim]", highlight=False)
+            err_console.print(f"   [bold cyan]Update with:[/bold cyan] [bold]{update_command}[/bold]\n", highlight=False)
+
+    # Only generate a message for regular commits (not merge, squash, amend, etc.)
+    if source not in ("", "message"):
+        return
+
+    try:
+        git_dir = get_git().git_dir()
+        if git_dir and any(os.path.isdir(os.path.join(git_dir, name)) for name in ("rebase-merge", "rebase-apply")):
+            return
+
+        # Main command options from the environment, as the separate CommitCraft process used to read them
+        params = typer.main.get_command(app).make_context("CommitCraft", []).params
+        load_env()
+        diff = get_diff(ignored_patterns(params['ignore']))
+        if not diff.strip():
+            return  # Nothing staged, or only ignored files
+
+        clue_args = [] if no_interactive else _prompt_clues()
+        if clue_args:
+            params = {**params, **typer.main.get_command(app).make_context("CommitCraft", clue_args).params}
+        response = generate(diff, params)
+        if not response:
+            return
+        _, message = split_thinking(response)
+        if message.strip():
+            _write_message(msg_file, message.strip())
+    except typer.Exit:
+        return
+    except Exception as e:
+        err_console.print(f"[danger]CommitCraft:[/danger] {e}", highlight=False)
+
 def _install_hook(global_hook: bool, interactive: bool = True):
     """Install the CommitCraft git hook."""
     from pathlib import Path
     import subprocess
+    from .git_backend import get_git
 
+    git = get_git()
     if global_hook:
         # Get git template directory
         try:
-            result = subprocess.run(
-                ["git", "config", "--global", "init.templatedir"],
-                capture_output=True, text=True
-            )
-            template_dir = result.stdout.strip()
+            template_dir = git.config_get("init.templatedir", global_config=True)
 
             if not template_dir:
                 # Set default template directory
                 template_dir = str(Path.home() / ".git-templates")
-                subprocess.run(
-                    ["git", "config", "--global", "init.templatedir", template_dir],
-                    check=True
-                )
+                git.config_set("init.templatedir", template_dir, global_config=True)
                 console.print(f"[cyan]Set git template directory to:[/cyan] {template_dir}")
 
             hook_dir = Path(template_dir) / "hooks"
@@ -571,15 +1203,13 @@ def _install_hook(global_hook: bool, interactive: bool = True):
             raise typer.Exit(1)
     else:
         # Check if we're in a git repository
-        try:
-            subprocess.run(["git", "rev-parse", "--git-dir"],
-                         capture_output=True, check=True)
-        except subprocess.CalledProcessError:
+        git_dir = git.git_dir()
+        if not git_dir:
             console.print("[danger]Error:[/danger] Not a git repository", style="red")
             console.print("Run [cyan]git init[/cyan] first or use [cyan]--global[/cyan] for global hook")
             raise typer.Exit(1)
 
-        hook_dir = Path(".git/hooks")
+        hook_dir = Path(git_dir) / "hooks"
 
     # Create hooks directory if it doesn't exist
     hook_dir.mkdir(parents=True, exist_ok=True)
@@ -610,177 +1240,29 @@ def _install_hook(global_hook: bool, interactive: bool = True):
     hook_location = "global" if is_global_install else "local"
     hook_mode = "interactive" if interactive else "non-interactive"
 
-    # Build the update command based on mode and location
-    update_flags = ""
+    # Mode and location are passed on so hook-run can print the right update command
+    run_flags = f' --hook-version "{package_version}"'
     if is_global_install:
-        update_flags += " --global"
+        run_flags += " --global"
     if not interactive:
-        update_flags += " --no-interactive"
-
-    update_command = f"CommitCraft hook{update_flags}"
-
-    # Create the hook script based on interactive mode
-    if interactive:
-        hook_script = f'''#!/bin/sh
-# CommitCraft Git Hook (Interactive Mode)
-# Automatically generates commit messages using AI with optional CommitClues
-# Hook Version: {package_version}
-# Hook Location: {hook_location}
-# Hook Mode: {hook_mode}
-
-COMMIT_MSG_FILE=$1
-COMMIT_SOURCE=$2
-
-# Check hook version
-HOOK_VERSION="{package_version}"
-INSTALLED_VERSION=$(CommitCraft --version 2>/dev/null | sed 's/\\x1b\\[[0-9;]*m//g' | grep -oE "[0-9]+\\.[0-9]+\\.[0-9]+" || echo "unknown")
-
-if [ "$HOOK_VERSION" != "$INSTALLED_VERSION" ] && [ "$INSTALLED_VERSION" != "unknown" ]; then
-    printf "\\033[1;33m⚠️  CommitCraft hook is outdated\\033[0m \\033[2m(hook: \\033[1;31m%s\\033[0m\\033[2m, installed: \\033[1;32m%s\\033[0m\\033[2m)\\033[0m\\n" "$HOOK_VERSION" "$INSTALLED_VERSION" >&2
-    printf "   \\033[1;36mUpdate with:\\033[0m \\033[1;97m{update_command}\\033[0m\\n" >&2
-    echo "" >&2
-fi
-
-# Skip if rebase is in progress
-if [ -d ".git/rebase-merge" ] || [ -d ".git/rebase-apply" ]; then
-    exit 0
-fi
+        run_flags += " --no-interactive"
 
-# Only generate message for regular commits (not merge, squash, etc.)
-if [ -z "$COMMIT_SOURCE" ] || [ "$COMMIT_SOURCE" = "message" ]; then
-    # Check if there are staged changes
-    if git diff --cached --quiet; then
-        exit 0
-    fi
-
-    # Interactive prompt for commit type
-    # Redirect input from terminal to make read work in git hook
-    exec < /dev/tty
-
-    echo "CommitCraft: What type of commit is this?"
-    echo "  [b] Bug fix"
-    echo "  [f] Feature"
-    echo "  [d] Documentation"
-    echo "  [r] Refactoring"
-    echo "  [n] None (no specific type)"
-    printf "Your choice (b/f/d/r/n) [n]: "
-    read -r COMMIT_TYPE
-
-    # Build CommitCraft arguments based on user input
-    COMMITCRAFT_ARGS=""
-
-    case "$COMMIT_TYPE" in
-        b|B)
-            printf "Describe the bug fix (optional): "
-            read -r BUG_DESC
-            if [ -n "$BUG_DESC" ]; then
-                COMMITCRAFT_ARGS="--bug-desc"
-                COMMITCRAFT_DESC="$BUG_DESC"
-            else
-                COMMITCRAFT_ARGS="--bug"
-            fi
-            ;;
-        f|F)
-            printf "Describe the feature (optional): "
-            read -r FEAT_DESC
-            if [ -n "$FEAT_DESC" ]; then
-                COMMITCRAFT_ARGS="--feat-desc"
-                COMMITCRAFT_DESC="$FEAT_DESC"
-            else
-                COMMITCRAFT_ARGS="--feat"
-            fi
-            ;;
-        d|D)
-            printf "Describe the documentation change (optional): "
-            read -r DOCS_DESC
-            if [ -n "$DOCS_DESC" ]; then
-                COMMITCRAFT_ARGS="--docs-desc"
-                COMMITCRAFT_DESC="$DOCS_DESC"
-            else
-                COMMITCRAFT_ARGS="--docs"
-            fi
-            ;;
-        r|R)
-            printf "Describe the refactoring (optional): "
-            read -r REFACT_DESC
-            if [ -n "$REFACT_DESC" ]; then
-                COMMITCRAFT_ARGS="--refact-desc"
-                COMMITCRAFT_DESC="$REFACT_DESC"
-            else
-                COMMITCRAFT_ARGS="--refact"
-            fi
-            ;;
-        *)
-            # No specific type, use default
-            ;;
-    esac
-
-    # Generate commit message with CommitCraft
-    # Pass description as a separate argument to avoid quoting issues
-    if [ -n "$COMMITCRAFT_DESC" ]; then
-        GENERATED_MSG=$(CommitCraft $COMMITCRAFT_ARGS "$COMMITCRAFT_DESC")
-    elif [ -n "$COMMITCRAFT_ARGS" ]; then
-        GENERATED_MSG=$(CommitCraft $COMMITCRAFT_ARGS)
-    else
-        GENERATED_MSG=$(CommitCraft)
-    fi
-
-    if [ $? -eq 0 ] && [ -n "$GENERATED_MSG" ]; then
-        # Prepend generated message to commit message file
-        echo "$GENERATED_MSG" > "$COMMIT_MSG_FILE.tmp"
-        echo "" >> "$COMMIT_MSG_FILE.tmp"
-        echo "# AI-generated commit message above. Edit as needed." >> "$COMMIT_MSG_FILE.tmp"
-        cat "$COMMIT_MSG_FILE" >> "$COMMIT_MSG_FILE.tmp"
-        mv "$COMMIT_MSG_FILE.tmp" "$COMMIT_MSG_FILE"
-    fi
-fi
-'''
-    else:
-        hook_script = f'''#!/bin/sh
-# CommitCraft Git Hook (Non-Interactive Mode)
-# Automatically generates commit messages using AI
+    # The hook only hands over to `CommitCraft hook-run`, which does the rest in one process
+    hook_script = f'''#!/bin/sh
+# CommitCraft Git Hook ({"Interactive" if interactive else "Non-Interactive"} Mode)
+# Automatically generates commit messages using AI{" with optional CommitClues" if interactive else ""}
 # Hook Version: {package_version}
 # Hook Location: {hook_location}
 # Hook Mode: {hook_mode}
 
-COMMIT_MSG_FILE=$1
-COMMIT_SOURCE=$2
-
-# Check hook version
-HOOK_VERSION="{package_version}"
-INSTALLED_VERSION=$(CommitCraft --version 2>/dev/null | sed 's/\\x1b\\[[0-9;]*m//g' | grep -oE "[0-9]+\\.[0-9]+\\.[0-9]+" || echo "unknown")
-
-if [ "$HOOK_VERSION" != "$INSTALLED_VERSION" ] && [ "$INSTALLED_VERSION" != "unknown" ]; then
-    printf "\\033[1;33m⚠️  CommitCraft hook is outdated\\033[0m \\033[2m(hook: \\033[1;31m%s\\033[0m\\033[2m, installed: \\033[1;32m%s\\033[0m\\033[2m)\\033[0m\\n" "$HOOK_VERSION" "$INSTALLED_VERSION" >&2
-    printf "   \\033[1;36mUpdate with:\\033[0m \\033[1;97m{update_command}\\033[0m\\n" >&2
-    echo "" >&2
-fi
-
-# Skip if rebase is in progress
-if [ -d ".git/rebase-merge" ] || [ -d ".git/rebase-apply" ]; then
-    exit 0
-fi
-
-# Only generate message for regular commits (not merge, squash, etc.)
-if [ -z "$COMMIT_SOURCE" ] || [ "$COMMIT_SOURCE" = "message" ]; then
-    # Check if there are staged changes
-    if git diff --cached --quiet; then
-        exit 0
-    fi
-
-    # Generate commit message with CommitCraft
-    # stderr goes to terminal (shows loading spinner), stdout captured
-    GENERATED_MSG=$(CommitCraft)
-
-    if [ $? -eq 0 ] && [ -n "$GENERATED_MSG" ]; then
-        # Prepend generated message to commit message file
-        echo "$GENERATED_MSG" > "$COMMIT_MSG_FILE.tmp"
-        echo "" >> "$COMMIT_MSG_FILE.tmp"
-        echo "# AI-generated commit message above. Edit as needed." >> "$COMMIT_MSG_FILE.tmp"
-        cat "$COMMIT_MSG_FILE" >> "$COMMIT_MSG_FILE.tmp"
-        mv "$COMMIT_MSG_FILE.tmp" "$COMMIT_MSG_FILE"
-    fi
+command -v CommitCraft >/dev/null 2>&1 || exit 0
+CommitCraft hook-run "$1" "$2"{run_flags}
+# 2 is a usage error: a CommitCraft older than this hook, without hook-run
+if [ $? -eq 2 ]; then
+    echo "CommitCraft: this hook needs a newer CommitCraft, the commit message is left as is" >&2
 fi
+# Never block the commit
+exit 0
 '''
 
     # Write the hook script
@@ -808,26 +1290,19 @@ fi
 def _uninstall_hook(global_hook: bool):
     """Uninstall the CommitCraft git hook."""
     from pathlib import Path
-    import subprocess
+    from .git_backend import get_git
 
+    git = get_git()
     if global_hook:
-        try:
-            result = subprocess.run(
-                ["git", "config", "--global", "init.templatedir"],
-                capture_output=True, text=True
-            )
-            template_dir = result.stdout.strip()
+        template_dir = git.config_get("init.templatedir", global_config=True)
 
-            if not template_dir:
-                console.print("[yellow]No global git template directory configured.[/yellow]")
-                raise typer.Exit(0)
+        if not template_dir:
+            console.print("[yellow]No global git template directory configured.[/yellow]")
+            raise typer.Exit(0)
 
-            hook_path = Path(template_dir) / "hooks" / "prepare-commit-msg"
-        except subprocess.CalledProcessError:
-            console.print("[danger]Error reading git configuration.[/danger]", style="red")
-            raise typer.Exit(1)
+        hook_path = Path(template_dir) / "hooks" / "prepare-commit-msg"
     else:
-        hook_path = Path(".git/hooks/prepare-commit-msg")
+        hook_path = Path(git.git_dir() or ".git") / "hooks" / "prepare-commit-msg"
 
     if not hook_path.exists():
         console.print("[yellow]No CommitCraft hook found.[/yellow]")
@@ -0,0 +1,243 @@
+import json
+import os
+import time
+import uuid
+from typing import Callable, List, Optional
+
+from pydantic import BaseModel
+
+from .CommitCraft import (
+    CommitCraftInput,
+    EmojiConfig,
+    LModel,
+    PreprocessConfig,
+    RateLimitConfig,
+    build_prompts,
+    finish_message,
+    generation_options,
+    response_schema,
+)
+from .git_backend import get_git
+from .local_files import make_local_path
+from .providers import GenerationRequest, get_provider
+from .preprocess import preprocess_diff
+from .scheduler import Deadline, scheduler
+
+BATCH_DIR = os.path.join(".commitcraft", "batches")
+TERMINAL_STATUSES = ("completed", "failed", "expired", "cancelled")
+
+
+def commit_range(revisions: str) -> list[str]:
+    """Non merge commits of a revision range (e.g. `v1.0..HEAD`), oldest first"""
+    return get_git().rev_list(revisions)
+
+
+def commit_diff(sha: str, ignored_patterns: Optional[List[str]] = None) -> str:
+    """Diff of a commit against its parent, as `git diff --staged -M` would have shown it"""
+    return get_git().commit_diff(sha, ignored_patterns)
+
+
+class BatchJob(BaseModel):
+    """State of a batch job, saved after every step so it can be resumed"""
+
+    id: str
+    revisions: str
+    profile: Optional[str] = None  # `--provider` value, used to resolve the API key again
+    model: dict  # LModel without its API key
+    emoji: bool = True  # Structured answers get their emoji field in the title
+    commits: List[str] = []
+    status: str = "created"
+    input_file_id: Optional[str] = None
+    batch_id: Optional[str] = None
+    output_file_id: Optional[str] = None
+    error_file_id: Optional[str] = None
+    request_counts: dict = {}
+    results: dict[str, str] = {}
+    errors: dict[str, str] = {}
+    collected: bool = False  # Output and error files downloaded and mapped to commits
+    created_at: float = 0.0
+
+    @property
+    def done(self) -> bool:
+        return self.status in TERMINAL_STATUSES and (
+            self.status != "completed" or self.collected
+        )
+
+
+def job_path(job_id: str, suffix: str = ".json", batch_dir: str = BATCH_DIR) -> str:
+    return os.path.join(batch_dir, f"{job_id}{suffix}")
+
+
+def save_job(job: BatchJob, batch_dir: str = BATCH_DIR):
+    make_local_path(batch_dir, is_dir=True)
+    path = job_path(job.id, batch_dir=batch_dir)
+    with open(path + ".tmp", "w") as f:
+        f.write(job.model_dump_json(indent=2))
+    os.replace(path + ".tmp", path)
+
+
+def load_job(job_id: str, batch_dir: str = BATCH_DIR) -> BatchJob:
+    with open(job_path(job_id, batch_dir=batch_dir)) as f:
+        return BatchJob.model_validate_json(f.read())
+
+
+def list_jobs(batch_dir: str = BATCH_DIR) -> list[BatchJob]:
+    if not os.path.isdir(batch_dir):
+        return []
+    jobs = [
+        load_job(name[: -len(".json")], batch_dir)
+        for name in os.listdir(batch_dir)
+        if name.endswith(".json")
+    ]
+    return sorted(jobs, key=lambda job: job.created_at)
+
+
+def create_job(
+    revisions: str,
+    model: LModel,
+    context: dict[str, str] = {},
+    emoji: Optional[EmojiConfig] = None,
+    ignored_patterns: Optional[List[str]] = None,
+    preprocess: Optional[PreprocessConfig] = None,
+    profile: Optional[str] = None,
+    batch_dir: str = BATCH_DIR,
+) -> BatchJob:
+    """Write the JSONL input file with one request per commit of `revisions`"""
+    provider = get_provider(model.provider)
+    if not provider.capabilities.batching:
+        raise ValueError(f"The '{model.provider_name}' provider has no batch API")
+
+    job = BatchJob(
+        id=time.strftime("%Y%m%d-%H%M%S-") + uuid.uuid4().hex[:6],
+        revisions=revisions,
+        profile=profile,
+        model=model.model_dump(mode="json", exclude={"api_key"}),
+        emoji=bool(emoji and emoji.emoji_convention),
+        created_at=time.time(),
+    )
+
+    make_local_path(batch_dir, is_dir=True)
+    with open(job_path(job.id, ".input.jsonl", batch_dir), "w") as input_file:
+        for sha in commit_range(revisions):
+            diff = commit_diff(sha, ignored_patterns)
+            if not diff.strip():
+                continue
+            if preprocess and preprocess.enabled:
+                diff = preprocess_diff(
+                    diff,
+                    preprocess.disabled_drivers,
+                    old_revision=f"{sha}^",
+                    new_revision=sha,
+                    attributes=preprocess.gitattributes,
+                )
+            system_prompt, prompt = build_prompts(
+                CommitCraftInput(diff=diff), model, context, emoji
+            )
+            line = provider.batch_line(
+                sha,
+                GenerationRequest(
+                    model=model,
+                    system_prompt=system_prompt,
+                    prompt=prompt,
+                    options=generation_options(diff, model),
+                    response_schema=response_schema(model),
+                    deadline=Deadline(),
+                    send=lambda request: request(),
+                ),
+            )
+            input_file.write(json.dumps(line) + "\n")
+            job.commits.append(sha)
+
+    if not job.commits:
+        os.remove(job_path(job.id, ".input.jsonl", batch_dir))
+        raise ValueError(f"No commit with changes in '{revisions}'")
+    save_job(job, batch_dir)
+    return job
+
+
+def advance_job(job: BatchJob, model: LModel, batch_dir: str = BATCH_DIR) -> BatchJob:
+    """Run the next steps of a job: upload, create, poll once and collect the results.
+
+    Every step is saved before the next one starts, so an interrupted job resumes
+    where it stopped instead of uploading or paying for the batch twice. Uploads
+    and batch creations are not idempotent and never retried; a creation whose
+    answer was lost is looked up by its job tag before creating another batch.
+    """
+    provider = get_provider(model.provider)
+    rate_limit = model.rate_limit if model.rate_limit else RateLimitConfig()
+    single_attempt = rate_limit.model_copy(update={"max_retries": 0})
+    limit_key = (model.provider_name, str(model.host or ""), model.api_key or "", "batch")
+
+    def send(request: Callable, config: RateLimitConfig = rate_limit):
+        return scheduler.call(limit_key, config, request)
+
+    if job.input_file_id is None:
+        job.input_file_id = send(
+            lambda: provider.upload_batch(model, job_path(job.id, ".input.jsonl", batch_dir)),
+            single_attempt,
+        )
+        job.status = "uploaded"
+        save_job(job, batch_dir)
+
+    if job.batch_id is None:
+        if job.status == "submitting":
+            # The last attempt may have started the batch before failing
+            job.batch_id = send(lambda: provider.find_batch(model, job.id))
+        if job.batch_id is None:
+            job.status = "submitting"
+            save_job(job, batch_dir)
+            job.batch_id = send(
+                lambda: provider.create_batch(model, job.input_file_id, job.id), single_attempt
+            )
+        job.status = "submitted"
+        save_job(job, batch_dir)
+
+    if job.status not in TERMINAL_STATUSES:
+        state = send(lambda: provider.retrieve_batch(model, job.batch_id))
+        job.status = state["status"]
+        job.output_file_id = state["output_file_id"]
+        job.error_file_id = state["error_file_id"]
+        job.request_counts = state["request_counts"]
+        save_job(job, batch_dir)
+
+    if job.status == "completed" and not job.done:
+        for file_id, suffix in ((job.output_file_id, ".output.jsonl"), (job.error_file_id, ".errors.jsonl")):
+            if not file_id:
+                continue
+            content = send(lambda: provider.download_batch(model, file_id))
+            with open(job_path(job.id, suffix, batch_dir), "w") as f:
+                f.write(content)
+            for raw_line in content.splitlines():
+                if not raw_line.strip():
+                    continue
+                custom_id, response, error = provider.parse_batch_line(json.loads(raw_line))
+                if response is not None:
+                    job.results[custom_id] = finish_message(response, model, job.emoji)
+                else:
+                    job.errors[custom_id] = error or "unknown error"
+        job.collected = True
+        save_job(job, batch_dir)
+
+    return job
+
+
+def wait_for_job(
+    job: BatchJob,
+    model: LModel,
+    poll_interval: float = 30.0,
+    timeout: Optional[float] = None,
+    batch_dir: str = BATCH_DIR,
+    on_poll: Optional[Callable[[BatchJob], None]] = None,
+) -> BatchJob:
+    """Advance the job until it is done or `timeout` seconds went by"""
+    deadline = Deadline(timeout)
+    while True:
+        job = advance_job(job, model, batch_dir)
+        if on_poll:
+            on_poll(job)
+        if job.done:
+            return job
+        remaining = deadline.remaining()
+        if remaining is not None and remaining <= 0:
+            return job
+        deadline.wait(poll_interval if remaining is None else min(poll_interval, remaining))
@@ -0,0 +1,80 @@
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Callable
+
+
+class MicroBatcher:
+    """Collects submitted requests for a short window and dispatches them together.
+
+    While other requests are running, the first request of a batch opens a
+    `window` seconds window; the batch is flushed when it closes or when
+    `max_batch_size` requests are waiting. A lone request on an idle host is
+    dispatched at once, waiting only pays off under load. Each request of a
+    flushed batch runs concurrently on the shared worker pool, so they reach the
+    backend together on the shared client (one connection with HTTP/2), and its
+    result is routed back to the caller through a Future.
+    """
+
+    def __init__(self, run: Callable[[Any], Any], window: float = 0.005, max_batch_size: int = 16):
+        self.run = run
+        self.window = window
+        self.max_batch_size = max_batch_size
+        self._queue: list[tuple[Any, Future]] = []
+        self._running = 0  # Dispatched requests not finished yet
+        self._cond = threading.Condition()
+        self._executor = ThreadPoolExecutor(
+            max_workers=max_batch_size, thread_name_prefix="commitcraft-batch"
+        )
+        self._collector = threading.Thread(target=self._collect, daemon=True)
+        self._collector.start()
+
+    def submit(self, payload: Any) -> Future:
+        future: Future = Future()
+        with self._cond:
+            self._queue.append((payload, future))
+            self._cond.notify()
+        return future
+
+    def _collect(self):
+        while True:
+            with self._cond:
+                while not self._queue:
+                    self._cond.wait()
+                if len(self._queue) > 1 or self._running:
+                    closes_at = time.monotonic() + self.window
+                    while len(self._queue) < self.max_batch_size:
+                        remaining = closes_at - time.monotonic()
+                        if remaining <= 0:
+                            break
+                        self._cond.wait(remaining)
+                batch = self._queue[: self.max_batch_size]
+                self._queue = self._queue[self.max_batch_size:]
+                self._running += len(batch)
+            for payload, future in batch:
+                self._executor.submit(self._dispatch, payload, future)
+
+    def _dispatch(self, payload: Any, future: Future):
+        try:
+            if not future.set_running_or_notify_cancel():
+                return
+            try:
+                future.set_result(self.run(payload))
+            except BaseException as e:
+                future.set_exception(e)
+        finally:
+            with self._cond:
+                self._running -= 1
+
+
+_batchers: dict[tuple, MicroBatcher] = {}
+_batchers_lock = threading.Lock()
+
+
+def get_batcher(key: tuple, run: Callable[[Any], Any], window: float, max_batch_size: int) -> MicroBatcher:
+    """Process wide batcher for `key`, created on first use"""
+    with _batchers_lock:
+        batcher = _batchers.get(key)
+        if batcher is None:
+            batcher = _batchers[key] = MicroBatcher(run, window, max_batch_size)
+        return batcher
@@ -0,0 +1,210 @@
+import hashlib
+import json
+import re
+import sqlite3
+import threading
+import time
+from collections import Counter, OrderedDict
+from contextlib import contextmanager
+from typing import Any, Optional
+
+from .local_files import make_local_path
+
+
+def cache_key(*parts: Any) -> str:
+    """Stable digest of JSON serializable parts (input, model, context, emoji...)"""
+    payload = json.dumps(parts, sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+class ResponseCache:
+    """Thread safe in-memory LRU cache of generated messages with a time to live"""
+
+    def __init__(self, max_entries: int = 1024, ttl: Optional[float] = 3600):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries: OrderedDict[str, tuple[float, str]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[str]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            stored_at, value = entry
+            if self.ttl is not None and time.monotonic() - stored_at > self.ttl:
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key: str, value: str):
+        if self.max_entries <= 0:
+            return
+        with self._lock:
+            self._entries[key] = (time.monotonic(), value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+HUNK_HEADER = re.compile(r"^@@ -\d+(?:,\d+)? \+\d+(?:,\d+)? @@")
+WHITESPACE = re.compile(r"\s+")
+# Lines that change on every rebase or cherry-pick without changing the content
+VOLATILE_PREFIXES = ("index ", "similarity index ", "dissimilarity index ", "\\ No newline")
+MAX_FINGERPRINT_CHARS = 200_000  # Only the start of huge diffs is fingerprinted
+
+
+def normalize_diff(diff: str) -> str:
+    """Drop what differs between copies of the same change: hunk offsets, blob
+    hashes and whitespace, keeping file names and changed lines."""
+    lines = []
+    for line in diff.splitlines():
+        if line.startswith(VOLATILE_PREFIXES):
+            continue
+        line = HUNK_HEADER.sub("@@", line)
+        line = WHITESPACE.sub(" ", line).strip()
+        if line and line not in ("+", "-"):
+            lines.append(line)
+    return "\n".join(lines)
+
+
+def change_features(diff: str) -> str:
+    """Lines that make a change what it is: the file paths and the added and
+    removed lines, whitespace normalized. Context lines are left out, two
+    unrelated edits of the same spot share all of them."""
+    features = []
+    for line in diff.splitlines():
+        if line.startswith("diff --git "):
+            features.append(line)
+        elif line.startswith(("+", "-")) and not line.startswith(("+++ ", "--- ")):
+            line = line[0] + WHITESPACE.sub(" ", line[1:]).strip()
+            if len(line) > 1:
+                features.append(line)
+    return "\n".join(features)
+
+
+def simhash(text: str, bits: int = 64) -> int:
+    """SimHash fingerprint of a text, using its lines as features.
+
+    Diffs sharing most of their lines get fingerprints a few bits apart.
+    """
+    weights = [0] * bits
+    for feature, count in Counter(text.splitlines()).items():
+        value = int.from_bytes(hashlib.blake2b(feature.encode(), digest_size=bits // 8).digest(), "big")
+        for bit in range(bits):
+            weights[bit] += count if value >> bit & 1 else -count
+    return sum(1 << bit for bit in range(bits) if weights[bit] > 0)
+
+
+def diff_fingerprint(diff: str) -> int:
+    """SimHash of a diff's paths and changed lines, shared by the message cache
+    and the history index so both find the same changes similar."""
+    return simhash(change_features(diff[:MAX_FINGERPRINT_CHARS]))
+
+
+def similarity(a: int, b: int, bits: int = 64) -> float:
+    """Share of equal bits between two fingerprints, 1.0 for identical ones"""
+    return 1 - (a ^ b).bit_count() / bits
+
+
+def signed64(value: int) -> int:
+    # SQLite integers are signed 64 bits
+    return value - (1 << 64) if value >= 1 << 63 else value
+
+
+class SimilarityCache:
+    """Persistent cache of generated messages looked up by diff similarity.
+
+    Entries live in a SQLite file and are grouped by `scope`, a digest of
+    everything besides the diff that shapes the message (prompts, clues, model).
+    An exact match on the normalized diff is found through its hash, near
+    duplicates by comparing SimHash fingerprints of the changed lines.
+    """
+
+    def __init__(self, path: str, max_entries: int = 5000):
+        self.path = path
+        self.max_entries = max_entries
+        self._ready = False
+
+    @contextmanager
+    def _connect(self):
+        if not self._ready:
+            make_local_path(self.path)
+        conn = sqlite3.connect(self.path, timeout=5)
+        if not self._ready:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS entries ("
+                "id INTEGER PRIMARY KEY, scope TEXT NOT NULL, digest TEXT NOT NULL, "
+                "fingerprint INTEGER NOT NULL, message TEXT NOT NULL, created_at REAL NOT NULL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS entries_scope ON entries (scope, digest)")
+            self._ready = True
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def exact(self, scope: str, diff: str) -> Optional[str]:
+        """Cached message of the same normalized diff in `scope`, None when there is none"""
+        digest = hashlib.sha256(normalize_diff(diff).encode()).hexdigest()
+        with self._connect() as conn:
+            row = conn.execute(
+                "SELECT message FROM entries WHERE scope = ? AND digest = ? ORDER BY id DESC LIMIT 1",
+                (scope, digest),
+            ).fetchone()
+        return row[0] if row else None
+
+    def nearest(self, scope: str, diff: str) -> Optional[tuple[str, float]]:
+        """Most similar cached (message, similarity) in `scope`, None when empty.
+
+        Only fit to be shown as an example: a high similarity doesn't make it
+        the same change.
+        """
+        fingerprint = diff_fingerprint(diff)
+        best = None
+        with self._connect() as conn:
+            for stored, message in conn.execute(
+                "SELECT fingerprint, message FROM entries WHERE scope = ? ORDER BY id DESC",
+                (scope,),
+            ):
+                score = similarity(fingerprint, stored % (1 << 64))
+                if best is None or score > best[1]:
+                    best = (message, score)
+            return best
+
+    def store(self, scope: str, diff: str, message: str):
+        normalized = normalize_diff(diff)
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT INTO entries (scope, digest, fingerprint, message, created_at) VALUES (?, ?, ?, ?, ?)",
+                (
+                    scope,
+                    hashlib.sha256(normalized.encode()).hexdigest(),
+                    signed64(diff_fingerprint(diff)),
+                    message,
+                    time.time(),
+                ),
+            )
+            conn.execute(
+                "DELETE FROM entries WHERE id <= (SELECT id FROM entries ORDER BY id DESC LIMIT 1 OFFSET ?)",
+                (self.max_entries,),
+            )
+
+
+_caches: dict[str, SimilarityCache] = {}
+_caches_lock = threading.Lock()
+
+
+def get_similarity_cache(path: str, max_entries: int = 5000) -> SimilarityCache:
+    """The cache of `path`, one instance per file for the process"""
+    with _caches_lock:
+        similar_cache = _caches.get(path)
+        if similar_cache is None:
+            similar_cache = _caches[path] = SimilarityCache(path, max_entries)
+        similar_cache.max_entries = max_entries
+        return similar_cache
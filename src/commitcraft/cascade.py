@@ -0,0 +1,53 @@
+import os
+import re
+from typing import Dict, Optional
+
+from .history import diff_paths
+from .project_context import CONVENTIONAL
+
+NAME_PARTS = re.compile(r"[_\-.]+")
+MIN_NAME_LENGTH = 4  # Shorter names (src, io, ...) match words by accident
+
+
+def path_names(diff: str) -> set[str]:
+    """Names a message can use for the changed files: file names, stems, their parts and directories"""
+    names = set()
+    for path in diff_paths(diff):
+        base = os.path.basename(path).lower()
+        stem = os.path.splitext(base)[0]
+        names.update((base, stem, *NAME_PARTS.split(stem)))
+    return {name for name in names if len(name) >= MIN_NAME_LENGTH}
+
+
+def draft_problems(message: str, diff: str, cascade) -> Dict[str, Optional[str]]:
+    """Outcome of each check on a draft (a CascadeConfig gives the rules): None when it passes, the problem otherwise"""
+    lines = message.strip().splitlines()
+    title = lines[0].strip() if lines else ""
+    problems = {}
+
+    if not title:
+        problems["length"] = "The message is empty."
+    elif len(title) > cascade.max_title_length:
+        problems["length"] = f"The title is {len(title)} characters long, keep it under {cascade.max_title_length}."
+    else:
+        problems["length"] = None
+
+    if cascade.conventional:
+        problems["conventional"] = (
+            None if CONVENTIONAL.match(title) else "The title doesn't follow Conventional Commits `type(scope): summary`."
+        )
+
+    if cascade.mention_paths:
+        names = path_names(diff)
+        text = message.lower()
+        problems["paths"] = (
+            None
+            if not names or any(name in text for name in names)
+            else "The message doesn't name any of the changed files or modules."
+        )
+    return problems
+
+
+def draft_score(problems: Dict[str, Optional[str]]) -> float:
+    """Share of the checks passed"""
+    return sum(problem is None for problem in problems.values()) / len(problems) if problems else 1.0
@@ -1,4 +1,5 @@
 import json
+import os
 from pathlib import Path
 from urllib.parse import urlparse
 from typing import Optional
@@ -10,6 +11,8 @@ from rich import print
 from rich.prompt import Prompt
 
 from .defaults import default
+from .model_catalog import get_catalog
+from .providers import available_providers, get_provider
 
 
 def validate_url(url: str) -> bool:
@@ -31,39 +34,27 @@ def get_masked_input(prompt_text):
 
 
 def fetch_models(provider, api_key=None, host=None):
-    try:
-        if provider == "ollama":
-            import ollama
-
-            client_args = {"host": host}
-            if api_key:
-                client_args["headers"] = {"Authorization": f"Bearer {api_key}"}
-            client = ollama.Client(**client_args)
-            return [m["name"] for m in client.list()["models"]]
-        elif provider == "openai":
-            from openai import OpenAI
-
-            client = OpenAI(api_key=api_key)
-            return [m.id for m in client.models.list()]
-        elif provider == "groq":
-            from groq import Groq
-
-            client = Groq(api_key=api_key)
-            return [m.id for m in client.models.list().data]
-        elif provider == "google":
-            from google import genai
-
-            client = genai.Client(api_key=api_key)
-            return [m.name for m in client.models.list()]
-        elif provider == "openai_compatible":
-            from openai import OpenAI
-
-            client = OpenAI(api_key=api_key, base_url=host)
-            return [m.id for m in client.models.list()]
-    except Exception:
-        # typer.secho(f"Debug: {e}", fg=typer.colors.RED)
-        return []
-    return []
+    # Cached in the app dir, and usually already fetched by `prefetch_models`
+    return get_catalog().models(provider, host=host, api_key=api_key)
+
+
+def prefetch_models(config: dict):
+    """Start listing the models of every configured provider in the background"""
+    targets = []
+    profiles = [(None, config.get("models") or {})] + list((config.get("providers") or {}).items())
+    for nickname, profile in profiles:
+        try:
+            provider = get_provider(profile.get("provider", "ollama"))
+        except Exception:
+            continue  # Unknown or uninstalled provider
+        if not provider.capabilities.model_listing:
+            continue
+        api_key = os.getenv(f"{nickname.upper()}_API_KEY") if nickname else None
+        if not api_key and provider.api_key_env:
+            api_key = os.getenv(provider.api_key_env)
+        targets.append((provider.name, profile.get("host"), api_key))
+    for target in targets:
+        get_catalog().fetch(*target)
 
 
 def load_existing_config(base_dir):
@@ -90,15 +81,8 @@ def configure_provider(
     Helper to configure a provider (either main or named).
     Returns a tuple (config_dict, api_key_info_dict, env_var_name)
     """
-    # Standard list for listing purposes
-    KNOWN_PROVIDERS = [
-        "ollama",
-        "ollama_cloud",
-        "openai",
-        "google",
-        "groq",
-        "openai_compatible",
-    ]
+    # Built-in and plugin providers, for listing purposes
+    KNOWN_PROVIDERS = available_providers()
 
     current_config = current_config or {}
 
@@ -188,25 +172,29 @@ def configure_provider(
     temp_api_key = None
     env_var_name = None
 
+    if final_provider_type == "llama_cpp":
+        # In-process GGUF model, no host, no API key and nothing to list
+        default_model = current_config.get("model", "")
+        while True:
+            model_path = get_input_with_default("Path to the GGUF model file", default_model)
+            if model_path.strip():
+                provider_config["model"] = model_path
+                break
+            print("[yellow]Model path cannot be empty.[/yellow]")
+        return provider_config, None, None
+
     if nickname:
         env_var_name = f"{nickname.upper()}_API_KEY"
         key_prompt_msg = f"API Key for {nickname} ({env_var_name})"
     else:
-        key_map = {
-            "openai": "OPENAI_API_KEY",
-            "groq": "GROQ_API_KEY",
-            "google": "GOOGLE_API_KEY",
-            "openai_compatible": "CUSTOM_API_KEY",
-            "ollama": "OLLAMA_API_KEY",
-        }
-        env_var_name = key_map.get(final_provider_type, "API_KEY")
+        env_var_name = get_provider(final_provider_type).api_key_env or "API_KEY"
         key_prompt_msg = f"{env_var_name}"
 
     # If existing config has api_key, we generally don't show it,
     # but we might want to check connectivity.
 
     models_list = []
-    if typer.confirm(
+    if get_provider(final_provider_type).capabilities.model_listing and typer.confirm(
         "Do you want to list available models? (May require API Key)", default=False
     ):
         if final_provider_type == "ollama":
@@ -230,14 +218,9 @@ def configure_provider(
         else:
             print("[red]No models found or error occurred.[/red]")
 
-    default_model = current_config.get("model", "qwen3")
-    if not current_config.get("model"):
-        if final_provider_type == "openai":
-            default_model = "gpt-3.5-turbo"
-        elif final_provider_type == "groq":
-            default_model = "qwen/qwen3-32b"
-        elif final_provider_type == "google":
-            default_model = "gemini-1.5-pro"
+    default_model = current_config.get("model")
+    if not default_model:
+        default_model = get_provider(final_provider_type).default_model or ""
 
     while True:
         model_name_input = get_input_with_default(
@@ -293,6 +276,7 @@ def interactive_config():
     # Load Existing Config
     existing_config, detected_format = load_existing_config(base_dir)
     is_edit_mode = bool(detected_format)
+    prefetch_models(existing_config)
 
     if is_edit_mode:
         print(
@@ -428,14 +412,7 @@ def interactive_config():
         "Do you want to add/configure additional providers?", default=False
     ):
         while True:
-            KNOWN_PROVIDERS = [
-                "ollama",
-                "ollama_cloud",
-                "openai",
-                "google",
-                "groq",
-                "openai_compatible",
-            ]
+            KNOWN_PROVIDERS = available_providers()
             typer.echo(f"Known providers: {', '.join(KNOWN_PROVIDERS)}")
 
             # 1. Ask for Provider Type
@@ -172,6 +172,10 @@ default={
     'bug' : 'This commit focus on fixing a bug',
     'feat' : 'This commit focus on a new feature',
     'docs' : 'This commit focus on docs',
-    'refact' : 'This commit focus on refactoring'
+    'refact' : 'This commit focus on refactoring',
+    'similar_change' : 'A very similar change was committed before with the message below, reuse its wording where it still applies',
+    'history_examples' : 'Messages of similar past commits in this repository, follow their style and conventions',
+    'draft_hint' : 'A faster model drafted the message below, fix the problems listed after it and keep what is right',
+    'structured_output' : 'Answer only with a JSON object: "title" is the title line without emoji or type prefix, "body" the body (an empty string when the title is enough), "type" the kind of change (one of {{ types }}) and "emoji" a single emoji matching the change'
 
 }
@@ -0,0 +1,202 @@
+import csv
+import difflib
+import io
+import json
+import os
+import re
+import struct
+from typing import List, Optional
+
+from .preprocess import FileChange, register_driver
+
+# Data files below this size are informative enough as a plain diff
+DATA_SUMMARY_MIN_CHARS = 2000
+MAX_KEYS = 12  # Columns or keys named in a summary, the rest are counted
+BINARY_BLOCK = re.compile(r"^(?:Binary files .* differ|GIT binary patch)$", re.MULTILINE)
+SVG_TAG = re.compile(r"<svg\b[^>]*>")
+SVG_SIZE = re.compile(r"\b(width|height|viewBox)=\"([^\"]*)\"")
+
+
+def file_size(size: int) -> str:
+    for unit in ("B", "KiB", "MiB"):
+        if size < 1024 or unit == "MiB":
+            return f"{size} {unit}" if unit == "B" else f"{size:.1f} {unit}"
+        size /= 1024
+
+
+def describe_change(old: Optional[str], new: Optional[str]) -> str:
+    """`old → new`, `added new` or `removed old`"""
+    if old is None:
+        return f"added, {new}"
+    if new is None:
+        return f"removed, was {old}"
+    return f"{old} → {new}" if old != new else f"{new}, content changed"
+
+
+def named(names: List[str]) -> str:
+    shown = ", ".join(names[:MAX_KEYS])
+    return shown + (f" and {len(names) - MAX_KEYS} more" if len(names) > MAX_KEYS else "")
+
+
+def name_changes(old: List[str], new: List[str]) -> str:
+    """Names added and removed between two lists, empty when they are the same"""
+    added = [name for name in new if name not in old]
+    removed = [name for name in old if name not in new]
+    parts = ([f"+ {named(added)}"] if added else []) + ([f"- {named(removed)}"] if removed else [])
+    return f" ({'; '.join(parts)})" if parts else ""
+
+
+# Notebooks
+
+
+def notebook_lines(data: Optional[bytes]) -> List[str]:
+    """Cell sources of a notebook, one `# %%` marker per cell, outputs and execution counts left out"""
+    if data is None:
+        return []
+    lines = []
+    for cell in json.loads(data).get("cells", []):
+        source = cell.get("source", "")
+        source = "".join(source) if isinstance(source, list) else source
+        marker = "# %%" if cell.get("cell_type") == "code" else f"# %% [{cell.get('cell_type', 'raw')}]"
+        lines.extend([marker, *source.splitlines()])
+    return lines
+
+
+@register_driver("notebook", ("*.ipynb",))
+def notebook(change: FileChange) -> Optional[str]:
+    old, new = notebook_lines(change.old()), notebook_lines(change.new())
+    body = list(difflib.unified_diff(old, new, f"a/{change.old_path}", f"b/{change.path}", lineterm=""))
+    if not body:
+        return "Notebook outputs or execution counts changed, cell sources are the same"
+    return "Notebook cell sources, outputs and execution counts left out:\n" + "\n".join(body)
+
+
+# Tabular and structured data
+
+
+def csv_shape(data: Optional[bytes], delimiter: str) -> Optional[tuple[List[str], int]]:
+    """(columns, rows) of a CSV file, None when missing"""
+    if data is None:
+        return None
+    rows = list(csv.reader(io.StringIO(data.decode("utf-8", "replace")), delimiter=delimiter))
+    return (rows[0], len(rows) - 1) if rows else ([], 0)
+
+
+@register_driver(
+    "csv", ("*.csv", "*.tsv"), matches=lambda block: len(block) > DATA_SUMMARY_MIN_CHARS
+)
+def csv_table(change: FileChange) -> Optional[str]:
+    delimiter = "\t" if change.path.endswith(".tsv") else ","
+    old, new = csv_shape(change.old(), delimiter), csv_shape(change.new(), delimiter)
+    if old is None and new is None:
+        return None
+    columns = (new or old)[0]
+    rows = describe_change(old and f"{old[1]:,} rows", new and f"{new[1]:,} rows")
+    changes = name_changes(old[0], new[0]) if old and new else ""
+    return f"Table summary: {rows}; columns: {named(columns)}{changes}"
+
+
+def json_shape(value) -> str:
+    """Short description of a JSON value: type, length and keys"""
+    if isinstance(value, list):
+        objects = [item for item in value if isinstance(item, dict)]
+        if objects and len(objects) == len(value):
+            keys = list(dict.fromkeys(key for item in objects for key in item))
+            return f"array of {len(value):,} objects with keys {named(keys)}"
+        return f"array of {len(value):,} items"
+    if isinstance(value, dict):
+        return f"object with keys {named(list(value))}"
+    return type(value).__name__
+
+
+@register_driver(
+    "json", ("*.json", "*.geojson"), matches=lambda block: len(block) > DATA_SUMMARY_MIN_CHARS
+)
+def json_document(change: FileChange) -> Optional[str]:
+    old_data, new_data = change.old(), change.new()
+    if old_data is None and new_data is None:
+        return None
+    old = json.loads(old_data) if old_data is not None else None
+    new = json.loads(new_data) if new_data is not None else None
+    shapes = [json_shape(value) if data is not None else None for value, data in ((old, old_data), (new, new_data))]
+    lines = [f"JSON summary: {describe_change(*shapes)}"]
+    if isinstance(old, dict) and isinstance(new, dict):
+        # Top level entries whose value changed, the usual shape of a fixture or config update
+        changed = [key for key in new if key in old and old[key] != new[key]]
+        if changed:
+            lines.append(f"  changed keys: {named(changed)}")
+        changes = name_changes(list(old), list(new))
+        if changes:
+            lines.append(f"  keys{changes}")
+    return "\n".join(lines)
+
+
+# Images and other binary files
+
+
+def image_size(data: bytes) -> Optional[tuple]:
+    """(width, height) from the header of a PNG, GIF, JPEG, WebP or BMP image, or an SVG's attributes"""
+    if data[:8] == b"\x89PNG\r\n\x1a\n" and len(data) >= 24:
+        return struct.unpack(">II", data[16:24])
+    if data[:6] in (b"GIF87a", b"GIF89a") and len(data) >= 10:
+        return struct.unpack("<HH", data[6:10])
+    if data[:2] == b"BM" and len(data) >= 26:
+        width, height = struct.unpack("<ii", data[18:26])
+        return width, abs(height)
+    if data[:4] == b"RIFF" and data[8:12] == b"WEBP" and len(data) >= 30:
+        chunk = data[12:16]
+        if chunk == b"VP8X":
+            return (int.from_bytes(data[24:27], "little") + 1, int.from_bytes(data[27:30], "little") + 1)
+        if chunk == b"VP8L":
+            bits = int.from_bytes(data[21:25], "little")
+            return ((bits & 0x3FFF) + 1, ((bits >> 14) & 0x3FFF) + 1)
+        if chunk == b"VP8 ":
+            width, height = struct.unpack("<HH", data[26:30])
+            return width & 0x3FFF, height & 0x3FFF
+    if data[:2] == b"\xff\xd8":
+        position = 2
+        while position + 9 < len(data):
+            if data[position] != 0xFF:
+                return None
+            marker = data[position + 1]
+            length = struct.unpack(">H", data[position + 2 : position + 4])[0]
+            # Start of frame markers, except DHT (C4), JPG (C8) and DAC (CC)
+            if 0xC0 <= marker <= 0xCF and marker not in (0xC4, 0xC8, 0xCC):
+                height, width = struct.unpack(">HH", data[position + 5 : position + 9])
+                return width, height
+            position += 2 + length
+        return None
+    tag = SVG_TAG.search(data[:4096].decode("utf-8", "replace"))
+    if tag:
+        attributes = dict(SVG_SIZE.findall(tag.group(0)))
+        if "width" in attributes and "height" in attributes:
+            return attributes["width"], attributes["height"]
+        if "viewBox" in attributes:
+            return tuple(attributes["viewBox"].split()[2:4]) or None
+    return None
+
+
+def describe_image(data: Optional[bytes], extension: str) -> Optional[str]:
+    if data is None:
+        return None
+    size = image_size(data)
+    dimensions = f" {size[0]}x{size[1]}" if size else ""
+    return f"{extension.upper()}{dimensions}, {file_size(len(data))}"
+
+
+@register_driver("image", ("*.png", "*.jpg", "*.jpeg", "*.gif", "*.webp", "*.bmp", "*.svg"))
+def image(change: FileChange) -> Optional[str]:
+    extension = os.path.splitext(change.path)[1].lstrip(".")
+    old, new = describe_image(change.old(), extension), describe_image(change.new(), extension)
+    if old is None and new is None:
+        return None
+    return f"Image: {describe_change(old, new)}"
+
+
+@register_driver("binary", ("*",), matches=lambda block: bool(BINARY_BLOCK.search(block)))
+def binary(change: FileChange) -> Optional[str]:
+    old, new = change.old(), change.new()
+    if old is None and new is None:
+        return None
+    sizes = [file_size(len(data)) if data is not None else None for data in (old, new)]
+    return f"Binary file: {describe_change(*sizes)}"
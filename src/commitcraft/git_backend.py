@@ -0,0 +1,345 @@
+import difflib
+import os
+import subprocess
+import threading
+from io import BytesIO
+from typing import List, Optional
+
+from .CommitCraft import decode_diff_block, matches_pattern, read_diff
+
+# Pure python dulwich is only used when asked for, "auto" picks pygit2 if installed
+BACKENDS = ("auto", "pygit2", "dulwich", "git")
+# Object id of the empty tree, which libgit2 resolves without it being stored
+EMPTY_TREE = "4b825dc642cb6eb9a060e54bf8d69288fbee4904"
+
+
+def similarity_index(old: bytes, new: bytes) -> int:
+    """Percentage of a renamed file's bytes kept, like git's `similarity index` (line based)"""
+    if old == new:
+        return 100
+    old_lines, new_lines = old.splitlines(True), new.splitlines(True)
+    matcher = difflib.SequenceMatcher(None, old_lines, new_lines, autojunk=False)
+    kept = sum(
+        len(line)
+        for block in matcher.get_matching_blocks()
+        for line in old_lines[block.a : block.a + block.size]
+    )
+    return kept * 100 // max(len(old), len(new), 1)
+
+
+class SubprocessGit:
+    """Git access through the `git` command line, always available"""
+
+    name = "git"
+
+    def __init__(self, path: str = "."):
+        self.path = path
+
+    def _run(self, *args: str, check: bool = False) -> subprocess.CompletedProcess:
+        return subprocess.run(
+            ["git", *args], capture_output=True, text=True, cwd=self.path, check=check
+        )
+
+    def git_dir(self) -> Optional[str]:
+        """Path of the `.git` directory, None outside a repository"""
+        result = self._run("rev-parse", "--absolute-git-dir")
+        return result.stdout.strip() if result.returncode == 0 else None
+
+    def staged_diff(self, ignored_patterns: Optional[List[str]] = None) -> str:
+        """`git diff --staged -M`, without the ignored files"""
+        return read_diff(["git", "-C", self.path, "diff", "--staged", "-M"], ignored_patterns)
+
+    def commit_diff(self, sha: str, ignored_patterns: Optional[List[str]] = None) -> str:
+        """Diff of a commit against its first parent, with rename detection"""
+        return read_diff(
+            ["git", "-C", self.path, "diff-tree", "-p", "-M", "--root", "--no-commit-id", sha],
+            ignored_patterns,
+        )
+
+    def read_blob(self, spec: str) -> Optional[bytes]:
+        """Contents of a file at a revision (`HEAD:path`, `:path` for the index), None when missing"""
+        result = subprocess.run(["git", "cat-file", "blob", spec], capture_output=True, cwd=self.path)
+        return result.stdout if result.returncode == 0 else None
+
+    def check_attr(self, paths: List[str], attributes: List[str], source: Optional[str] = None) -> dict[str, dict[str, str]]:
+        """`attributes` of every path in one `git check-attr` call: "set", "unset", "unspecified" or the value.
+
+        `.gitattributes` are read from the index, or from the `source` tree-ish; git
+        before 2.40 has no `--source` and reads them from the working tree instead.
+        """
+        if not paths:
+            return {}
+
+        def check_attr(*options: str) -> subprocess.CompletedProcess:
+            return subprocess.run(
+                ["git", "check-attr", "--stdin", "-z", *options, *attributes],
+                input="\0".join(paths), capture_output=True, text=True, cwd=self.path,
+            )
+
+        result = check_attr("--source", source) if source else check_attr("--cached")
+        if result.returncode != 0 and source:
+            result = check_attr()
+        if result.returncode != 0:
+            return {}
+        fields = result.stdout.split("\0")
+        values: dict[str, dict[str, str]] = {}
+        for i in range(0, len(fields) - 2, 3):
+            values.setdefault(fields[i], {})[fields[i + 1]] = fields[i + 2]
+        return values
+
+    def rev_list(self, revisions: str) -> List[str]:
+        """Non merge commits of a revision range (e.g. `v1.0..HEAD`), oldest first"""
+        return self._run(
+            "rev-list", "--reverse", "--no-merges", *revisions.split(), check=True
+        ).stdout.split()
+
+    def head(self) -> Optional[str]:
+        """Commit id of HEAD, None before the first commit"""
+        result = self._run("rev-parse", "--verify", "-q", "HEAD")
+        return result.stdout.strip() or None
+
+    def is_ancestor(self, ancestor: str, descendant: str) -> bool:
+        return self._run("merge-base", "--is-ancestor", ancestor, descendant).returncode == 0
+
+    def ls_files(self) -> List[str]:
+        """Tracked files"""
+        return [path for path in self._run("ls-files", "-z").stdout.split("\0") if path]
+
+    def changed_files(self, old: str, new: str) -> List[tuple[str, str]]:
+        """(status, path) of the files changed between two commits, renames as delete + add"""
+        fields = self._run("diff", "--name-status", "--no-renames", "-z", old, new).stdout.split("\0")
+        return [(fields[i][0], fields[i + 1]) for i in range(0, len(fields) - 1, 2)]
+
+    def log_messages(self, revisions: str, max_count: Optional[int] = None) -> List[str]:
+        """Full messages of the non merge commits of a revision range, newest first"""
+        args = ["log", "--no-merges", "-z", "--format=%B"]
+        if max_count:
+            args.append(f"--max-count={max_count}")
+        result = self._run(*args, *revisions.split())
+        return [message.strip() for message in result.stdout.split("\0") if message.strip()]
+
+    def commits(self, revisions: str, max_count: Optional[int] = None) -> List[tuple[str, str]]:
+        """(sha, message) of the non merge commits of a revision range, newest first"""
+        args = ["log", "--no-merges", "-z", "--format=%H%n%B"]
+        if max_count:
+            args.append(f"--max-count={max_count}")
+        result = self._run(*args, *revisions.split())
+        entries = []
+        for record in result.stdout.split("\0"):
+            sha, _, message = record.strip().partition("\n")
+            if sha:
+                entries.append((sha, message.strip()))
+        return entries
+
+    def config_get(self, key: str, global_config: bool = False) -> Optional[str]:
+        args = ("config", "--global", key) if global_config else ("config", key)
+        return self._run(*args).stdout.strip() or None
+
+    def config_set(self, key: str, value: str, global_config: bool = False):
+        args = ("config", "--global", key, value) if global_config else ("config", key, value)
+        self._run(*args, check=True)
+
+
+class Pygit2Git(SubprocessGit):
+    """In-process access through libgit2, the repository is opened once"""
+
+    name = "pygit2"
+
+    def __init__(self, path: str = "."):
+        import pygit2
+
+        super().__init__(path)
+        self.pygit2 = pygit2
+        repo_path = pygit2.discover_repository(path)
+        if repo_path is None:
+            raise ValueError(f"Not a git repository: {path}")
+        self.repo = pygit2.Repository(repo_path)
+        self._lock = threading.Lock()
+
+    def _patches(self, diff, ignored_patterns: Optional[List[str]]) -> str:
+        diff.find_similar()
+        blocks = []
+        for patch in diff:
+            path = patch.delta.new_file.path
+            if ignored_patterns and matches_pattern(path, ignored_patterns):
+                continue
+            blocks.append(decode_diff_block(patch.data))
+        return "".join(blocks)
+
+    def _empty_tree(self):
+        # Only read: diffing a first commit must not write to the repository
+        return self.repo[EMPTY_TREE]
+
+    def git_dir(self) -> Optional[str]:
+        return self.repo.path.rstrip("/")
+
+    def staged_diff(self, ignored_patterns: Optional[List[str]] = None) -> str:
+        with self._lock:
+            index = self.repo.index
+            index.read()  # Pick up what was staged since the last call
+            head = (
+                self._empty_tree()
+                if self.repo.head_is_unborn
+                else self.repo.head.peel(self.pygit2.Tree)
+            )
+            return self._patches(index.diff_to_tree(head), ignored_patterns)
+
+    def commit_diff(self, sha: str, ignored_patterns: Optional[List[str]] = None) -> str:
+        with self._lock:
+            commit = self.repo.revparse_single(sha).peel(self.pygit2.Commit)
+            if commit.parents:
+                diff = self.repo.diff(commit.parents[0], commit)
+            else:
+                diff = self._empty_tree().diff_to_tree(commit.tree)
+            return self._patches(diff, ignored_patterns)
+
+    def read_blob(self, spec: str) -> Optional[bytes]:
+        revision, _, path = spec.partition(":")
+        with self._lock:
+            try:
+                if not revision:
+                    index = self.repo.index
+                    index.read()
+                    return self.repo[index[path].id].data
+                return self.repo.revparse_single(spec).peel(self.pygit2.Blob).data
+            except (KeyError, ValueError, self.pygit2.GitError):
+                return None
+
+    def rev_list(self, revisions: str) -> List[str]:
+        with self._lock:
+            walker = self.repo.walk(None, self.pygit2.enums.SortMode.TOPOLOGICAL | self.pygit2.enums.SortMode.REVERSE)
+            for spec in revisions.split():
+                if spec.startswith("^"):
+                    walker.hide(self.repo.revparse_single(spec[1:]).peel(self.pygit2.Commit).id)
+                elif ".." in spec:
+                    parsed = self.repo.revparse(spec)
+                    walker.hide(parsed.from_object.peel(self.pygit2.Commit).id)
+                    walker.push(parsed.to_object.peel(self.pygit2.Commit).id)
+                else:
+                    walker.push(self.repo.revparse_single(spec).peel(self.pygit2.Commit).id)
+            return [str(commit.id) for commit in walker if len(commit.parents) <= 1]
+
+    def config_get(self, key: str, global_config: bool = False) -> Optional[str]:
+        if global_config:
+            return super().config_get(key, global_config)
+        try:
+            return self.repo.config[key]
+        except KeyError:
+            return None
+
+
+class DulwichGit(SubprocessGit):
+    """In-process access in pure python, for platforms without libgit2 wheels"""
+
+    name = "dulwich"
+
+    def __init__(self, path: str = "."):
+        from dulwich.repo import Repo
+
+        super().__init__(path)
+        self.repo = Repo.discover(path)
+        self._lock = threading.Lock()
+
+    def _patches(self, old_tree, new_tree, store, ignored_patterns: Optional[List[str]]) -> str:
+        from dulwich.diff_tree import CHANGE_RENAME, RenameDetector, tree_changes
+        from dulwich.patch import write_object_diff
+
+        def side(entry) -> tuple:
+            # Added and deleted files have no entry (or an empty one) on one side
+            return (entry.path, entry.mode, entry.sha) if entry else (None, None, None)
+
+        blocks = []
+        for change in tree_changes(store, old_tree, new_tree, rename_detector=RenameDetector(store)):
+            old, new = side(change.old), side(change.new)
+            path = (new[0] or old[0]).decode("utf-8", "replace")
+            if ignored_patterns and matches_pattern(path, ignored_patterns):
+                continue
+            block = BytesIO()
+            write_object_diff(block, store, old, new)
+            text = decode_diff_block(block.getbuffer())
+            # Extended header lines as `git diff -M` writes them: renames are
+            # spelled out, and there is no `index` line when the contents are equal
+            lines = text.splitlines(True)
+            end = next(
+                (i for i, line in enumerate(lines) if line.startswith(("--- ", "Binary files "))),
+                len(lines),
+            )
+            header = [line for line in lines[1:end] if not line.startswith("index ")]
+            index = [line for line in lines[1:end] if line.startswith("index ")]
+            if old[1] and new[1] and old[1] != new[1]:
+                # A mode change, not an added or deleted file, both modes are already listed
+                header = [line.replace(" file mode ", " mode ", 1) for line in header]
+                index = [line.rsplit(" ", 1)[0] + "\n" for line in index]
+            if change.type == CHANGE_RENAME:
+                header += [
+                    f"similarity index {similarity_index(store[old[2]].data, store[new[2]].data)}%\n",
+                    f"rename from {old[0].decode('utf-8', 'replace')}\n",
+                    f"rename to {new[0].decode('utf-8', 'replace')}\n",
+                ]
+            if old[2] != new[2]:
+                header += index
+            text = "".join([lines[0], *header, *lines[end:]])
+            # A last context line without newline at end of file isn't terminated,
+            # the next `diff --git` line would be glued to it
+            blocks.append(text if text.endswith("\n") else text + "\n")
+        return "".join(blocks)
+
+    def git_dir(self) -> Optional[str]:
+        return os.path.abspath(self.repo.controldir())
+
+    def staged_diff(self, ignored_patterns: Optional[List[str]] = None) -> str:
+        from dulwich.object_store import MemoryObjectStore, OverlayObjectStore
+
+        with self._lock:
+            # Index trees are built in memory, nothing is written to the repository
+            scratch = MemoryObjectStore()
+            store = OverlayObjectStore([scratch, self.repo.object_store], add_store=scratch)
+            new_tree = self.repo.open_index().commit(store)
+            try:
+                old_tree = self.repo[self.repo.head()].tree
+            except KeyError:
+                old_tree = None  # No commit yet
+            return self._patches(old_tree, new_tree, store, ignored_patterns)
+
+    def commit_diff(self, sha: str, ignored_patterns: Optional[List[str]] = None) -> str:
+        from dulwich.objectspec import parse_commit
+
+        with self._lock:
+            try:
+                commit = parse_commit(self.repo, sha)
+            except KeyError:
+                # Revision expressions dulwich doesn't parse (HEAD~2, v1.0^...)
+                return super().commit_diff(sha, ignored_patterns)
+            old_tree = self.repo[commit.parents[0]].tree if commit.parents else None
+            return self._patches(old_tree, commit.tree, self.repo.object_store, ignored_patterns)
+
+
+_backends: dict[tuple, SubprocessGit] = {}
+_backends_lock = threading.Lock()
+
+
+def get_git(path: str = ".", backend: Optional[str] = None) -> SubprocessGit:
+    """Git access for the repository containing `path`, opened once per process.
+
+    `backend` (or the COMMITCRAFT_GIT_BACKEND variable) picks pygit2, dulwich or
+    git; "auto" uses pygit2 when installed. Any backend falls back to the git
+    command line when its library is missing or `path` is not a repository.
+    """
+    backend = backend or os.getenv("COMMITCRAFT_GIT_BACKEND", "auto")
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown git backend '{backend}', expected one of {', '.join(BACKENDS)}")
+    key = (os.path.abspath(path), backend)
+    with _backends_lock:
+        git = _backends.get(key)
+        if git is None:
+            classes = {"auto": [Pygit2Git], "pygit2": [Pygit2Git], "dulwich": [DulwichGit]}.get(backend, [])
+            for cls in classes:
+                try:
+                    git = cls(path)
+                    break
+                except Exception:
+                    continue
+            else:
+                git = SubprocessGit(path)
+            _backends[key] = git
+        return git
@@ -0,0 +1,136 @@
+import os
+import re
+import sqlite3
+from contextlib import contextmanager
+from typing import Callable, List, Optional
+
+from .cache import diff_fingerprint, signed64, similarity
+from .CommitCraft import estimate_tokens
+from .git_backend import get_git
+from .local_files import make_local_path
+
+DIFF_PATHS = re.compile(r"^diff --git a/(\S+) b/(\S+)", re.MULTILINE)
+
+
+def diff_paths(diff: str) -> set[str]:
+    """Paths touched by a diff and their parent directories"""
+    paths = set()
+    for match in DIFF_PATHS.finditer(diff):
+        for path in match.groups():
+            while path:
+                paths.add(path)
+                path = os.path.dirname(path)
+    return paths
+
+
+class HistoryIndex:
+    """SQLite index of past commit messages with a fingerprint of their diff.
+
+    Built incrementally from `git log`: only commits made since the last indexed
+    HEAD are diffed. Retrieval ranks past commits by diff similarity (SimHash)
+    and shared file paths.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+
+    @contextmanager
+    def _connect(self):
+        make_local_path(self.path)
+        conn = sqlite3.connect(self.path, timeout=5)
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS commits ("
+            "id INTEGER PRIMARY KEY, sha TEXT UNIQUE NOT NULL, message TEXT NOT NULL, "
+            "fingerprint INTEGER NOT NULL, paths TEXT NOT NULL)"
+        )
+        conn.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT)")
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def update(
+        self,
+        max_commits: int = 2000,
+        path: str = ".",
+        progress: Optional[Callable[[int, int], None]] = None,
+    ) -> int:
+        """Index the commits made since the last update, returns how many were added"""
+        git = get_git(path)
+        head = git.head()
+        if head is None:
+            return 0
+        with self._connect() as conn:
+            row = conn.execute("SELECT value FROM meta WHERE key = 'head'").fetchone()
+        indexed_head = row[0] if row else None
+        if indexed_head == head:
+            return 0
+
+        revisions = head
+        if indexed_head and git.is_ancestor(indexed_head, head):
+            revisions = f"{indexed_head}..{head}"
+        # Oldest first, so the insertion order follows the history
+        entries = list(reversed(git.commits(revisions, max_commits)))
+
+        rows = []
+        for done, (sha, message) in enumerate(entries, 1):
+            diff = git.commit_diff(sha)
+            rows.append((
+                sha,
+                message,
+                signed64(diff_fingerprint(diff)),
+                "\n".join(sorted(diff_paths(diff))),
+            ))
+            if progress:
+                progress(done, len(entries))
+
+        with self._connect() as conn:
+            conn.executemany(
+                "INSERT OR REPLACE INTO commits (sha, message, fingerprint, paths) VALUES (?, ?, ?, ?)",
+                rows,
+            )
+            conn.execute(
+                "DELETE FROM commits WHERE id <= (SELECT id FROM commits ORDER BY id DESC LIMIT 1 OFFSET ?)",
+                (max_commits,),
+            )
+            conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('head', ?)", (head,))
+        return len(rows)
+
+    def examples(
+        self,
+        diff: str,
+        top_k: int = 3,
+        max_tokens: int = 400,
+        min_score: float = 0.1,
+    ) -> List[str]:
+        """Messages of the past commits most similar to `diff`, best first, within `max_tokens`"""
+        if not os.path.exists(self.path):
+            return []
+        fingerprint = diff_fingerprint(diff)
+        paths = diff_paths(diff)
+
+        scored = []
+        with self._connect() as conn:
+            for message, stored, stored_paths in conn.execute(
+                "SELECT message, fingerprint, paths FROM commits"
+            ):
+                # Jaccard overlap of the touched paths, a weaker signal than the content
+                stored_paths = set(stored_paths.split("\n")) if stored_paths else set()
+                overlap = len(paths & stored_paths) / len(paths | stored_paths) if paths else 0.0
+                # Unrelated fingerprints still share about half of their bits
+                content = max(0.0, 2 * similarity(fingerprint, stored % (1 << 64)) - 1)
+                score = 0.7 * content + 0.3 * overlap
+                if score >= min_score:
+                    scored.append((score, message))
+
+        examples, used = [], 0
+        for _, message in sorted(scored, key=lambda item: -item[0]):
+            cost = estimate_tokens(message)
+            if used + cost > max_tokens:
+                continue
+            examples.append(message)
+            used += cost
+            if len(examples) >= top_k:
+                break
+        return examples
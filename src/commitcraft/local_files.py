@@ -0,0 +1,34 @@
+import os
+
+CONFIG_DIR = ".commitcraft"
+LOCAL_FILES_NOTE = "# Machine-local caches written by CommitCraft, not meant to be committed\n"
+
+
+def make_local_path(path: str, is_dir: bool = False) -> str:
+    """Create the directory of a machine-local cache file (or the directory itself) and return `path`.
+
+    A cache kept in the project's `.commitcraft` directory, whose configuration
+    is committed, is listed in its `.gitignore`; the file is written on first
+    use and only ever appended to.
+    """
+    directory = path if is_dir else os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+
+    parent, name = os.path.split(os.path.normpath(path))
+    if os.path.basename(parent) != CONFIG_DIR:
+        return path  # Configured somewhere else, the user knows where it is
+    entry = name + "/" if is_dir else name
+    gitignore = os.path.join(parent, ".gitignore")
+    try:
+        with open(gitignore) as f:
+            lines = f.read().splitlines()
+    except FileNotFoundError:
+        lines = None
+    if lines is not None and (entry in lines or name in lines):
+        return path
+    with open(gitignore, "a") as f:
+        if lines is None:
+            f.write(LOCAL_FILES_NOTE)
+        f.write(entry + "\n")
+    return path
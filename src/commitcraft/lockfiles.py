@@ -0,0 +1,103 @@
+import json
+import re
+from typing import Callable, Dict, Optional, Set
+
+try:
+    import tomllib
+except ImportError:  # Python 3.10
+    import tomli as tomllib
+
+from .preprocess import FileChange, register_driver
+
+MAX_ENTRIES = 40  # Changed packages listed, the rest are counted
+
+Packages = Dict[str, Set[str]]  # Package name -> versions locked (several for npm)
+
+
+def parse_toml_packages(text: str) -> Packages:
+    """`[[package]]` tables of poetry.lock, uv.lock and Cargo.lock"""
+    packages: Packages = {}
+    for package in tomllib.loads(text).get("package", []):
+        packages.setdefault(package["name"], set()).add(str(package.get("version", "")))
+    return packages
+
+
+def parse_package_lock(text: str) -> Packages:
+    """package-lock.json, the `packages` map (v2, v3) or the nested `dependencies` (v1)"""
+    data = json.loads(text)
+    packages: Packages = {}
+    if "packages" in data:
+        for location, package in data["packages"].items():
+            if not location:
+                continue  # The project itself
+            name = package.get("name") or location.rsplit("node_modules/", 1)[-1]
+            packages.setdefault(name, set()).add(package.get("version", ""))
+        return packages
+
+    def walk(dependencies: dict):
+        for name, package in dependencies.items():
+            packages.setdefault(name, set()).add(package.get("version", ""))
+            walk(package.get("dependencies") or {})
+
+    walk(data.get("dependencies") or {})
+    return packages
+
+
+def parse_go_sum(text: str) -> Packages:
+    packages: Packages = {}
+    for line in text.splitlines():
+        fields = line.split()
+        if len(fields) >= 2:
+            packages.setdefault(fields[0], set()).add(fields[1].removesuffix("/go.mod"))
+    return packages
+
+
+def version_key(version: str) -> tuple:
+    return tuple(int(number) for number in re.findall(r"\d+", version))
+
+
+def compare_packages(old: Packages, new: Packages) -> list[str]:
+    """One line per added, removed, upgraded or downgraded package, sorted by name"""
+    lines = []
+    for name in sorted(old.keys() | new.keys()):
+        before, after = sorted(old.get(name, ()), key=version_key), sorted(new.get(name, ()), key=version_key)
+        if before == after:
+            continue
+        if not before:
+            lines.append(f"added      {name} {', '.join(after)}")
+        elif not after:
+            lines.append(f"removed    {name} {', '.join(before)}")
+        else:
+            change = "upgraded  " if version_key(after[-1]) >= version_key(before[-1]) else "downgraded"
+            lines.append(f"{change} {name} {', '.join(before)} → {', '.join(after)}")
+    return lines
+
+
+def summarize_lockfile(change: FileChange, parse: Callable[[str], Packages]) -> Optional[str]:
+    """Package changes between the old and new lockfile, None when neither side can be read"""
+    old, new = change.old(), change.new()
+    if old is None and new is None:
+        return None
+    old_packages = parse(old.decode("utf-8")) if old is not None else {}
+    new_packages = parse(new.decode("utf-8")) if new is not None else {}
+    lines = compare_packages(old_packages, new_packages)
+    shown = [f"  {line}" for line in lines[:MAX_ENTRIES]]
+    if len(lines) > MAX_ENTRIES:
+        shown.append(f"  ... and {len(lines) - MAX_ENTRIES} more packages")
+    noun = "package" if len(lines) == 1 else "packages"
+    return "\n".join([f"Lockfile summary, {len(lines)} {noun} changed:", *shown])
+
+
+@register_driver("lockfile", ("poetry.lock", "uv.lock", "Cargo.lock"))
+def toml_lockfile(change: FileChange) -> Optional[str]:
+    return summarize_lockfile(change, parse_toml_packages)
+
+
+@register_driver("lockfile", ("package-lock.json", "npm-shrinkwrap.json"))
+def npm_lockfile(change: FileChange) -> Optional[str]:
+    return summarize_lockfile(change, parse_package_lock)
+
+
+@register_driver("lockfile", ("go.sum",))
+def go_sum(change: FileChange) -> Optional[str]:
+    return summarize_lockfile(change, parse_go_sum)
@@ -0,0 +1,163 @@
+import difflib
+import hashlib
+import inspect
+import json
+import os
+import tempfile
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor, wait
+from typing import Iterable, List, Optional
+
+import typer
+
+from .providers import ModelInfo, get_provider
+
+CATALOG_TTL = 6 * 3600  # Seconds a model list is trusted without asking the provider again
+LIST_TIMEOUT = 5.0  # Seconds allowed to each list call
+
+
+def catalog_path() -> str:
+    return os.path.join(typer.get_app_dir("commitcraft"), "models.json")
+
+
+def catalog_key(provider: str, host: Optional[str] = None, api_key: Optional[str] = None) -> str:
+    """Entry of a provider/host/key, the key itself is never written, only a digest of it"""
+    key_digest = hashlib.sha256(api_key.encode()).hexdigest()[:12] if api_key else ""
+    return f"{provider}|{str(host or '').rstrip('/')}|{key_digest}"
+
+
+class ModelCatalog:
+    """Model lists of the providers, cached in the app dir with a TTL.
+
+    Lists are fetched concurrently, each call bounded by a timeout, and a list
+    already being fetched is shared instead of requested again, so the wizard
+    can prefetch every configured provider while the user answers questions.
+    """
+
+    def __init__(self, path: Optional[str] = None, ttl: float = CATALOG_TTL):
+        self.path = path or catalog_path()
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._in_flight: dict[str, Future] = {}
+        self._executor = ThreadPoolExecutor(max_workers=8, thread_name_prefix="commitcraft-models")
+
+    def _load(self) -> dict:
+        try:
+            with open(self.path) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def _save(self, key: str, entry: dict):
+        with self._lock:
+            entries = self._load()
+            entries[key] = {"fetched_at": time.time(), **entry}
+            directory = os.path.dirname(self.path)
+            os.makedirs(directory, exist_ok=True)
+            # A temporary file of its own, so concurrent CommitCraft processes never write the same one
+            with tempfile.NamedTemporaryFile("w", dir=directory, suffix=".tmp", delete=False) as f:
+                json.dump(entries, f)
+            os.replace(f.name, self.path)
+
+    def cached(self, provider: str, host: Optional[str] = None, api_key: Optional[str] = None) -> Optional[List[str]]:
+        """Cached model list, None when missing or older than the TTL"""
+        entry = self._load().get(catalog_key(provider, host, api_key))
+        if entry and "models" in entry and time.time() - entry["fetched_at"] < self.ttl:
+            return entry["models"]
+        return None
+
+    def _fetch(self, key: str, provider: str, host: Optional[str], api_key: Optional[str], timeout: float) -> List[str]:
+        list_models = get_provider(provider).list_models
+        # Plugins written before `timeout` existed are only bounded by the future
+        timeout_args = {"timeout": timeout} if "timeout" in inspect.signature(list_models).parameters else {}
+        try:
+            models = list_models(api_key=api_key, host=host, **timeout_args)
+        finally:
+            with self._lock:
+                self._in_flight.pop(key, None)
+        self._save(key, {"models": models})
+        return models
+
+    def fetch(
+        self,
+        provider: str,
+        host: Optional[str] = None,
+        api_key: Optional[str] = None,
+        timeout: float = LIST_TIMEOUT,
+        refresh: bool = False,
+    ) -> Future:
+        """Future of the model list, already resolved when cached"""
+        if not refresh:
+            models = self.cached(provider, host, api_key)
+            if models is not None:
+                future = Future()
+                future.set_result(models)
+                return future
+        key = catalog_key(provider, host, api_key)
+        with self._lock:
+            future = self._in_flight.get(key)
+            if future is None:
+                future = self._in_flight[key] = self._executor.submit(
+                    self._fetch, key, provider, host, api_key, timeout
+                )
+        return future
+
+    def fetch_all(
+        self, targets: Iterable[tuple], timeout: float = LIST_TIMEOUT, refresh: bool = False
+    ) -> dict[tuple, Optional[List[str]]]:
+        """Model lists of several (provider, host, api_key) at once, None for the failed ones"""
+        futures = {target: self.fetch(*target, timeout=timeout, refresh=refresh) for target in targets}
+        wait(futures.values(), timeout=timeout)
+        return {
+            target: future.result() if future.done() and not future.exception() else None
+            for target, future in futures.items()
+        }
+
+    def models(
+        self,
+        provider: str,
+        host: Optional[str] = None,
+        api_key: Optional[str] = None,
+        timeout: float = LIST_TIMEOUT,
+    ) -> List[str]:
+        """Model list of a provider, empty when it can't be listed within `timeout`"""
+        try:
+            return self.fetch(provider, host, api_key, timeout).result(timeout=timeout)
+        except Exception:
+            return []
+
+    def info(self, model, timeout: float = LIST_TIMEOUT) -> Optional[ModelInfo]:
+        """Metadata of `model` (an LModel), asked once per TTL; None when unknown or unavailable"""
+        key = catalog_key(model.provider_name, model.host and str(model.host), model.api_key) + f"|{model.model}"
+        entry = self._load().get(key)
+        if entry and "info" in entry and time.time() - entry["fetched_at"] < self.ttl:
+            return ModelInfo(**entry["info"]) if entry["info"] else None
+        try:
+            info = get_provider(model.provider).model_info(model, timeout=timeout)
+        except Exception:
+            return None  # Unreachable host or unknown model, asked again next time
+        # Providers reporting nothing are remembered too, so they aren't asked on every run
+        self._save(key, {"info": info.model_dump() if info else None})
+        return info
+
+
+def known_model(name: str, models: List[str]) -> bool:
+    """Whether `name` is in a model list, ignoring Ollama's `:latest` tag and Gemini's `models/` prefix"""
+    names = set(models) | {model.split("/", 1)[1] for model in models if model.startswith("models/")}
+    return name in names or f"{name}:latest" in names
+
+
+def suggest_models(name: str, models: List[str], n: int = 3) -> List[str]:
+    return difflib.get_close_matches(name, models, n=n, cutoff=0.5)
+
+
+_catalog: Optional[ModelCatalog] = None
+
+
+def get_catalog() -> ModelCatalog:
+    """The catalog of the process, shared by the wizard and the CLI"""
+    global _catalog
+    if _catalog is None:
+        _catalog = ModelCatalog(ttl=float(os.getenv("COMMITCRAFT_MODELS_TTL", CATALOG_TTL)))
+    return _catalog
@@ -0,0 +1,178 @@
+import fnmatch
+import importlib
+import os
+import re
+import threading
+from importlib.metadata import entry_points
+from typing import Callable, List, Optional
+
+from .git_backend import get_git
+
+ENTRY_POINT_GROUP = "commitcraft.diff_drivers"
+# Modules registering the built-in drivers, tried after the plugins in this order
+BUILTIN_DRIVERS = ("commitcraft.lockfiles", "commitcraft.formats")
+# Attributes leaving a file out of the prompt, `diff` when unset (`-diff`), the others when set
+EXCLUDING_ATTRIBUTES = ("linguist-generated", "linguist-vendored", "commitcraft-ignore", "diff")
+
+FILE_BLOCK = re.compile(r"^diff --git a/.* b/(.*)$", re.MULTILINE)
+# Old path of a renamed or copied file, hunk lines always start with a space, + or -
+OLD_PATH = re.compile(r"^(?:rename|copy) from (.*)$", re.MULTILINE)
+
+
+class FileChange:
+    """A file of the diff as a driver sees it, its old and new contents are read on demand"""
+
+    def __init__(self, path: str, block: str, git, old_revision: str = "HEAD", new_revision: str = ""):
+        self.path = path
+        self.block = block
+        old_path = OLD_PATH.search(block)
+        self.old_path = old_path.group(1) if old_path else path
+        self._git = git
+        self._revisions = {"old": old_revision, "new": new_revision}
+        self._contents: dict[str, Optional[bytes]] = {}
+
+    @property
+    def header(self) -> str:
+        return self.block.split("\n", 1)[0]
+
+    def _read(self, side: str) -> Optional[bytes]:
+        if side not in self._contents:
+            path = self.old_path if side == "old" else self.path
+            self._contents[side] = self._git.read_blob(f"{self._revisions[side]}:{path}")
+        return self._contents[side]
+
+    def old(self) -> Optional[bytes]:
+        """Contents before the change, None for an added file"""
+        return self._read("old")
+
+    def new(self) -> Optional[bytes]:
+        """Contents after the change, None for a deleted file"""
+        return self._read("new")
+
+
+# A driver returns the lines replacing the body of the file's block, or None to keep it
+DiffDriver = Callable[[FileChange], Optional[str]]
+_drivers: List[tuple[str, tuple, Optional[Callable[[str], bool]], DiffDriver]] = []
+_loaded = False
+_load_lock = threading.Lock()
+
+
+def register_driver(name: str, patterns: tuple, matches: Optional[Callable[[str], bool]] = None):
+    """Decorator adding a driver for the file names matching `patterns`.
+
+    `matches` further restricts it to the blocks it returns True for (large
+    ones, binary ones...), so files the driver would skip don't cost a read.
+    """
+
+    def decorator(driver: DiffDriver) -> DiffDriver:
+        _drivers.append((name, patterns, matches, driver))
+        return driver
+
+    return decorator
+
+
+def load_drivers():
+    """Import the driver modules once: `commitcraft.diff_drivers` entry points first, so plugins win, then the built-in ones"""
+    global _loaded
+    with _load_lock:
+        if _loaded:
+            return
+        for entry_point in entry_points(group=ENTRY_POINT_GROUP):
+            try:
+                entry_point.load()
+            except Exception:
+                continue  # A broken plugin must not break the commit
+        for module in BUILTIN_DRIVERS:
+            importlib.import_module(module)
+        _loaded = True
+
+
+def driver_for(path: str, block: str, disabled: List[str] = []) -> Optional[DiffDriver]:
+    """First driver registered for the file and the block"""
+    name = os.path.basename(path)
+    for driver_name, patterns, matches, driver in _drivers:
+        if (
+            driver_name not in disabled
+            and any(fnmatch.fnmatch(name, pattern) for pattern in patterns)
+            and (matches is None or matches(block))
+        ):
+            return driver
+    return None
+
+
+def split_blocks(diff: str) -> List[tuple[str, str]]:
+    """(path, block) of each file of a diff"""
+    starts = [(match.start(), match.group(1)) for match in FILE_BLOCK.finditer(diff)]
+    return [
+        (path, diff[start : starts[i + 1][0] if i + 1 < len(starts) else len(diff)])
+        for i, (start, path) in enumerate(starts)
+    ]
+
+
+def excluded_by_attributes(git, paths: List[str], source: Optional[str] = None) -> dict[str, str]:
+    """Paths whose `.gitattributes` leave them out, with the attribute responsible"""
+    excluded = {}
+    for path, values in git.check_attr(paths, list(EXCLUDING_ATTRIBUTES), source).items():
+        for attribute in EXCLUDING_ATTRIBUTES:
+            value = values.get(attribute)
+            if (value == "unset") if attribute == "diff" else (value in ("set", "true")):
+                excluded[path] = "-diff" if attribute == "diff" else attribute
+                break
+    return excluded
+
+
+def stat_entry(block: str, reason: str) -> str:
+    """The header of a file's block and its `git diff --stat` line"""
+    from .ranking import diff_stat, parse_diff
+
+    header = block.split("\n", 1)[0]
+    return f"{header}\n{diff_stat(parse_diff(block)).rstrip()} (left out, {reason})\n"
+
+
+def preprocess_diff(
+    diff: str,
+    disabled: List[str] = [],
+    path: str = ".",
+    old_revision: str = "HEAD",
+    new_revision: str = "",
+    attributes: bool = True,
+) -> str:
+    """Rewrite the blocks of the files a driver recognizes, compact summaries instead of raw text.
+
+    The revisions give the old and new contents to the drivers, HEAD and the index
+    (`""`) for staged changes. A driver failing on a file leaves its block as is.
+    With `attributes`, files marked generated, vendored, `-diff` or `commitcraft-ignore`
+    in `.gitattributes` are reduced to a stat line, found with one `git check-attr` call.
+    """
+    load_drivers()
+    blocks = split_blocks(diff)
+    if not blocks:
+        return diff
+    git = get_git(path)
+    excluded = (
+        excluded_by_attributes(git, [file_path for file_path, _ in blocks], new_revision or None)
+        if attributes
+        else {}
+    )
+    drivers = [
+        None if file_path in excluded else driver_for(file_path, block, disabled)
+        for file_path, block in blocks
+    ]
+    if not excluded and not any(drivers):
+        return diff
+
+    rewritten = [diff[: FILE_BLOCK.search(diff).start()]]
+    for (file_path, block), driver in zip(blocks, drivers):
+        summary = None
+        if file_path in excluded:
+            block = stat_entry(block, excluded[file_path])
+        elif driver:
+            change = FileChange(file_path, block, git, old_revision, new_revision)
+            try:
+                summary = driver(change)
+            except Exception:
+                summary = None
+            if summary is not None:
+                block = f"{change.header}\n{summary.rstrip()}\n"
+        rewritten.append(block)
+    return "".join(rewritten)
@@ -0,0 +1,121 @@
+import cProfile
+import io
+import os
+import pstats
+import sys
+import threading
+import time
+import tracemalloc
+from contextlib import contextmanager
+from typing import List, Optional
+
+TOP_ALLOCATIONS = 25
+TOP_FUNCTIONS = 30
+# cProfile is built on sys.monitoring from 3.12 on, one profile sees every thread
+PROCESS_WIDE_PROFILE = sys.version_info >= (3, 12)
+
+
+class Profiler:
+    """Profiles a run of the pipeline and writes the reports to a local directory.
+
+    Used as a context manager: cProfile (in every thread) and tracemalloc run for
+    the whole block, `stage` records the wall-clock time of each step, and on exit
+    three files are written to `directory`, named after the start time:
+
+    - `<name>.pstats`: cProfile statistics, for `python -m pstats` or snakeviz
+    - `<name>.memory.txt`: peak traced memory and the top allocation sites
+    - `<name>.timings.txt`: wall-clock time per stage and the slowest functions
+
+    A profiler without a directory does nothing, so the pipeline can always use one.
+    """
+
+    def __init__(self, directory: Optional[str] = None):
+        self.directory = directory
+        self.stages: List[tuple[str, float]] = []
+        self.paths: List[str] = []
+        self._profile: Optional[cProfile.Profile] = None
+        self._thread_profiles: List[cProfile.Profile] = []
+        self._lock = threading.Lock()
+        self._started = 0.0
+
+    @property
+    def enabled(self) -> bool:
+        return self.directory is not None
+
+    def __enter__(self) -> "Profiler":
+        if self.enabled:
+            self._started = time.perf_counter()
+            tracemalloc.start()
+            self._profile = cProfile.Profile()
+            self._profile.enable()
+            if not PROCESS_WIDE_PROFILE:
+                # Older cProfile only sees its own thread, threads started
+                # during the run get a profile of their own
+                threading.setprofile(self._profile_thread)
+        return self
+
+    def __exit__(self, *exc_info):
+        if self.enabled:
+            if not PROCESS_WIDE_PROFILE:
+                threading.setprofile(None)
+            self._profile.disable()
+            total = time.perf_counter() - self._started
+            snapshot = tracemalloc.take_snapshot()
+            current, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+            self.write_reports(total, snapshot, current, peak)
+        return False
+
+    @contextmanager
+    def stage(self, name: str):
+        """Record the wall-clock time of the block as `name`"""
+        if not self.enabled:
+            yield
+            return
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.stages.append((name, time.perf_counter() - started))
+
+    def _profile_thread(self, frame, event, arg):
+        """First profiling event of a new thread, replaced by a profile of that thread"""
+        profile = cProfile.Profile()
+        with self._lock:
+            self._thread_profiles.append(profile)
+        profile.enable()
+
+    def write_reports(self, total: float, snapshot: tracemalloc.Snapshot, current: int, peak: int):
+        os.makedirs(self.directory, exist_ok=True)
+        base = os.path.join(self.directory, time.strftime("commitcraft-%Y%m%d-%H%M%S"))
+
+        stats = pstats.Stats(self._profile)
+        for profile in self._thread_profiles:
+            profile.create_stats()
+            stats.add(profile)
+        stats.dump_stats(base + ".pstats")
+
+        snapshot = snapshot.filter_traces((
+            tracemalloc.Filter(False, tracemalloc.__file__),
+            tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+            tracemalloc.Filter(False, "<frozen importlib._bootstrap_external>"),
+        ))
+        with open(base + ".memory.txt", "w") as f:
+            f.write(f"Peak traced memory: {peak / 1024:.1f} KiB\n")
+            f.write(f"Traced at exit: {current / 1024:.1f} KiB\n\n")
+            f.write(f"Top {TOP_ALLOCATIONS} allocation sites still alive at exit:\n")
+            for statistic in snapshot.statistics("lineno")[:TOP_ALLOCATIONS]:
+                f.write(f"{statistic}\n")
+
+        functions = io.StringIO()
+        stats.stream = functions
+        stats.sort_stats(pstats.SortKey.CUMULATIVE).print_stats(TOP_FUNCTIONS)
+        with open(base + ".timings.txt", "w") as f:
+            f.write("Wall-clock time per stage:\n")
+            for name, seconds in self.stages:
+                f.write(f"  {name:<16} {seconds * 1000:>10.1f} ms {100 * seconds / total:>6.1f}%\n")
+            f.write(f"  {'total':<16} {total * 1000:>10.1f} ms\n\n")
+            f.write(f"Top {TOP_FUNCTIONS} functions by cumulative time (all threads):\n")
+            f.write(functions.getvalue())
+
+        self.paths = [base + suffix for suffix in (".pstats", ".memory.txt", ".timings.txt")]
@@ -0,0 +1,187 @@
+import os
+import re
+import time
+from collections import Counter
+from typing import List, Optional
+
+from pydantic import BaseModel
+
+from .git_backend import get_git
+from .local_files import make_local_path
+
+CONTEXT_PATH = os.path.join(".commitcraft", "project_context.json")
+HISTORY_SIZE = 200  # Recent commit messages conventions are mined from
+
+LANGUAGES = {
+    ".py": "Python", ".js": "JavaScript", ".jsx": "JavaScript", ".mjs": "JavaScript",
+    ".ts": "TypeScript", ".tsx": "TypeScript", ".go": "Go", ".rs": "Rust", ".java": "Java",
+    ".kt": "Kotlin", ".rb": "Ruby", ".php": "PHP", ".c": "C", ".h": "C", ".cpp": "C++",
+    ".cc": "C++", ".hpp": "C++", ".cs": "C#", ".swift": "Swift", ".sh": "Shell",
+    ".scala": "Scala", ".ex": "Elixir", ".exs": "Elixir", ".dart": "Dart", ".lua": "Lua",
+    ".r": "R", ".m": "Objective-C", ".vue": "Vue", ".svelte": "Svelte", ".zig": "Zig",
+    ".hs": "Haskell", ".clj": "Clojure", ".jl": "Julia", ".sql": "SQL",
+}
+# Layout directories whose children are the actual modules
+CONTAINER_DIRS = {"src", "lib", "pkg", "packages", "apps", "libs", "crates", "cmd", "internal"}
+
+CONVENTIONAL = re.compile(r"^(?:\W+\s*)?(\w+)(?:\(([^)]+)\))?!?: ")
+GITMOJI = re.compile(r"^(?::\w+:|[\u2190-\u2bff\U0001f000-\U0001faff])")
+COMPACT_GUIDELINES = [
+    "Return only the commit message: a title line, then an optional body.",
+    "Describe the global goal of the change, not every line; no questions, no introduction.",
+]
+
+
+class ProjectContext(BaseModel):
+    """Facts about the repository, kept in `.commitcraft/` and refreshed as HEAD moves"""
+
+    head: Optional[str] = None
+    files: dict[str, int] = {}  # Tracked files per module
+    extensions: dict[str, int] = {}  # Tracked files per extension
+    messages: List[str] = []  # Most recent commit messages, newest first
+    built_at: float = 0.0
+
+
+def module_of(path: str) -> Optional[str]:
+    parts = path.split("/")
+    if len(parts) == 1:
+        return None  # Top level files
+    if parts[0] in CONTAINER_DIRS and len(parts) > 2:
+        return "/".join(parts[:2])
+    return parts[0]
+
+
+def count_file(context: ProjectContext, path: str, delta: int):
+    for counter, key in ((context.files, module_of(path)), (context.extensions, os.path.splitext(path)[1].lower())):
+        if not key:
+            continue
+        counter[key] = counter.get(key, 0) + delta
+        if counter[key] <= 0:
+            del counter[key]
+
+
+def build_context(path: str = ".") -> ProjectContext:
+    """Derive the project context from scratch"""
+    git = get_git(path)
+    context = ProjectContext(head=git.head(), built_at=time.time())
+    for file_path in git.ls_files():
+        count_file(context, file_path, 1)
+    if context.head:
+        context.messages = git.log_messages(context.head, HISTORY_SIZE)
+    return context
+
+
+def refresh_context(context: ProjectContext, path: str = ".") -> ProjectContext:
+    """Bring a stored context up to date with HEAD.
+
+    Only the files changed and the commits made since the stored HEAD are
+    looked at; a HEAD that is not a descendant (rebase, branch switch) or a
+    repository without the stored commit triggers a full rebuild.
+    """
+    git = get_git(path)
+    head = git.head()
+    if head == context.head:
+        return context
+    if not (head and context.head and git.is_ancestor(context.head, head)):
+        return build_context(path)
+
+    context = context.model_copy(deep=True)
+    for status, file_path in git.changed_files(context.head, head):
+        if status in ("A", "D"):
+            count_file(context, file_path, 1 if status == "A" else -1)
+    new_messages = git.log_messages(f"{context.head}..{head}", HISTORY_SIZE)
+    context.messages = (new_messages + context.messages)[:HISTORY_SIZE]
+    context.head = head
+    context.built_at = time.time()
+    return context
+
+
+def load_context(path: str = CONTEXT_PATH) -> Optional[ProjectContext]:
+    if not os.path.exists(path):
+        return None
+    with open(path) as f:
+        return ProjectContext.model_validate_json(f.read())
+
+
+def save_context(context: ProjectContext, path: str = CONTEXT_PATH):
+    make_local_path(path)
+    with open(path + ".tmp", "w") as f:
+        f.write(context.model_dump_json())
+    os.replace(path + ".tmp", path)
+
+
+def commit_conventions(messages: List[str]) -> List[str]:
+    """Conventions followed by most of `messages`, one short sentence each"""
+    if not messages:
+        return []
+    titles = [message.splitlines()[0].strip() for message in messages]
+    total = len(titles)
+    conventions = []
+
+    conventional = [CONVENTIONAL.match(title) for title in titles]
+    conventional = [match for match in conventional if match]
+    if len(conventional) >= total / 2:
+        types = [kind for kind, _ in Counter(match.group(1).lower() for match in conventional).most_common(6)]
+        line = f"Titles follow Conventional Commits `type(scope): summary`, types used: {', '.join(types)}"
+        scopes = [scope for scope, _ in Counter(match.group(2) for match in conventional if match.group(2)).most_common(5)]
+        if scopes:
+            line += f"; common scopes: {', '.join(scopes)}"
+        conventions.append(line + ".")
+
+    if sum(bool(GITMOJI.match(title)) for title in titles) >= total / 2:
+        conventions.append("Titles start with a gitmoji.")
+
+    lengths = sorted(len(title) for title in titles)
+    style = f"Titles are about {lengths[len(lengths) // 2]} characters"
+    if sum(title.endswith(".") for title in titles) < total / 5:
+        style += ", without a trailing period"
+    conventions.append(style + ".")
+
+    bodies = [message.splitlines()[1:] for message in messages]
+    with_body = [lines for lines in bodies if any(line.strip() for line in lines)]
+    if len(with_body) < total / 5:
+        conventions.append("Most commits have no body, keep to the title unless the change needs it.")
+    elif sum(any(line.lstrip().startswith(("-", "*")) for line in lines) for lines in with_body) >= len(with_body) / 2:
+        conventions.append("Bodies are bullet lists.")
+    return conventions
+
+
+def render_context(context: ProjectContext, max_modules: int = 8) -> dict[str, str]:
+    """Compact `project_language`, `project_description` and `commit_guidelines` values"""
+    rendered = {}
+
+    languages = Counter()
+    for extension, count in context.extensions.items():
+        if extension in LANGUAGES:
+            languages[LANGUAGES[extension]] += count
+    if languages:
+        total = sum(languages.values())
+        rendered["project_language"] = ", ".join(
+            language for language, count in languages.most_common(3) if count >= total / 20
+        )
+
+    if context.files:
+        modules = sorted(context.files.items(), key=lambda item: -item[1])[:max_modules]
+        rendered["project_description"] = "Main modules: " + ", ".join(
+            f"{module} ({count} files)" for module, count in modules
+        ) + "."
+
+    # Indented like the default guidelines, the template already indents the first line
+    rendered["commit_guidelines"] = "- " + "\n    - ".join(
+        COMPACT_GUIDELINES + commit_conventions(context.messages)
+    )
+    return rendered
+
+
+def project_context(path: str = CONTEXT_PATH) -> dict[str, str]:
+    """Rendered stored context, refreshed first if HEAD moved; empty when never built"""
+    context = load_context(path)
+    if context is None:
+        return {}
+    try:
+        refreshed = refresh_context(context)
+    except Exception:
+        refreshed = context  # Keep the stored context if git can't be read
+    if refreshed is not context:
+        save_context(refreshed, path)
+    return render_context(refreshed)
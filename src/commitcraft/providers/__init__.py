@@ -0,0 +1,88 @@
+import importlib
+import threading
+from importlib.metadata import entry_points
+from typing import Optional, Type
+
+from .base import BaseProvider, Capabilities, GenerationRequest, ModelInfo
+
+ENTRY_POINT_GROUP = "commitcraft.providers"
+
+# Built-in providers, also published as entry points. Kept here so a source
+# checkout works without installing the package metadata.
+BUILTIN_PROVIDERS = {
+    "ollama": "commitcraft.providers.ollama:OllamaProvider",
+    "ollama_cloud": "commitcraft.providers.ollama:OllamaCloudProvider",
+    "openai": "commitcraft.providers.openai:OpenAIProvider",
+    "openai_compatible": "commitcraft.providers.openai:OpenAICompatibleProvider",
+    "groq": "commitcraft.providers.groq:GroqProvider",
+    "google": "commitcraft.providers.google:GoogleProvider",
+    "llama_cpp": "commitcraft.providers.llama_cpp:LlamaCppProvider",
+}
+
+_registered: dict[str, Type[BaseProvider]] = {}
+_instances: dict[str, BaseProvider] = {}
+_lock = threading.Lock()
+
+
+def _plugin_entry_points() -> dict:
+    """Third party providers declared under the `commitcraft.providers` entry point group"""
+    return {ep.name: ep for ep in entry_points(group=ENTRY_POINT_GROUP)}
+
+
+def available_providers() -> list[str]:
+    """Names of every known provider, without importing any of them"""
+    names = list(BUILTIN_PROVIDERS)
+    for name in list(_registered) + list(_plugin_entry_points()):
+        if name not in names:
+            names.append(name)
+    return names
+
+
+def register_provider(name: str, provider_cls: Type[BaseProvider]):
+    """Register a provider class at runtime (e.g. from a script or a test)"""
+    with _lock:
+        _registered[name] = provider_cls
+        _instances.pop(name, None)
+
+
+def _load(name: str) -> Type[BaseProvider]:
+    if name in _registered:
+        return _registered[name]
+    if name in BUILTIN_PROVIDERS:
+        module_name, class_name = BUILTIN_PROVIDERS[name].split(":")
+        return getattr(importlib.import_module(module_name), class_name)
+    plugins = _plugin_entry_points()
+    if name in plugins:
+        return plugins[name].load()
+    raise NotImplementedError(f"provider not found: {name}")
+
+
+def get_provider(name) -> BaseProvider:
+    """Provider instance for `name`, its module is only imported the first time it is selected"""
+    name = getattr(name, "value", name)
+    with _lock:
+        provider = _instances.get(name)
+        if provider is None:
+            provider = _load(name)()
+            provider.name = provider.name or name
+            _instances[name] = provider
+        return provider
+
+
+def get_capabilities(name) -> Optional[Capabilities]:
+    try:
+        return get_provider(name).capabilities
+    except (NotImplementedError, ImportError):
+        return None
+
+
+__all__ = [
+    "BaseProvider",
+    "Capabilities",
+    "GenerationRequest",
+    "ModelInfo",
+    "available_providers",
+    "get_capabilities",
+    "get_provider",
+    "register_provider",
+]
@@ -0,0 +1,196 @@
+import hashlib
+import threading
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from typing import Any, Callable, List, Optional
+
+from pydantic import BaseModel, PrivateAttr
+
+from ..batching import get_batcher
+from ..scheduler import DeadlineExceeded
+
+
+class Capabilities(BaseModel):
+    """What a provider backend supports, each flag turns a feature on for it"""
+
+    batching: bool = False  # `CommitCraft batch` backfills through the offline batch API
+    model_listing: bool = False
+    structured_output: bool = False  # Answers constrained by a JSON schema
+
+
+class ModelInfo(BaseModel):
+    """Limits and features of a model as reported by its provider, unknown values are None"""
+
+    context_length: Optional[int] = None  # Tokens the model accepts (prompt and answer)
+    max_output_tokens: Optional[int] = None
+    parameter_size: Optional[str] = None  # e.g. "7.6B"
+    quantization: Optional[str] = None  # e.g. "Q4_K_M"
+    family: Optional[str] = None
+    capabilities: Optional[List[str]] = None  # e.g. ["completion", "thinking"], None when not reported
+
+
+class GenerationRequest(BaseModel):
+    """Everything a provider needs to run one generation"""
+
+    model: Any  # LModel
+    system_prompt: str
+    prompt: str
+    options: dict = {}
+    response_schema: Optional[dict] = None  # JSON schema the answer must follow
+    # Resolved once by the caller for providers with `needs_model_info`, None when unknown
+    model_info: Optional[ModelInfo] = None
+    deadline: Any  # scheduler.Deadline
+    timeout_args: dict = {}
+    # Runs a provider call through the shared scheduler (rate limits, retries, deadline)
+    send: Callable[[Callable[[], Any]], Any]
+    # Clients created for this request only, closed once it is done
+    _own_clients: list = PrivateAttr(default_factory=list)
+
+    class Config:
+        arbitrary_types_allowed = True
+
+
+class BaseProvider:
+    """Base class of every provider plugin.
+
+    Subclasses implement `create_client`, `generate` and optionally `list_models`;
+    client pooling, option filtering and cancellation are handled here once.
+    """
+
+    name: str = ""
+    capabilities: Capabilities = Capabilities()
+    default_model: Optional[str] = None
+    requires_model: bool = False
+    requires_host: bool = False
+    api_key_env: Optional[str] = None
+    # `generate` reads `request.model_info` (context length, capabilities)
+    needs_model_info: bool = False
+    # Generation options forwarded to the backend, everything else is dropped
+    option_names: tuple = ("top_p", "temperature", "max_tokens", "stop")
+
+    def __init__(self):
+        self._clients: dict[tuple, Any] = {}
+        self._clients_lock = threading.Lock()
+
+    def filter_options(self, options: dict) -> dict:
+        """Keep only the options this provider understands and that are set"""
+        return {
+            name: options[name]
+            for name in self.option_names
+            if options.get(name) is not None
+        }
+
+    def create_client(self, model, timeout_args: dict) -> Any:
+        raise NotImplementedError
+
+    def reasoning_args(self, model) -> dict:
+        """Provider specific arguments enabling, disabling or limiting reasoning"""
+        return {}
+
+    def close_client(self, client: Any):
+        close = getattr(client, "close", None)
+        if close:
+            close()
+
+    def client(self, request: GenerationRequest) -> Any:
+        """Client for the request.
+
+        Clients are pooled per host/key and shared by concurrent requests, so
+        cancelling one request must never close them. A request with a time
+        limit gets a client of its own instead, closed when its deadline is
+        cancelled (aborting only its in-flight HTTP call) and once it is done.
+        Batched requests always share the pooled client, their connection is
+        what the batch is sent on.
+        """
+        model = request.model
+        if request.deadline.expires_at is not None and not model.batch:
+            client = self.create_client(model, request.timeout_args)
+            request._own_clients.append(client)
+            request.deadline.on_cancel(lambda: self.close_client(client))
+            return client
+
+        key = (
+            str(model.host or ""),
+            # Never keep API keys around in clear text, a digest is enough to tell them apart
+            hashlib.sha256(model.api_key.encode()).hexdigest()[:16] if model.api_key else "",
+            repr(request.timeout_args),
+            repr(model.batch),
+        )
+        with self._clients_lock:
+            client = self._clients.get(key)
+            if client is None:
+                client = self._clients[key] = self.create_client(
+                    model, request.timeout_args
+                )
+        return client
+
+    def release_clients(self, request: GenerationRequest):
+        """Close the clients created for `request` alone"""
+        clients, request._own_clients = request._own_clients, []
+        for client in clients:
+            try:
+                self.close_client(client)
+            except Exception:
+                pass
+
+    def generate(self, request: GenerationRequest) -> str:
+        raise NotImplementedError
+
+    def submit(self, request: GenerationRequest) -> str:
+        """Generate, going through the host's micro-batcher when the model enables batching"""
+        batch = request.model.batch
+        if not batch:
+            try:
+                return self.generate(request)
+            finally:
+                self.release_clients(request)
+
+        batcher = get_batcher(
+            (self.name, str(request.model.host or ""), batch.window_ms, batch.max_batch_size),
+            self.generate,
+            batch.window_ms / 1000,
+            batch.max_batch_size,
+        )
+        future = batcher.submit(request)
+        try:
+            return future.result(timeout=request.deadline.remaining())
+        except FutureTimeoutError:
+            future.cancel()
+            raise DeadlineExceeded("Request deadline exceeded while batched")
+
+    def list_models(self, api_key: Optional[str] = None, host: Optional[str] = None, timeout: Optional[float] = None) -> list[str]:
+        """Names of the models available, `timeout` bounds the request in seconds"""
+        return []
+
+    def model_info(self, model, timeout: Optional[float] = None) -> Optional[ModelInfo]:
+        """Metadata of `model` (an LModel), None when the provider doesn't report any"""
+        return None
+
+    # Offline batch API, used by `CommitCraft batch` on providers with `capabilities.batching`
+
+    def batch_line(self, custom_id: str, request: GenerationRequest) -> dict:
+        """One line of the JSONL batch input file"""
+        raise NotImplementedError(f"The '{self.name}' provider has no batch API")
+
+    def upload_batch(self, model, path: str) -> str:
+        """Upload a JSONL batch input file, returns its file id"""
+        raise NotImplementedError(f"The '{self.name}' provider has no batch API")
+
+    def create_batch(self, model, file_id: str, job_id: Optional[str] = None) -> str:
+        """Start a batch job over an uploaded file, tagged with `job_id`, returns the batch id"""
+        raise NotImplementedError(f"The '{self.name}' provider has no batch API")
+
+    def find_batch(self, model, job_id: str) -> Optional[str]:
+        """Id of a recent batch tagged with `job_id`, None when there is none"""
+        return None
+
+    def retrieve_batch(self, model, batch_id: str) -> dict:
+        """Batch state: `status`, `output_file_id`, `error_file_id` and `request_counts`"""
+        raise NotImplementedError(f"The '{self.name}' provider has no batch API")
+
+    def download_batch(self, model, file_id: str) -> str:
+        """Content of a batch output or error file"""
+        raise NotImplementedError(f"The '{self.name}' provider has no batch API")
+
+    def parse_batch_line(self, line: dict) -> tuple[str, Optional[str], Optional[str]]:
+        """(custom_id, response, error) of one line of a batch output file"""
+        raise NotImplementedError(f"The '{self.name}' provider has no batch API")
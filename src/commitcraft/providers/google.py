@@ -0,0 +1,97 @@
+import os
+from typing import Any, Optional
+
+from .base import BaseProvider, Capabilities, GenerationRequest, ModelInfo
+
+
+class GoogleProvider(BaseProvider):
+    """Google Gemini through the google-genai SDK"""
+
+    capabilities = Capabilities(model_listing=True, structured_output=True)
+    default_model = "gemini-2.5-flash"
+    api_key_env = "GOOGLE_API_KEY"
+    # CommitCraft option name -> GenerateContentConfig field
+    option_map = {
+        "temperature": "temperature",
+        "max_tokens": "max_output_tokens",
+        "top_p": "top_p",
+        "stop": "stop_sequences",
+    }
+
+    def create_client(self, model, timeout_args: dict) -> Any:
+        from google import genai
+
+        return genai.Client(
+            api_key=model.api_key if model.api_key else os.getenv(self.api_key_env),
+            # google-genai expects milliseconds
+            http_options={"timeout": int(model.timeout * 1000)}
+            if model.timeout
+            else None,
+        )
+
+    def generate(self, request: GenerationRequest) -> str:
+        from google.genai import types
+
+        client = self.client(request)
+
+        google_config = {}
+        if request.system_prompt:
+            google_config["system_instruction"] = request.system_prompt
+
+        for option, field in self.option_map.items():
+            if request.options.get(option):
+                google_config[field] = request.options.get(option)
+
+        if request.response_schema:
+            # Gemini schemas are an OpenAPI subset, without additionalProperties
+            google_config["response_mime_type"] = "application/json"
+            google_config["response_schema"] = {
+                key: value for key, value in request.response_schema.items() if key != "additionalProperties"
+            }
+
+        # Gemini 2.5 thinks by default, a zero budget turns it off (older SDKs lack ThinkingConfig)
+        model = request.model
+        if hasattr(types, "ThinkingConfig"):
+            if model.think is False:
+                google_config["thinking_config"] = types.ThinkingConfig(thinking_budget=0)
+            elif model.think:
+                google_config["thinking_config"] = types.ThinkingConfig(include_thoughts=True)
+
+        response = request.send(
+            lambda: client.models.generate_content(
+                model=request.model.model,
+                contents=request.prompt,
+                config=types.GenerateContentConfig(**google_config),
+            )
+        )
+        if model.think and response.candidates:
+            # Thought summaries come back as separate parts, tag them like inline reasoning
+            parts = response.candidates[0].content.parts or []
+            thoughts = "".join(
+                part.text for part in parts if getattr(part, "thought", False) and part.text
+            )
+            if thoughts:
+                return f"<think>{thoughts}</think>{response.text}"
+        return response.text
+
+    def list_models(self, api_key: Optional[str] = None, host: Optional[str] = None, timeout: Optional[float] = None) -> list[str]:
+        from google import genai
+
+        http_options = {"timeout": int(timeout * 1000)} if timeout else None
+        client = genai.Client(api_key=api_key, http_options=http_options)
+        return [m.name for m in client.models.list()]
+
+    def model_info(self, model, timeout: Optional[float] = None) -> Optional[ModelInfo]:
+        from google import genai
+
+        client = genai.Client(
+            api_key=model.api_key if model.api_key else os.getenv(self.api_key_env),
+            http_options={"timeout": int(timeout * 1000)} if timeout else None,
+        )
+        entry = client.models.get(model=model.model)
+        return ModelInfo(
+            context_length=entry.input_token_limit,
+            max_output_tokens=entry.output_token_limit,
+            # Only reasoning support is reported, in Ollama's vocabulary
+            capabilities=None if entry.thinking is None else ["completion"] + (["thinking"] if entry.thinking else []),
+        )
@@ -0,0 +1,44 @@
+import os
+from typing import Any, Optional
+
+from .openai import OpenAIProvider
+
+
+class GroqProvider(OpenAIProvider):
+    """Groq chat completions API, same request shape as OpenAI"""
+
+    default_model = "qwen/qwen3-32b"
+    api_key_env = "GROQ_API_KEY"
+
+    def create_client(self, model, timeout_args: dict) -> Any:
+        from groq import Groq
+
+        # Retries are handled by the scheduler, not by the SDK
+        return Groq(
+            api_key=model.api_key if model.api_key else os.getenv(self.api_key_env),
+            max_retries=0,
+            **timeout_args,
+        )
+
+    def batch_client(self, model) -> Any:
+        from openai import OpenAI
+
+        # The groq SDK has no files/batches resources, the endpoints are OpenAI compatible
+        return OpenAI(
+            api_key=model.api_key if model.api_key else os.getenv(self.api_key_env),
+            base_url="https://api.groq.com/openai/v1",
+            max_retries=0,
+        )
+
+    def reasoning_args(self, model) -> dict:
+        if model.reasoning_effort:
+            return {"reasoning_effort": model.reasoning_effort}
+        if model.think is False and "qwen3" in (model.model or "").lower():
+            return {"reasoning_effort": "none"}
+        return {}
+
+    def list_models(self, api_key: Optional[str] = None, host: Optional[str] = None, timeout: Optional[float] = None) -> list[str]:
+        from groq import Groq
+
+        client = Groq(api_key=api_key, timeout=timeout, max_retries=0)
+        return [m.id for m in client.models.list().data]
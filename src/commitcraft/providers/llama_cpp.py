@@ -0,0 +1,85 @@
+import os
+import threading
+from typing import Optional
+
+from ..CommitCraft import get_context_size
+from .base import BaseProvider, Capabilities, GenerationRequest
+
+# GGUF models loaded in-process, kept for the lifetime of the process
+_llama_cpp_models: dict = {}
+# Context length each GGUF model was trained with, None when it doesn't say
+_trained_contexts: dict = {}
+_llama_cpp_lock = threading.Lock()
+
+
+def trained_context(model_path: str) -> Optional[int]:
+    """Context length a GGUF model was trained with, read with its vocabulary only, without the weights"""
+    import llama_cpp
+
+    params = llama_cpp.llama_model_default_params()
+    params.vocab_only = True
+    model = llama_cpp.llama_load_model_from_file(model_path.encode(), params)
+    if not model:
+        return None
+    try:
+        return llama_cpp.llama_n_ctx_train(model) or None
+    finally:
+        llama_cpp.llama_free_model(model)
+
+
+def load_llama_cpp(model_path: str, num_ctx: int):
+    """Load a GGUF model once (memory-mapped) and reuse it while its context is large enough"""
+    from llama_cpp import Llama
+
+    model_path = os.path.expanduser(model_path)
+    with _llama_cpp_lock:
+        if model_path not in _trained_contexts:
+            _trained_contexts[model_path] = trained_context(model_path)
+        # Never ask for more context than the model was trained with
+        trained_ctx = _trained_contexts[model_path]
+        if trained_ctx:
+            num_ctx = min(num_ctx, trained_ctx)
+
+        cached = _llama_cpp_models.get(model_path)
+        if cached and cached.n_ctx() >= num_ctx:
+            return cached
+
+        llm = Llama(model_path=model_path, n_ctx=num_ctx, use_mmap=True, verbose=False)
+        # A Llama instance is not thread safe, generations on it are serialized
+        llm.lock = threading.Lock()
+        _llama_cpp_models[model_path] = llm
+        return llm
+
+
+class LlamaCppProvider(BaseProvider):
+    """In-process GGUF model through llama-cpp-python, no HTTP server involved"""
+
+    capabilities = Capabilities(structured_output=True)
+    requires_model = True
+    option_names = ("top_p", "temperature", "max_tokens", "stop", "top_k", "min_p")
+
+    def generate(self, request: GenerationRequest) -> str:
+        num_ctx = request.options.get("num_ctx") or get_context_size(
+            request.prompt, request.system_prompt
+        )
+        llm = load_llama_cpp(request.model.model, num_ctx)
+        options = self.filter_options(request.options)
+        if request.response_schema:
+            # Compiled to a grammar, tokens that would break the schema are never sampled
+            options["response_format"] = {"type": "json_object", "schema": request.response_schema}
+
+        # Streaming lets the deadline interrupt the generation between tokens
+        chunks = []
+        with llm.lock:
+            for chunk in llm.create_chat_completion(
+                messages=[
+                    {"role": "system", "content": request.system_prompt},
+                    {"role": "user", "content": request.prompt},
+                ],
+                stream=True,
+                **options,
+            ):
+                request.deadline.check()
+                chunks.append(chunk["choices"][0]["delta"].get("content") or "")
+        return "".join(chunks)
+
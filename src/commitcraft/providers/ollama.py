@@ -0,0 +1,172 @@
+import os
+from typing import Any, Optional
+
+import httpx
+import ollama
+
+from ..CommitCraft import get_context_size
+from .base import BaseProvider, Capabilities, GenerationRequest, ModelInfo
+
+
+def with_thinking(response: dict, content_key: str) -> str:
+    """Put natively separated reasoning back in `<think>` tags, like inline reasoning models"""
+    message = response.get("message", response)
+    thinking = message.get("thinking") if hasattr(message, "get") else None
+    content = message[content_key]
+    return f"<think>{thinking}</think>{content}" if thinking else content
+
+
+def ollama_options(options: dict) -> dict:
+    """Generation options under Ollama's names, the answer budget is `num_predict`"""
+    options = {name: value for name, value in options.items() if value is not None}
+    if "max_tokens" in options:
+        options.setdefault("num_predict", options.pop("max_tokens"))
+    return options
+
+
+class OllamaClient(ollama.Client):
+    """Ollama client owning the httpx client it sends through, so it can be closed"""
+
+    def __init__(self, host: Optional[str] = None, **kwargs):
+        self.http: Optional[httpx.Client] = None
+        super(ollama.Client, self).__init__(self._http_client, host, **kwargs)
+
+    def _http_client(self, **kwargs) -> httpx.Client:
+        self.http = httpx.Client(**kwargs)
+        return self.http
+
+    def close(self):
+        self.http.close()
+
+
+class OllamaProvider(BaseProvider):
+    """Local or self hosted Ollama instance, using the generate API"""
+
+    capabilities = Capabilities(model_listing=True, structured_output=True)
+    default_model = "qwen3"
+    api_key_env = "OLLAMA_API_KEY"
+    needs_model_info = True  # num_ctx is clamped to the window, `think` only sent to reasoning models
+
+    def client_args(self, model) -> dict:
+        # Ollama local instance initialization
+        client_args = {}
+        host_val = str(model.host) if model.host else os.getenv("OLLAMA_HOST")
+        if host_val:
+            client_args["host"] = host_val
+        return client_args
+
+    def create_client(self, model, timeout_args: dict) -> Any:
+        client_args = self.client_args(model)
+
+        # API key support for authenticated Ollama instances
+        ollama_api_key = model.api_key if model.api_key else os.getenv("OLLAMA_API_KEY")
+        if ollama_api_key:
+            client_args["headers"] = {"Authorization": f"Bearer {ollama_api_key}"}
+
+        return OllamaClient(**timeout_args, **client_args)
+
+    def reasoning_args(self, model) -> dict:
+        if model.think is False:
+            return {"think": False}
+        if model.reasoning_effort:
+            # gpt-oss style models take a level instead of a boolean
+            return {"think": model.reasoning_effort}
+        if model.think:
+            return {"think": True}
+        return {}
+
+    def format_args(self, request: GenerationRequest) -> dict:
+        # Ollama takes a JSON schema as `format`
+        return {"format": request.response_schema} if request.response_schema else {}
+
+    def generate(self, request: GenerationRequest) -> str:
+        client = self.client(request)
+        info = request.model_info
+        context_length = info.context_length if info else None
+        options = ollama_options(request.options)
+        if not options.get("num_ctx"):
+            options["num_ctx"] = get_context_size(request.prompt, request.system_prompt, context_length)
+        elif context_length and options["num_ctx"] > context_length:
+            # A larger window only makes Ollama allocate KV cache the model can't use
+            options["num_ctx"] = context_length
+        reasoning = self.reasoning_args(request.model)
+        if info and info.capabilities is not None and "thinking" not in info.capabilities:
+            reasoning = {}  # Ollama rejects `think` for models without reasoning
+        response = request.send(
+            lambda: client.generate(
+                model=request.model.model,
+                system=request.system_prompt,
+                prompt=request.prompt,
+                options=options,
+                **self.format_args(request),
+                **reasoning,
+            )
+        )
+        return with_thinking(response, "response")
+
+    def list_models(self, api_key: Optional[str] = None, host: Optional[str] = None, timeout: Optional[float] = None) -> list[str]:
+        client_args = {"host": "https://ollama.com" if host == "ollama_cloud" else host}
+        if api_key:
+            client_args["headers"] = {"Authorization": f"Bearer {api_key}"}
+        client = OllamaClient(timeout=timeout, **client_args)
+        try:
+            return [m["model"] for m in client.list()["models"]]
+        finally:
+            client.close()
+
+    def model_info(self, model, timeout: Optional[float] = None) -> Optional[ModelInfo]:
+        client = self.create_client(model, {"timeout": timeout})
+        try:
+            response = client.show(model.model)
+        finally:
+            self.close_client(client)
+        metadata = response.get("modelinfo") or {}
+        details = response.get("details") or {}
+        architecture = metadata.get("general.architecture")
+        context_length = metadata.get(f"{architecture}.context_length") if architecture else None
+        return ModelInfo(
+            context_length=context_length,
+            parameter_size=details.get("parameter_size"),
+            quantization=details.get("quantization_level"),
+            family=details.get("family"),
+            capabilities=response.get("capabilities"),
+        )
+
+
+class OllamaCloudProvider(OllamaProvider):
+    """Ollama Cloud, using the chat API"""
+
+    capabilities = Capabilities(model_listing=True, structured_output=True)
+    default_model = "qwen3-coder:480b-cloud"
+    needs_model_info = False
+
+    def client_args(self, model) -> dict:
+        # Ollama Cloud configuration per https://docs.ollama.com/cloud#python
+        return {"host": "https://ollama.com"}
+
+    def generate(self, request: GenerationRequest) -> str:
+        client = self.client(request)
+
+        # Ollama Cloud uses chat API, not generate API
+        messages = [
+            {"role": "system", "content": request.system_prompt},
+            {"role": "user", "content": request.prompt},
+        ]
+
+        # Filter options for chat API (cloud doesn't use num_ctx)
+        chat_options = {k: v for k, v in ollama_options(request.options).items() if k != "num_ctx"}
+
+        reasoning = self.reasoning_args(request.model)
+        response = request.send(
+            lambda: client.chat(
+                model=request.model.model,
+                messages=messages,
+                options=chat_options if chat_options else None,
+                **self.format_args(request),
+                **reasoning,
+            )
+        )
+        return with_thinking(response, "content")
+
+    def list_models(self, api_key: Optional[str] = None, host: Optional[str] = None, timeout: Optional[float] = None) -> list[str]:
+        return super().list_models(api_key=api_key, host="ollama_cloud", timeout=timeout)
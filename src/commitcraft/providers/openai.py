@@ -0,0 +1,212 @@
+import os
+from typing import Any, Optional
+
+from .base import BaseProvider, Capabilities, GenerationRequest, ModelInfo
+
+# Context length fields added to `/models` entries by vLLM, Groq, OpenRouter/Together and LM Studio
+CONTEXT_LENGTH_FIELDS = ("max_model_len", "context_window", "context_length", "max_context_length")
+# Metadata key of a batch holding the CommitCraft job it was created for
+BATCH_JOB_TAG = "commitcraft_job"
+
+
+class OpenAIProvider(BaseProvider):
+    """OpenAI chat completions API"""
+
+    capabilities = Capabilities(batching=True, model_listing=True, structured_output=True)
+    default_model = "gpt-3.5-turbo"
+    api_key_env = "OPENAI_API_KEY"
+
+    def api_key(self, model) -> Optional[str]:
+        return model.api_key if model.api_key else os.getenv(self.api_key_env)
+
+    def create_client(self, model, timeout_args: dict) -> Any:
+        from openai import OpenAI
+
+        # Retries are handled by the scheduler, not by the SDK
+        return OpenAI(api_key=self.api_key(model), max_retries=0, **timeout_args)
+
+    def reasoning_args(self, model) -> dict:
+        # Sent through extra_body so older SDK versions don't reject the field
+        if model.reasoning_effort:
+            return {"reasoning_effort": model.reasoning_effort}
+        return {}
+
+    def messages(self, request: GenerationRequest) -> list[dict]:
+        return [
+            {"role": "system", "content": request.system_prompt},
+            {"role": "user", "content": request.prompt},
+        ]
+
+    def response_format(self, request: GenerationRequest) -> dict:
+        if not request.response_schema:
+            return {}
+        return {
+            "response_format": {
+                "type": "json_schema",
+                "json_schema": {"name": "commit_message", "strict": True, "schema": request.response_schema},
+            }
+        }
+
+    def generate(self, request: GenerationRequest) -> str:
+        client = self.client(request)
+        options = {**self.filter_options(request.options), **self.response_format(request)}
+        reasoning = self.reasoning_args(request.model)
+        if reasoning:
+            options["extra_body"] = reasoning
+        return (
+            request.send(
+                lambda: client.chat.completions.create(
+                    messages=self.messages(request),
+                    model=request.model.model,
+                    stream=False,
+                    **options,
+                )
+            )
+            .choices[0]
+            .message.content
+        )
+
+    def list_models(self, api_key: Optional[str] = None, host: Optional[str] = None, timeout: Optional[float] = None) -> list[str]:
+        from openai import OpenAI
+
+        client = OpenAI(api_key=api_key, timeout=timeout, max_retries=0)
+        return [m.id for m in client.models.list()]
+
+    def model_info(self, model, timeout: Optional[float] = None) -> Optional[ModelInfo]:
+        client = self.create_client(model, {"timeout": timeout})
+        entry = client.models.retrieve(model.model).model_dump()
+        # The OpenAI API reports no limits, compatible servers and Groq add their own fields
+        context_length = next(
+            (
+                entry[name]
+                for name in CONTEXT_LENGTH_FIELDS
+                if isinstance(entry.get(name), int)
+            ),
+            (entry.get("meta") or {}).get("n_ctx_train"),  # llama.cpp server
+        )
+        if context_length is None:
+            return None
+        return ModelInfo(context_length=context_length, family=entry.get("owned_by"))
+
+    def batch_client(self, model) -> Any:
+        """Client used for the files and batches endpoints"""
+        return self.create_client(model, {})
+
+    def batch_line(self, custom_id: str, request: GenerationRequest) -> dict:
+        body = {
+            "model": request.model.model,
+            "messages": self.messages(request),
+            **self.filter_options(request.options),
+            **self.response_format(request),
+            **self.reasoning_args(request.model),
+        }
+        return {
+            "custom_id": custom_id,
+            "method": "POST",
+            "url": "/v1/chat/completions",
+            "body": body,
+        }
+
+    def upload_batch(self, model, path: str) -> str:
+        with open(path, "rb") as batch_file:
+            return self.batch_client(model).files.create(
+                file=batch_file, purpose="batch"
+            ).id
+
+    def create_batch(self, model, file_id: str, job_id: Optional[str] = None) -> str:
+        return self.batch_client(model).batches.create(
+            input_file_id=file_id,
+            endpoint="/v1/chat/completions",
+            completion_window="24h",
+            **({"metadata": {BATCH_JOB_TAG: job_id}} if job_id else {}),
+        ).id
+
+    def find_batch(self, model, job_id: str) -> Optional[str]:
+        # Newest first, a batch whose creation answer was lost is on the first page
+        for batch in self.batch_client(model).batches.list(limit=100).data:
+            if (batch.metadata or {}).get(BATCH_JOB_TAG) == job_id:
+                return batch.id
+        return None
+
+    def retrieve_batch(self, model, batch_id: str) -> dict:
+        batch = self.batch_client(model).batches.retrieve(batch_id)
+        counts = batch.request_counts
+        return {
+            "status": batch.status,
+            "output_file_id": batch.output_file_id,
+            "error_file_id": batch.error_file_id,
+            "request_counts": counts.model_dump() if counts else {},
+        }
+
+    def download_batch(self, model, file_id: str) -> str:
+        return self.batch_client(model).files.content(file_id).text
+
+    def parse_batch_line(self, line: dict) -> tuple[str, Optional[str], Optional[str]]:
+        response = line.get("response") or {}
+        error = line.get("error")
+        if error:
+            return line["custom_id"], None, error.get("message", str(error))
+        if response.get("status_code", 200) != 200:
+            body = response.get("body") or {}
+            message = (body.get("error") or {}).get("message", f"HTTP {response.get('status_code')}")
+            return line["custom_id"], None, message
+        return line["custom_id"], response["body"]["choices"][0]["message"]["content"], None
+
+
+class OpenAICompatibleProvider(OpenAIProvider):
+    """Any server exposing the OpenAI API (vLLM, TGI, llama.cpp server, LiteLLM...)"""
+
+    capabilities = Capabilities(model_listing=True, structured_output=True)
+    default_model = None
+    requires_model = True
+    requires_host = True
+    api_key_env = "CUSTOM_API_KEY"
+
+    def api_key(self, model) -> Optional[str]:
+        return model.api_key if model.api_key else os.getenv(self.api_key_env, default="nokey")
+
+    def reasoning_args(self, model) -> dict:
+        args = super().reasoning_args(model)
+        if model.think is not None:
+            # Chat template switch understood by vLLM and SGLang (Qwen3, DeepSeek, ...)
+            args["chat_template_kwargs"] = {"enable_thinking": model.think}
+        return args
+
+    def create_client(self, model, timeout_args: dict) -> Any:
+        from openai import OpenAI
+
+        client_args = dict(timeout_args)
+        if model.batch and model.batch.http2:
+            import httpx
+
+            try:
+                import h2  # noqa: F401
+
+                # One multiplexed connection carries the whole batch
+                client_args = {
+                    "http_client": httpx.Client(
+                        http2=True,
+                        timeout=timeout_args.get("timeout", httpx.Timeout(600, connect=5)),
+                        limits=httpx.Limits(max_connections=1),
+                    )
+                }
+            except ImportError:
+                pass  # HTTP/1.1 keep-alive pool, requests are still sent together
+
+        return OpenAI(
+            api_key=self.api_key(model),
+            base_url=str(model.host),
+            max_retries=0,
+            **client_args,
+        )
+
+    def list_models(self, api_key: Optional[str] = None, host: Optional[str] = None, timeout: Optional[float] = None) -> list[str]:
+        from openai import OpenAI
+
+        client = OpenAI(
+            api_key=api_key or os.getenv(self.api_key_env, default="nokey"),
+            base_url=host,
+            timeout=timeout,
+            max_retries=0,
+        )
+        return [m.id for m in client.models.list()]
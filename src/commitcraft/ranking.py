@@ -0,0 +1,222 @@
+import fnmatch
+import math
+import os
+import re
+from typing import List, Optional
+
+from pydantic import BaseModel
+
+from .CommitCraft import estimate_tokens
+
+# Relative value of a change by kind of file, applied to every hunk of the file
+FILE_KIND_WEIGHTS = {
+    "source": 1.0,
+    "test": 0.6,
+    "config": 0.5,
+    "docs": 0.4,
+    "generated": 0.1,
+}
+GENERATED_PATTERNS = (
+    "*.lock", "*-lock.json", "*-lock.yaml", "go.sum", "*.min.js", "*.min.css",
+    "*.map", "*.svg", "*.pb.go", "*_pb2.py", "*.snap",
+)
+TEST_PATTERNS = ("test_*", "*_test.*", "*_tests.*", "*.test.*", "*.spec.*", "conftest.py")
+TEST_DIRS = {"test", "tests", "__tests__", "spec", "testing"}
+DOCS_EXTENSIONS = {".md", ".rst", ".txt", ".adoc"}
+CONFIG_EXTENSIONS = {".toml", ".yaml", ".yml", ".json", ".ini", ".cfg", ".conf", ".env", ".xml"}
+CONFIG_NAMES = {"Dockerfile", "Makefile", ".gitignore", ".gitattributes", "setup.py"}
+
+# Smallest beginning of an oversized hunk worth showing
+MIN_PARTIAL_TOKENS = 256
+
+# Added or removed definition of a public symbol (no leading underscore)
+PUBLIC_SYMBOL = re.compile(
+    r"^[+-]\s*(?:export\s+(?:default\s+)?|pub(?:\([\w:]+\))?\s+|public\s+)?(?:async\s+)?"
+    r"(?:def|class|function|fn|func|interface|struct|enum|trait|type)\s+(?:\([^)]*\)\s*)?[A-Za-z]\w*"
+)
+
+
+class Hunk(BaseModel):
+    """One `@@` hunk of a file diff"""
+
+    text: str
+    added: int = 0
+    removed: int = 0
+    public_symbols: int = 0
+    score: float = 0.0
+
+
+class FileDiff(BaseModel):
+    """The diff of one file: its `diff --git` header and its hunks"""
+
+    path: str
+    header: str
+    hunks: List[Hunk] = []
+
+    @property
+    def added(self) -> int:
+        return sum(hunk.added for hunk in self.hunks)
+
+    @property
+    def removed(self) -> int:
+        return sum(hunk.removed for hunk in self.hunks)
+
+
+def file_kind(path: str) -> str:
+    """Classify a path as source, test, config, docs or generated"""
+    name = os.path.basename(path)
+    extension = os.path.splitext(name)[1].lower()
+    if any(fnmatch.fnmatch(name, pattern) for pattern in GENERATED_PATTERNS):
+        return "generated"
+    if any(fnmatch.fnmatch(name, pattern) for pattern in TEST_PATTERNS) or TEST_DIRS & set(
+        path.split("/")[:-1]
+    ):
+        return "test"
+    if extension in DOCS_EXTENSIONS or path.startswith("docs/"):
+        return "docs"
+    if extension in CONFIG_EXTENSIONS or name in CONFIG_NAMES:
+        return "config"
+    return "source"
+
+
+def parse_diff(diff: str) -> List[FileDiff]:
+    """Split a unified git diff in files and hunks, keeping every line"""
+    files: List[FileDiff] = []
+    for block in re.split(r"(?m)^(?=diff --git )", diff):
+        if not block.startswith("diff --git "):
+            continue
+        parts = block.split("\n", 1)[0].split()
+        path = parts[3][2:] if len(parts) > 3 else parts[-1]
+        chunks = re.split(r"(?m)^(?=@@ )", block)
+        file_diff = FileDiff(path=path, header=chunks[0])
+        for text in chunks[1:]:
+            hunk = Hunk(text=text)
+            for line in text.splitlines()[1:]:
+                if line.startswith("+"):
+                    hunk.added += 1
+                elif line.startswith("-"):
+                    hunk.removed += 1
+                else:
+                    continue
+                if PUBLIC_SYMBOL.match(line):
+                    hunk.public_symbols += 1
+            file_diff.hunks.append(hunk)
+        files.append(file_diff)
+    return files
+
+
+def score_hunks(files: List[FileDiff]):
+    """Value of each hunk: file kind weight, size of the change (log scaled) and public API changes"""
+    for file_diff in files:
+        weight = FILE_KIND_WEIGHTS[file_kind(file_diff.path)]
+        for hunk in file_diff.hunks:
+            changed = hunk.added + hunk.removed
+            hunk.score = weight * math.log2(2 + changed) * (1 + hunk.public_symbols)
+
+
+def diff_stat(files: List[FileDiff], shown: Optional[dict] = None, width: int = 20) -> str:
+    """`git diff --stat` like listing of `files`, noting how many hunks of each were shown"""
+    if not files:
+        return ""
+    shown = shown or {}
+    name_width = max(len(file_diff.path) for file_diff in files)
+    most = max(max(file_diff.added + file_diff.removed for file_diff in files), 1)
+    lines = []
+    for file_diff in files:
+        changed = file_diff.added + file_diff.removed
+        bar = round(width * changed / most) if changed > width else changed
+        plus = round(bar * file_diff.added / changed) if changed else 0
+        line = f" {file_diff.path.ljust(name_width)} | {changed:>5} {'+' * plus}{'-' * (bar - plus)}"
+        if shown.get(file_diff.path):
+            line += f" ({shown[file_diff.path]} of {len(file_diff.hunks)} hunks shown)"
+        lines.append(line)
+    return "\n".join(lines)
+
+
+def truncate_hunk(text: str, max_tokens: int) -> str:
+    """First lines of a hunk within `max_tokens`, noting how many lines were cut"""
+    lines = text.splitlines(keepends=True)
+    kept, used = [], estimate_tokens("... 000000 more lines of this hunk left out\n")
+    for line in lines:
+        used += estimate_tokens(line)
+        if used > max_tokens:
+            break
+        kept.append(line)
+    return "".join(kept) + f"... {len(lines) - len(kept)} more lines of this hunk left out\n"
+
+
+def fit_diff(diff: str, max_tokens: int) -> str:
+    """Keep the most valuable hunks of `diff` within `max_tokens`.
+
+    Hunks are packed greedily by score, kept in their original order, and the
+    files or hunks left out are listed after the diff in a `--stat` like summary.
+    Diffs already within the budget are returned unchanged.
+    """
+    if estimate_tokens(diff) <= max_tokens:
+        return diff
+
+    files = parse_diff(diff)
+    score_hunks(files)
+    # Room for the summary of what is left out, at most a quarter of the budget
+    reserve = min(estimate_tokens(diff_stat(files)), max_tokens // 4) + 32
+    budget = max_tokens - reserve
+
+    ranked = sorted(
+        ((hunk.score, file_index, hunk_index)
+         for file_index, file_diff in enumerate(files)
+         for hunk_index, hunk in enumerate(file_diff.hunks)),
+        reverse=True,
+    )
+    kept: set[tuple[int, int]] = set()
+    headers: set[int] = set()
+    # Renames, mode changes and binary files are only a header, always worth showing
+    header_only = {
+        file_index
+        for file_index, file_diff in enumerate(files)
+        if not file_diff.hunks and estimate_tokens(file_diff.header) < 64
+    }
+    used = sum(estimate_tokens(files[file_index].header) for file_index in header_only)
+    texts: dict[tuple[int, int], str] = {}
+    truncated: set[int] = set()
+    for _, file_index, hunk_index in ranked:
+        text = files[file_index].hunks[hunk_index].text
+        header_cost = 0 if file_index in headers else estimate_tokens(files[file_index].header)
+        if used + header_cost + estimate_tokens(text) > budget:
+            # A hunk larger than what is left still shows its beginning when there is room for it
+            room = budget - used - header_cost
+            if room < MIN_PARTIAL_TOKENS:
+                continue
+            text = truncate_hunk(text, room)
+            truncated.add(file_index)
+        used += header_cost + estimate_tokens(text)
+        kept.add((file_index, hunk_index))
+        texts[(file_index, hunk_index)] = text
+        headers.add(file_index)
+
+    shown_parts, left_out, shown = [], [], {}
+    for file_index, file_diff in enumerate(files):
+        hunks = [texts[(file_index, hunk_index)] for hunk_index in range(len(file_diff.hunks)) if (file_index, hunk_index) in kept]
+        if file_index in header_only:
+            shown_parts.append(file_diff.header)
+            continue
+        if hunks:
+            shown_parts.append(file_diff.header + "".join(hunks))
+        if len(hunks) < len(file_diff.hunks) or file_index in truncated or not file_diff.hunks:
+            left_out.append(file_diff)
+            if hunks:
+                shown[file_diff.path] = len(hunks)
+
+    summary = ""
+    if left_out:
+        stat_lines, room = [], max_tokens - used - 32
+        for line in diff_stat(left_out, shown).splitlines():
+            room -= estimate_tokens(line)
+            if room < 0:
+                stat_lines.append(f" ... and {len(left_out) - len(stat_lines)} more files")
+                break
+            stat_lines.append(line)
+        summary = (
+            f"\n\nChanges left out of the diff above to fit the context ({len(left_out)} files):\n"
+            + "\n".join(stat_lines)
+        )
+    return "".join(shown_parts).rstrip("\n") + summary
@@ -0,0 +1,304 @@
+import asyncio
+import email.utils
+import hashlib
+import random
+import threading
+import time
+from typing import Any, Awaitable, Callable, Hashable, Optional
+
+# HTTP statuses worth retrying: timeouts, rate limits and transient server errors.
+RETRYABLE_STATUS = {408, 409, 425, 429, 500, 502, 503, 504, 529}
+
+# Connection level failures raised by the provider SDKs (openai, groq) and httpx.
+RETRYABLE_ERROR_NAMES = {
+    "APIConnectionError",
+    "APITimeoutError",
+    "ConnectError",
+    "ReadTimeout",
+    "ConnectTimeout",
+    "RemoteProtocolError",
+}
+
+# Seconds between two cancellation checks of an async wait, a Deadline is cancelled from threads
+CANCEL_POLL_INTERVAL = 0.1
+
+
+class DeadlineExceeded(TimeoutError):
+    """Raised when a request outlives its deadline or is cancelled."""
+
+
+class Deadline:
+    """Wall clock budget for one request, shared by its retries and cancellable from any thread.
+
+    Clients register their `close` through `on_cancel`, so cancelling the deadline
+    (Ctrl-C or expiry) tears down the in-flight HTTP connection instead of waiting for it.
+    """
+
+    def __init__(self, seconds: Optional[float] = None):
+        self.expires_at = time.monotonic() + seconds if seconds else None
+        self._cancelled = threading.Event()
+        self._callbacks: list[Callable[[], Any]] = []
+        self._lock = threading.Lock()
+
+    def remaining(self) -> Optional[float]:
+        """Seconds left, None when the deadline has no time limit."""
+        if self.expires_at is None:
+            return None
+        return max(self.expires_at - time.monotonic(), 0.0)
+
+    @property
+    def cancelled(self) -> bool:
+        return self._cancelled.is_set()
+
+    @property
+    def expired(self) -> bool:
+        return self.cancelled or self.remaining() == 0.0
+
+    def check(self):
+        if self.expired:
+            raise DeadlineExceeded("Request deadline exceeded")
+
+    def wait(self, seconds: float) -> bool:
+        """Sleep up to `seconds`, returns True if the deadline was cancelled meanwhile."""
+        return self._cancelled.wait(seconds)
+
+    def on_cancel(self, callback: Callable[[], Any]):
+        """Register a callback (usually a client `close`) to run on cancellation."""
+        with self._lock:
+            if not self.cancelled:
+                self._callbacks.append(callback)
+                return
+        callback()
+
+    def cancel(self):
+        """Cancel the request, closing every registered client."""
+        with self._lock:
+            if self.cancelled:
+                return
+            self._cancelled.set()
+            callbacks, self._callbacks = self._callbacks, []
+        for callback in callbacks:
+            try:
+                callback()
+            except Exception:
+                pass
+
+
+class TokenBucket:
+    """Thread safe token bucket refilled continuously at `rate_per_minute`.
+
+    Callers reserve capacity up front, so concurrent threads and async tasks
+    are served in the order they asked and each one is told how long to wait.
+    """
+
+    def __init__(self, rate_per_minute: int):
+        self.capacity = float(rate_per_minute)
+        self.rate = rate_per_minute / 60.0
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def reserve(self, amount: float = 1.0) -> float:
+        """Reserve `amount` tokens and return the seconds to wait before using them."""
+        amount = min(amount, self.capacity)
+        with self._lock:
+            now = time.monotonic()
+            self.tokens = min(
+                self.capacity, self.tokens + (now - self.updated) * self.rate
+            )
+            self.updated = now
+            self.tokens -= amount
+            if self.tokens >= 0:
+                return 0.0
+            return -self.tokens / self.rate
+
+
+def status_code(exc: BaseException) -> Optional[int]:
+    """Extract the HTTP status from an SDK exception (openai, groq, ollama, google)."""
+    for attr in ("status_code", "code"):
+        value = getattr(exc, attr, None)
+        if isinstance(value, int) and not isinstance(value, bool):
+            return value
+    return None
+
+
+def retry_after(exc: BaseException) -> Optional[float]:
+    """Seconds requested by the server through the `Retry-After` header, if any."""
+    response = getattr(exc, "response", None)
+    headers = getattr(response, "headers", None)
+    if not headers:
+        return None
+    try:
+        if headers.get("retry-after-ms"):
+            return float(headers.get("retry-after-ms")) / 1000
+        value = headers.get("retry-after")
+    except Exception:
+        return None
+    if not value:
+        return None
+    try:
+        return max(float(value), 0.0)
+    except ValueError:
+        pass
+    try:
+        retry_at = email.utils.parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    return max(retry_at.timestamp() - time.time(), 0.0)
+
+
+def is_retryable(exc: BaseException) -> bool:
+    """Decide if a failed provider call is transient and can be attempted again."""
+    if isinstance(exc, DeadlineExceeded):
+        return False
+    code = status_code(exc)
+    if code is not None:
+        return code in RETRYABLE_STATUS
+    if isinstance(exc, (ConnectionError, TimeoutError)):
+        return True
+    return any(cls.__name__ in RETRYABLE_ERROR_NAMES for cls in type(exc).__mro__)
+
+
+def backoff_delay(attempt: int, exc: BaseException, config) -> float:
+    """Exponential backoff with full jitter, overridden by the server `Retry-After`."""
+    requested = retry_after(exc)
+    if requested is not None:
+        return requested
+    ceiling = min(config.backoff_max, config.backoff_base * (2**attempt))
+    return random.uniform(0, ceiling)
+
+
+class RequestScheduler:
+    """Shares per provider/key rate limits across threads and async tasks and retries transient failures."""
+
+    def __init__(self):
+        self._buckets: dict[tuple, TokenBucket] = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _key(key: tuple) -> tuple:
+        # Never keep API keys around in clear text, a digest is enough to tell them apart.
+        return tuple(
+            hashlib.sha256(part.encode()).hexdigest()[:16]
+            if isinstance(part, str) and part
+            else part
+            for part in key
+        )
+
+    def _bucket(self, key: tuple, kind: str, rate: Optional[int]) -> Optional[TokenBucket]:
+        if not rate:
+            return None
+        bucket_key = (*self._key(key), kind, rate)
+        with self._lock:
+            bucket = self._buckets.get(bucket_key)
+            if bucket is None:
+                bucket = self._buckets[bucket_key] = TokenBucket(rate)
+            return bucket
+
+    def _reserve(self, key: tuple, config, tokens: int) -> float:
+        wait = 0.0
+        requests_bucket = self._bucket(key, "requests", config.requests_per_minute)
+        if requests_bucket:
+            wait = max(wait, requests_bucket.reserve(1))
+        tokens_bucket = self._bucket(key, "tokens", config.tokens_per_minute)
+        if tokens_bucket and tokens:
+            wait = max(wait, tokens_bucket.reserve(tokens))
+        return wait
+
+    def call(
+        self,
+        key: Hashable,
+        config,
+        func: Callable[[], Any],
+        tokens: int = 0,
+        deadline: Optional[Deadline] = None,
+        sleep: Callable[[float], None] = time.sleep,
+    ) -> Any:
+        """Run `func` once the limits for `key` allow it, retrying transient errors until `deadline`."""
+
+        def pause(seconds: float):
+            if deadline is None:
+                sleep(seconds)
+                return
+            remaining = deadline.remaining()
+            if remaining is not None and seconds >= remaining:
+                raise DeadlineExceeded("Request deadline exceeded while waiting to retry")
+            if deadline.wait(seconds):
+                raise DeadlineExceeded("Request cancelled")
+
+        attempt = 0
+        while True:
+            if deadline:
+                deadline.check()
+            wait = self._reserve(key, config, tokens)
+            if wait:
+                pause(wait)
+            try:
+                return func()
+            except Exception as exc:
+                if deadline and deadline.expired:
+                    raise DeadlineExceeded("Request deadline exceeded") from exc
+                if attempt >= config.max_retries or not is_retryable(exc):
+                    raise
+                pause(backoff_delay(attempt, exc, config))
+                attempt += 1
+
+    async def acall(
+        self,
+        key: Hashable,
+        config,
+        func: Callable[[], Awaitable[Any]],
+        tokens: int = 0,
+        deadline: Optional[Deadline] = None,
+        sleep: Callable[[float], Awaitable[None]] = asyncio.sleep,
+    ) -> Any:
+        """Async counterpart of `call`, sharing its buckets; `func` returns an awaitable."""
+
+        async def pause(seconds: float):
+            if deadline is None:
+                await sleep(seconds)
+                return
+            remaining = deadline.remaining()
+            if remaining is not None and seconds >= remaining:
+                raise DeadlineExceeded("Request deadline exceeded while waiting to retry")
+            wake_at = time.monotonic() + seconds
+            while not deadline.cancelled and time.monotonic() < wake_at:
+                await asyncio.sleep(min(CANCEL_POLL_INTERVAL, wake_at - time.monotonic()))
+            if deadline.cancelled:
+                raise DeadlineExceeded("Request cancelled")
+
+        async def run_once() -> tuple[bool, Any]:
+            # Failures of the call are returned, so a TimeoutError out of
+            # `wait_for` can only be the deadline, never the provider's own
+            try:
+                return True, await func()
+            except Exception as exc:
+                return False, exc
+
+        attempt = 0
+        while True:
+            if deadline:
+                deadline.check()
+            wait = self._reserve(key, config, tokens)
+            if wait:
+                await pause(wait)
+            remaining = deadline.remaining() if deadline else None
+            try:
+                if remaining is None:
+                    succeeded, result = await run_once()
+                else:
+                    succeeded, result = await asyncio.wait_for(run_once(), remaining)
+            except asyncio.TimeoutError as exc:
+                raise DeadlineExceeded("Request deadline exceeded") from exc
+            if succeeded:
+                return result
+            if deadline and deadline.expired:
+                raise DeadlineExceeded("Request deadline exceeded") from result
+            if attempt >= config.max_retries or not is_retryable(result):
+                raise result
+            await pause(backoff_delay(attempt, result, config))
+            attempt += 1
+
+
+# Process wide scheduler, shared by every commit_craft call.
+scheduler = RequestScheduler()
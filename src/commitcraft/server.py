@@ -0,0 +1,212 @@
+import json
+import threading
+import time
+from concurrent.futures import Future
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, Optional
+
+from pydantic import BaseModel, ValidationError
+
+from .cache import ResponseCache, cache_key
+from .CommitCraft import CommitCraftInput, EmojiConfig, LModel, commit_craft
+from .scheduler import DeadlineExceeded
+from .thinking import split_thinking
+
+
+class ServerConfig(BaseModel):
+    """The `[server]` configuration section"""
+
+    host: str = "127.0.0.1"
+    port: int = 8808
+    max_concurrency: int = 2  # Simultaneous requests (batches with micro-batching) per backend (provider + host)
+    cache_size: int = 1024
+    cache_ttl: Optional[float] = 3600  # Seconds, None keeps entries until evicted
+
+
+class GenerateRequest(CommitCraftInput):
+    """Body of `POST /generate`: a CommitCraftInput plus optional model selection"""
+
+    provider: Optional[str] = None  # Provider type or named provider profile
+    model: Optional[str] = None
+
+
+class Metrics:
+    """Counters exposed on `/metrics` in the Prometheus text format"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.counters = {
+            "requests_total": 0,
+            "errors_total": 0,
+            "cache_hits_total": 0,
+            "coalesced_total": 0,
+            "generations_total": 0,
+            "generation_seconds_sum": 0.0,
+        }
+        self.in_flight = 0
+
+    def inc(self, name: str, value: float = 1):
+        with self._lock:
+            self.counters[name] += value
+
+    def track_in_flight(self, delta: int):
+        with self._lock:
+            self.in_flight += delta
+
+    def render(self, cache_entries: int) -> str:
+        with self._lock:
+            lines = []
+            for name, value in self.counters.items():
+                metric = f"commitcraft_{name}"
+                lines.append(f"# TYPE {metric} counter")
+                lines.append(f"{metric} {value}")
+            lines.append("# TYPE commitcraft_in_flight gauge")
+            lines.append(f"commitcraft_in_flight {self.in_flight}")
+            lines.append("# TYPE commitcraft_cache_entries gauge")
+            lines.append(f"commitcraft_cache_entries {cache_entries}")
+            return "\n".join(lines) + "\n"
+
+
+class CommitCraftService:
+    """Shared generation service: response cache, coalescing of identical requests
+    and a concurrency limit per backend in front of `commit_craft`."""
+
+    def __init__(
+        self,
+        resolve_model: Callable[[Optional[str], Optional[str], str], LModel],
+        context: dict,
+        emoji: EmojiConfig,
+        settings: ServerConfig = ServerConfig(),
+    ):
+        self.resolve_model = resolve_model
+        self.context = context
+        self.emoji = emoji
+        self.settings = settings
+        self.cache = ResponseCache(settings.cache_size, settings.cache_ttl)
+        self.metrics = Metrics()
+        self._inflight: dict[str, Future] = {}
+        self._backends: dict[tuple, threading.BoundedSemaphore] = {}
+        self._lock = threading.Lock()
+
+    def _backend_slot(self, model: LModel) -> threading.BoundedSemaphore:
+        # With micro-batching the limit counts batches, not requests: the batcher
+        # sits in front of it and needs enough requests to fill a batch
+        batch_size = model.batch.max_batch_size if model.batch else 1
+        backend = (model.provider_name, str(model.host or ""), batch_size)
+        with self._lock:
+            slot = self._backends.get(backend)
+            if slot is None:
+                slot = self._backends[backend] = threading.BoundedSemaphore(
+                    self.settings.max_concurrency * batch_size
+                )
+            return slot
+
+    def generate(self, request: GenerateRequest) -> tuple[str, str]:
+        """Return (response, origin) where origin is `cache`, `coalesced` or `generated`"""
+        model = self.resolve_model(request.provider, request.model, request.diff)
+        commit_input = CommitCraftInput(
+            **request.model_dump(include=set(CommitCraftInput.model_fields))
+        )
+        key = cache_key(
+            commit_input.model_dump(),
+            model.model_dump(exclude={"api_key"}),
+            self.context,
+            self.emoji.model_dump(),
+        )
+
+        with self._lock:
+            cached = self.cache.get(key)
+            if cached is not None:
+                self.metrics.inc("cache_hits_total")
+                return cached, "cache"
+            future = self._inflight.get(key)
+            leader = future is None
+            if leader:
+                future = self._inflight[key] = Future()
+
+        if not leader:
+            # Identical request already running, wait for its result
+            self.metrics.inc("coalesced_total")
+            return future.result(), "coalesced"
+
+        try:
+            with self._backend_slot(model):
+                started = time.monotonic()
+                response = commit_craft(commit_input, model, self.context, self.emoji)
+                self.metrics.inc("generations_total")
+                self.metrics.inc("generation_seconds_sum", time.monotonic() - started)
+            self.cache.set(key, response)
+            future.set_result(response)
+            return response, "generated"
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        finally:
+            with self._lock:
+                self._inflight.pop(key, None)
+
+
+def make_handler(service: CommitCraftService):
+    class CommitCraftHandler(BaseHTTPRequestHandler):
+        server_version = "CommitCraft"
+
+        def log_message(self, format, *args):
+            pass
+
+        def _send(self, status: int, body: str, content_type: str = "application/json"):
+            data = body.encode()
+            self.send_response(status)
+            self.send_header("Content-Type", content_type)
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def _send_json(self, status: int, payload: dict):
+            self._send(status, json.dumps(payload))
+
+        def do_GET(self):
+            if self.path == "/metrics":
+                self._send(
+                    200,
+                    service.metrics.render(len(service.cache)),
+                    "text/plain; version=0.0.4",
+                )
+            elif self.path == "/health":
+                self._send_json(200, {"status": "ok"})
+            else:
+                self._send_json(404, {"error": "not found"})
+
+        def do_POST(self):
+            if self.path != "/generate":
+                self._send_json(404, {"error": "not found"})
+                return
+
+            service.metrics.inc("requests_total")
+            service.metrics.track_in_flight(1)
+            try:
+                length = int(self.headers.get("Content-Length", 0))
+                request = GenerateRequest.model_validate_json(self.rfile.read(length))
+                response, origin = service.generate(request)
+                thinking, message = split_thinking(response)
+                self._send_json(
+                    200, {"message": message, "thinking": thinking, "origin": origin}
+                )
+            except (ValidationError, ValueError) as e:
+                service.metrics.inc("errors_total")
+                self._send_json(400, {"error": str(e)})
+            except DeadlineExceeded as e:
+                service.metrics.inc("errors_total")
+                self._send_json(504, {"error": str(e)})
+            except Exception as e:
+                service.metrics.inc("errors_total")
+                self._send_json(502, {"error": f"{type(e).__name__}: {e}"})
+            finally:
+                service.metrics.track_in_flight(-1)
+
+    return CommitCraftHandler
+
+
+def make_server(service: CommitCraftService, host: str, port: int) -> ThreadingHTTPServer:
+    server = ThreadingHTTPServer((host, port), make_handler(service))
+    server.daemon_threads = True
+    return server
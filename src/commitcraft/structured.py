@@ -0,0 +1,54 @@
+import json
+import re
+from typing import List, Optional
+
+from jinja2 import Template
+
+CHANGE_TYPES = ["feat", "fix", "docs", "style", "refactor", "perf", "test", "build", "ci", "chore", "revert"]
+
+JSON_OBJECT = re.compile(r"\{.*\}", re.DOTALL)
+# Prefixes the model may still write in the title although they have their own fields
+TYPE_PREFIX = re.compile(r"^(\w+)(?:\([^)]*\))?!?:\s*")
+
+
+def commit_schema(types: List[str] = CHANGE_TYPES) -> dict:
+    """JSON schema of a structured answer, accepted by OpenAI's strict mode"""
+    return {
+        "type": "object",
+        "properties": {
+            "title": {"type": "string"},
+            "body": {"type": "string"},
+            "type": {"type": "string", "enum": list(types)},
+            "emoji": {"type": "string"},
+        },
+        "required": ["title", "body", "type", "emoji"],
+        "additionalProperties": False,
+    }
+
+
+def parse_fields(answer: str) -> Optional[dict]:
+    """Fields of a structured answer, code fences and text around the object tolerated; None when unusable"""
+    match = JSON_OBJECT.search(answer)
+    if not match:
+        return None
+    try:
+        fields = json.loads(match.group(0))
+    except ValueError:
+        return None
+    if not isinstance(fields, dict) or not str(fields.get("title") or "").strip():
+        return None
+    return {name: str(fields.get(name) or "").strip() for name in ("title", "body", "type", "emoji")}
+
+
+def assemble_message(fields: dict, title_format: str) -> str:
+    """Commit message from the fields, the title rendered with `title_format`"""
+    title = fields["title"]
+    if fields["emoji"] and title.startswith(fields["emoji"]):
+        title = title[len(fields["emoji"]):].lstrip()
+    prefix = TYPE_PREFIX.match(title)
+    if prefix and prefix.group(1).lower() == fields["type"].lower():
+        title = title[prefix.end():]
+    title = Template(title_format).render(**{**fields, "title": title})
+    # Empty fields leave doubled or dangling spaces behind
+    title = " ".join(title.split())
+    return f"{title}\n\n{fields['body']}" if fields["body"] else title
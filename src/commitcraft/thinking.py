@@ -0,0 +1,81 @@
+from typing import Iterable, Tuple
+
+THINK_OPEN = "<think>"
+THINK_CLOSE = "</think>"
+
+
+class ThinkParser:
+    """Streaming state machine splitting `<think>...</think>` blocks from the answer.
+
+    Chunks can be fed as they arrive from the model; tags split across chunks are
+    held back until they can be told apart from regular text, so every character
+    is looked at a constant number of times.
+    """
+
+    def __init__(self):
+        self.in_think = False
+        self._pending = ""
+        self._thinking: list[str] = []
+        self._content: list[str] = []
+
+    def feed(self, chunk: str) -> str:
+        """Consume a chunk and return the part of the answer that it completed"""
+        text = self._pending + chunk
+        self._pending = ""
+        emitted = []
+        position = 0
+        while position < len(text):
+            tag = THINK_CLOSE if self.in_think else THINK_OPEN
+            index = text.find(tag, position)
+            if index == -1:
+                # Hold back a trailing partial tag, it may complete in the next chunk
+                keep = self._partial_tag_length(text, tag)
+                self._route(text[position:len(text) - keep], emitted)
+                self._pending = text[len(text) - keep:]
+                break
+            self._route(text[position:index], emitted)
+            self.in_think = not self.in_think
+            position = index + len(tag)
+        return "".join(emitted)
+
+    def close(self) -> str:
+        """Flush what is left once the stream is over"""
+        emitted = []
+        self._route(self._pending, emitted)
+        self._pending = ""
+        return "".join(emitted)
+
+    @property
+    def thinking(self) -> str:
+        return "".join(self._thinking).strip()
+
+    @property
+    def content(self) -> str:
+        return "".join(self._content).strip()
+
+    def _route(self, text: str, emitted: list):
+        if not text:
+            return
+        if self.in_think:
+            self._thinking.append(text)
+        else:
+            self._content.append(text)
+            emitted.append(text)
+
+    @staticmethod
+    def _partial_tag_length(text: str, tag: str) -> int:
+        for length in range(min(len(tag) - 1, len(text)), 0, -1):
+            if text.endswith(tag[:length]):
+                return length
+        return 0
+
+
+def split_thinking(chunks: Iterable[str] | str) -> Tuple[str, str]:
+    """Return (thinking, answer) from a full response or an iterable of streamed chunks"""
+    if isinstance(chunks, str):
+        chunks = (chunks,)
+    parser = ThinkParser()
+    for chunk in chunks:
+        parser.feed(chunk)
+    parser.close()
+    return parser.thinking, parser.content
@@ -0,0 +1,41 @@
+import subprocess
+
+import pytest
+
+
+class Repo:
+    """A throwaway git repository"""
+
+    def __init__(self, path):
+        self.path = path
+        self.git("init", "-q")
+        self.git("config", "user.name", "Test")
+        self.git("config", "user.email", "test@example.com")
+
+    def git(self, *args: str) -> str:
+        return subprocess.run(
+            ["git", *args], cwd=self.path, check=True, capture_output=True, text=True
+        ).stdout
+
+    def write(self, name: str, content: str):
+        file = self.path / name
+        file.parent.mkdir(parents=True, exist_ok=True)
+        file.write_text(content)
+
+    def commit(self, **files: str):
+        for name, content in files.items():
+            self.write(name, content)
+        self.git("add", "-A")
+        self.git("commit", "-q", "-m", "update")
+
+    def stage(self, **files: str) -> str:
+        """Stage `files` and return the staged diff"""
+        for name, content in files.items():
+            self.write(name, content)
+        self.git("add", "-A")
+        return self.git("diff", "--cached")
+
+
+@pytest.fixture
+def repo(tmp_path) -> Repo:
+    return Repo(tmp_path)
@@ -0,0 +1,125 @@
+import json
+
+import pytest
+
+from commitcraft.backfill import advance_job, create_job, list_jobs, load_job
+from commitcraft.CommitCraft import LModel
+from commitcraft.providers import BaseProvider, Capabilities, get_provider, register_provider
+from commitcraft.thinking import split_thinking
+
+
+class StubBatchProvider(BaseProvider):
+    """In-memory batch API: a batch completes on its second poll, its first request fails"""
+
+    capabilities = Capabilities(batching=True)
+    default_model = "stub-model"
+
+    def __init__(self):
+        super().__init__()
+        self.files: dict[str, str] = {}
+        self.batches: dict[str, dict] = {}
+        self.lose_creation = False
+
+    def batch_line(self, custom_id: str, request) -> dict:
+        return {"custom_id": custom_id, "prompt": request.prompt}
+
+    def upload_batch(self, model, path: str) -> str:
+        file_id = f"file-{len(self.files)}"
+        with open(path) as f:
+            self.files[file_id] = f.read()
+        return file_id
+
+    def create_batch(self, model, file_id: str, job_id=None) -> str:
+        batch_id = f"batch-{len(self.batches)}"
+        self.batches[batch_id] = {"input_file_id": file_id, "job_id": job_id, "polls": 0}
+        if self.lose_creation:
+            self.lose_creation = False
+            raise ConnectionError("connection reset before the answer")
+        return batch_id
+
+    def find_batch(self, model, job_id: str):
+        return next((batch_id for batch_id, batch in self.batches.items() if batch["job_id"] == job_id), None)
+
+    def retrieve_batch(self, model, batch_id: str) -> dict:
+        batch = self.batches[batch_id]
+        batch["polls"] += 1
+        lines = [json.loads(line) for line in self.files[batch["input_file_id"]].splitlines()]
+        if batch["polls"] < 2:
+            return {"status": "in_progress", "output_file_id": None, "error_file_id": None, "request_counts": {}}
+        self.files["output"] = "".join(
+            json.dumps({"custom_id": line["custom_id"], "response": f"<think>…</think>Update {line['custom_id'][:7]}"}) + "\n"
+            for line in lines[1:]
+        )
+        self.files["errors"] = json.dumps({"custom_id": lines[0]["custom_id"], "error": "context length exceeded"}) + "\n"
+        return {
+            "status": "completed",
+            "output_file_id": "output",
+            "error_file_id": "errors",
+            "request_counts": {"total": len(lines), "completed": len(lines) - 1, "failed": 1},
+        }
+
+    def download_batch(self, model, file_id: str) -> str:
+        return self.files[file_id]
+
+    def parse_batch_line(self, line: dict) -> tuple:
+        return line["custom_id"], line.get("response"), line.get("error")
+
+
+class StubProvider(BaseProvider):
+    default_model = "stub-model"
+
+
+@pytest.fixture
+def provider() -> StubBatchProvider:
+    register_provider("stub_batch", StubBatchProvider)
+    return get_provider("stub_batch")
+
+
+@pytest.fixture
+def commits(repo, monkeypatch) -> list[str]:
+    repo.commit(**{"app.py": "x = 1\n"})
+    repo.commit(**{"app.py": "x = 2\n"})
+    repo.commit(**{"app.py": "x = 3\n", "README.md": "# App\n"})
+    monkeypatch.chdir(repo.path)
+    return repo.git("rev-list", "--reverse", "HEAD~2..HEAD").split()
+
+
+def test_job_runs_to_completion(provider, commits):
+    model = LModel(provider="stub_batch")
+    job = create_job("HEAD~2..HEAD", model)
+    assert job.commits == commits
+    assert "batches/" in open(".commitcraft/.gitignore").read().splitlines()
+
+    job = advance_job(job, model)
+    assert job.status == "in_progress"
+    assert not job.done
+    assert load_job(job.id).batch_id == "batch-0"
+
+    job = advance_job(job, model)
+    assert job.done
+    assert list(job.results) == [commits[1]]
+    assert split_thinking(job.results[commits[1]]) == ("…", f"Update {commits[1][:7]}")
+    assert job.errors == {commits[0]: "context length exceeded"}
+    assert load_job(job.id).results == job.results
+    assert [saved.id for saved in list_jobs()] == [job.id]
+
+
+def test_lost_batch_creation_is_found_instead_of_created_again(provider, commits):
+    model = LModel(provider="stub_batch")
+    job = create_job("HEAD~2..HEAD", model)
+    provider.lose_creation = True
+    with pytest.raises(ConnectionError):
+        advance_job(job, model)
+    job = load_job(job.id)
+    assert job.status == "submitting"
+
+    job = advance_job(job, model)
+    assert job.batch_id == "batch-0"
+    assert len(provider.batches) == 1
+    assert len(provider.files) == 1  # The input file is not uploaded again
+
+
+def test_provider_without_batch_api(commits):
+    register_provider("stub", StubProvider)
+    with pytest.raises(ValueError, match="no batch API"):
+        create_job("HEAD~2..HEAD", LModel(provider="stub"))
@@ -0,0 +1,55 @@
+import os
+
+from commitcraft.cache import SimilarityCache
+
+SCOPE = "scope"
+
+
+def diff(*changes: str, start: int = 10) -> str:
+    lines = "".join(f"-    {old}\n+    {new}\n" for old, new in changes)
+    return (
+        "diff --git a/app.py b/app.py\nindex 1111111..2222222 100644\n--- a/app.py\n+++ b/app.py\n"
+        f"@@ -{start},{len(changes)} +{start},{len(changes)} @@\n{lines}"
+    )
+
+
+CHANGES = [(f"timeout = {i}", f"timeout = settings.timeout_{i}") for i in range(20)]
+
+
+def test_exact_hit_ignores_offsets_and_index_lines(tmp_path):
+    cache = SimilarityCache(str(tmp_path / "cache.sqlite"))
+    cache.store(SCOPE, diff(*CHANGES), "Read timeouts from settings")
+    rebased = diff(*CHANGES, start=42).replace("1111111..2222222", "3333333..4444444")
+    assert cache.exact(SCOPE, rebased) == "Read timeouts from settings"
+
+
+def test_exact_miss_on_another_change_or_scope(tmp_path):
+    cache = SimilarityCache(str(tmp_path / "cache.sqlite"))
+    cache.store(SCOPE, diff(*CHANGES), "Read timeouts from settings")
+    assert cache.exact(SCOPE, diff(*CHANGES[:-1])) is None
+    assert cache.exact("other", diff(*CHANGES)) is None
+
+
+def test_nearest_prefers_the_most_similar_change(tmp_path):
+    cache = SimilarityCache(str(tmp_path / "cache.sqlite"))
+    cache.store(SCOPE, diff(*CHANGES), "Read timeouts from settings")
+    cache.store(SCOPE, diff(("import os", "import sys"), ("print(x)", "log(x)")), "Log instead of printing")
+    message, score = cache.nearest(SCOPE, diff(*CHANGES[:-1]))
+    assert message == "Read timeouts from settings"
+    assert 0.8 < score < 1.0
+    assert cache.nearest("other", diff(*CHANGES)) is None
+
+
+def test_oldest_entries_are_evicted(tmp_path):
+    cache = SimilarityCache(str(tmp_path / "cache.sqlite"), max_entries=2)
+    for i in range(3):
+        cache.store(SCOPE, diff(CHANGES[i]), f"message {i}")
+    assert cache.exact(SCOPE, diff(CHANGES[0])) is None
+    assert cache.exact(SCOPE, diff(CHANGES[2])) == "message 2"
+
+
+def test_cache_in_the_config_directory_is_ignored_by_git(tmp_path):
+    path = tmp_path / ".commitcraft" / "cache.sqlite"
+    SimilarityCache(str(path)).store(SCOPE, diff(*CHANGES), "message")
+    assert os.path.exists(path)
+    assert "cache.sqlite" in (tmp_path / ".commitcraft" / ".gitignore").read_text().splitlines()
@@ -0,0 +1,100 @@
+import json
+import re
+
+from commitcraft.preprocess import preprocess_diff
+
+
+def poetry_lock(**packages: str) -> str:
+    return "".join(
+        f'[[package]]\nname = "{name}"\nversion = "{version}"\n\n' for name, version in packages.items()
+    )
+
+
+def notebook(*cells: tuple, count: int = 1) -> str:
+    return json.dumps(
+        {
+            "cells": [
+                {
+                    "cell_type": cell_type,
+                    "source": source,
+                    "execution_count": count if cell_type == "code" else None,
+                    "outputs": [{"output_type": "stream", "text": f"run {count}"}] if cell_type == "code" else [],
+                    "metadata": {},
+                }
+                for cell_type, source in cells
+            ],
+            "metadata": {},
+            "nbformat": 4,
+            "nbformat_minor": 5,
+        },
+        indent=1,
+    )
+
+
+def test_lockfile_summary(repo):
+    repo.commit(**{"poetry.lock": poetry_lock(httpx="0.27.0", idna="3.6", rich="13.7.0")})
+    diff = repo.stage(**{"poetry.lock": poetry_lock(httpx="0.28.1", idna="3.4", typer="0.12.0")})
+    result = preprocess_diff(diff, path=str(repo.path))
+    assert result.startswith("diff --git a/poetry.lock b/poetry.lock\n")
+    assert "Lockfile summary, 4 packages changed:" in result
+    assert "upgraded   httpx 0.27.0 → 0.28.1" in result
+    assert "downgraded idna 3.6 → 3.4" in result
+    assert "removed    rich 13.7.0" in result
+    assert "added      typer 0.12.0" in result
+    assert "@@" not in result
+
+
+def test_renamed_lockfile_is_compared_with_its_old_path(repo):
+    repo.commit(**{"old/poetry.lock": poetry_lock(httpx="0.27.0", idna="3.6")})
+    repo.git("mv", "old", "new")
+    diff = repo.stage(**{"new/poetry.lock": poetry_lock(httpx="0.28.1", idna="3.6")})
+    result = preprocess_diff(diff, path=str(repo.path))
+    assert "Lockfile summary, 1 package changed:" in result
+    assert "upgraded   httpx 0.27.0 → 0.28.1" in result
+
+
+def test_disabled_driver_keeps_the_diff(repo):
+    repo.commit(**{"poetry.lock": poetry_lock(httpx="0.27.0")})
+    diff = repo.stage(**{"poetry.lock": poetry_lock(httpx="0.28.1")})
+    assert preprocess_diff(diff, disabled=["lockfile"], path=str(repo.path)) == diff
+
+
+def test_notebook_sources_without_outputs(repo):
+    repo.commit(**{"analysis.ipynb": notebook(("markdown", "# Load"), ("code", "df = load()"))})
+    diff = repo.stage(
+        **{"analysis.ipynb": notebook(("markdown", "# Load"), ("code", "df = load(cache=True)"), count=2)}
+    )
+    result = preprocess_diff(diff, path=str(repo.path))
+    assert "Notebook cell sources, outputs and execution counts left out:" in result
+    assert "-df = load()" in result
+    assert "+df = load(cache=True)" in result
+    assert "execution_count" not in result
+    assert "run 2" not in result
+
+
+def test_notebook_outputs_only(repo):
+    cells = (("code", "df = load()"),)
+    repo.commit(**{"analysis.ipynb": notebook(*cells)})
+    diff = repo.stage(**{"analysis.ipynb": notebook(*cells, count=2)})
+    result = preprocess_diff(diff, path=str(repo.path))
+    assert "Notebook outputs or execution counts changed, cell sources are the same" in result
+
+
+def test_linguist_generated_files_are_reduced_to_a_stat_line(repo):
+    repo.commit(**{".gitattributes": "generated/** linguist-generated\n", "app.py": "x = 1\n"})
+    diff = repo.stage(
+        **{
+            "generated/client.py": "".join(f"def call_{i}(): pass\n" for i in range(50)),
+            "app.py": "x = 2\n",
+        }
+    )
+    result = preprocess_diff(diff, path=str(repo.path))
+    assert re.search(r"^ generated/client.py \| +50 \++ \(left out, linguist-generated\)$", result, re.MULTILINE)
+    assert "def call_0" not in result
+    assert "+x = 2" in result
+
+
+def test_attributes_can_be_ignored(repo):
+    repo.commit(**{".gitattributes": "generated/** linguist-generated\n"})
+    diff = repo.stage(**{"generated/client.py": "def call(): pass\n"})
+    assert preprocess_diff(diff, path=str(repo.path), attributes=False) == diff
@@ -0,0 +1,48 @@
+import pytest
+
+from commitcraft.CommitCraft import estimate_tokens
+from commitcraft.ranking import fit_diff
+
+
+def file_diff(path: str, hunks: int, lines: int) -> str:
+    parts = [f"diff --git a/{path} b/{path}\nindex 1111111..2222222 100644\n--- a/{path}\n+++ b/{path}\n"]
+    for hunk in range(hunks):
+        start = hunk * 100 + 1
+        parts.append(f"@@ -{start},{lines} +{start},{lines} @@ def section_{hunk}():\n")
+        parts.extend(f"-    value_{hunk}_{line} = compute({line})\n" for line in range(lines // 2))
+        parts.extend(f"+    value_{hunk}_{line} = compute({line}, cache=True)\n" for line in range(lines // 2))
+    return "".join(parts)
+
+
+DIFF = (
+    file_diff("src/app/core.py", 6, 40)
+    + file_diff("tests/test_core.py", 4, 30)
+    + file_diff("docs/usage.md", 3, 20)
+    + file_diff("poetry.lock", 5, 80)
+    + "".join(file_diff(f"src/app/module_{i}.py", 1, 10) for i in range(40))
+)
+
+
+def test_small_diff_is_unchanged():
+    diff = file_diff("a.py", 1, 4)
+    assert fit_diff(diff, 1000) == diff
+
+
+@pytest.mark.parametrize("budget", [256, 512, 1000, 2000, 4000])
+def test_fitted_diff_stays_within_budget(budget):
+    fitted = fit_diff(DIFF, budget)
+    assert estimate_tokens(fitted) <= budget
+    assert "left out of the diff above" in fitted
+
+
+def test_oversized_hunk_is_truncated_within_budget():
+    diff = file_diff("src/huge.py", 1, 2000)
+    fitted = fit_diff(diff, 1000)
+    assert estimate_tokens(fitted) <= 1000
+    assert fitted.startswith("diff --git a/src/huge.py b/src/huge.py")
+
+
+def test_source_hunks_are_kept_before_lockfile_hunks():
+    fitted = fit_diff(DIFF, 2000)
+    assert "+++ b/src/app/core.py" in fitted
+    assert "+++ b/poetry.lock" not in fitted
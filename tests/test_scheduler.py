@@ -0,0 +1,165 @@
+import asyncio
+import email.utils
+import time
+from types import SimpleNamespace
+
+import pytest
+
+from commitcraft.CommitCraft import RateLimitConfig
+from commitcraft.scheduler import (
+    Deadline,
+    DeadlineExceeded,
+    RequestScheduler,
+    TokenBucket,
+    retry_after,
+)
+
+KEY = ("stub", "", "")
+
+
+class HTTPError(Exception):
+    """Shaped like the SDK errors: a status code and a response carrying the headers"""
+
+    def __init__(self, status_code: int, headers: dict = {}):
+        super().__init__(f"HTTP {status_code}")
+        self.status_code = status_code
+        self.response = SimpleNamespace(headers=headers)
+
+
+def failing(*errors, result="ok"):
+    """A call raising `errors` in turn, then returning `result`"""
+    calls = []
+
+    def func():
+        calls.append(time.monotonic())
+        if len(calls) <= len(errors):
+            raise errors[len(calls) - 1]
+        return result
+
+    return func, calls
+
+
+def test_token_bucket_waits_once_capacity_is_spent():
+    bucket = TokenBucket(60)  # One token per second
+    assert bucket.reserve(60) == 0.0
+    assert bucket.reserve(1) == pytest.approx(1.0, abs=0.05)
+    assert bucket.reserve(1) == pytest.approx(2.0, abs=0.05)
+
+
+def test_token_bucket_caps_reservations_to_capacity():
+    bucket = TokenBucket(10)
+    assert bucket.reserve(1000) == 0.0
+    assert bucket.reserve(10) == pytest.approx(60.0, abs=0.1)
+
+
+def test_deadline_without_limit_never_expires():
+    deadline = Deadline()
+    assert deadline.remaining() is None
+    assert not deadline.expired
+    deadline.check()
+
+
+def test_deadline_expires():
+    deadline = Deadline(0.01)
+    time.sleep(0.02)
+    assert deadline.remaining() == 0.0
+    with pytest.raises(DeadlineExceeded):
+        deadline.check()
+
+
+def test_deadline_cancel_runs_callbacks_once():
+    deadline = Deadline(60)
+    closed = []
+    deadline.on_cancel(lambda: closed.append("early"))
+    deadline.cancel()
+    deadline.cancel()
+    deadline.on_cancel(lambda: closed.append("late"))
+    assert closed == ["early", "late"]
+    assert deadline.expired
+    assert deadline.wait(10)
+
+
+@pytest.mark.parametrize(
+    "headers, expected",
+    [
+        ({"retry-after": "3"}, 3.0),
+        ({"retry-after-ms": "1500", "retry-after": "9"}, 1.5),
+        ({"retry-after": "-2"}, 0.0),
+        ({"retry-after": "soon"}, None),
+        ({}, None),
+    ],
+)
+def test_retry_after_seconds(headers, expected):
+    assert retry_after(HTTPError(429, headers)) == expected
+
+
+def test_retry_after_http_date():
+    date = email.utils.formatdate(time.time() + 30, usegmt=True)
+    assert retry_after(HTTPError(503, {"retry-after": date})) == pytest.approx(30, abs=2)
+
+
+def test_retry_after_without_response():
+    assert retry_after(ValueError("no response")) is None
+
+
+def test_call_retries_after_the_requested_delay():
+    func, calls = failing(HTTPError(429, {"retry-after": "3"}), HTTPError(503, {"retry-after": "1"}))
+    sleeps = []
+    result = RequestScheduler().call(KEY, RateLimitConfig(), func, sleep=sleeps.append)
+    assert result == "ok"
+    assert len(calls) == 3
+    assert sleeps == [3.0, 1.0]
+
+
+def test_call_raises_errors_that_are_not_transient():
+    func, calls = failing(HTTPError(400))
+    with pytest.raises(HTTPError):
+        RequestScheduler().call(KEY, RateLimitConfig(), func, sleep=lambda seconds: None)
+    assert len(calls) == 1
+
+
+def test_call_gives_up_after_max_retries():
+    func, calls = failing(*[ConnectionError("reset")] * 5)
+    with pytest.raises(ConnectionError):
+        RequestScheduler().call(KEY, RateLimitConfig(max_retries=2), func, sleep=lambda seconds: None)
+    assert len(calls) == 3
+
+
+def test_call_stops_when_the_retry_outlives_the_deadline():
+    func, calls = failing(HTTPError(429, {"retry-after": "30"}))
+    with pytest.raises(DeadlineExceeded):
+        RequestScheduler().call(KEY, RateLimitConfig(), func, deadline=Deadline(1))
+    assert len(calls) == 1
+
+
+def test_call_waits_for_the_request_rate():
+    sleeps = []
+    scheduler = RequestScheduler()
+    config = RateLimitConfig(requests_per_minute=60)
+    for _ in range(61):
+        scheduler.call(KEY, config, lambda: "ok", sleep=sleeps.append)
+    assert sleeps == [pytest.approx(1.0, abs=0.05)]
+
+
+def test_acall_retries_provider_timeouts():
+    attempts = []
+
+    async def func():
+        attempts.append(1)
+        if len(attempts) == 1:
+            raise TimeoutError("read timed out")
+        return "ok"
+
+    # With a deadline, the call goes through `wait_for` and the backoff through the deadline
+    config = RateLimitConfig(backoff_base=0.01)
+    result = asyncio.run(RequestScheduler().acall(KEY, config, func, deadline=Deadline(5)))
+    assert result == "ok"
+    assert len(attempts) == 2
+
+
+def test_acall_raises_deadline_exceeded_on_a_slow_call():
+    async def func():
+        await asyncio.sleep(5)
+
+    with pytest.raises(DeadlineExceeded):
+        asyncio.run(RequestScheduler().acall(KEY, RateLimitConfig(), func, deadline=Deadline(0.05)))
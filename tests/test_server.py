@@ -0,0 +1,141 @@
+import json
+import threading
+import time
+import urllib.error
+import urllib.request
+
+import pytest
+
+from commitcraft.CommitCraft import EmojiConfig, LModel
+from commitcraft.providers import BaseProvider, get_provider, register_provider
+from commitcraft.server import CommitCraftService, GenerateRequest, ServerConfig, make_server
+
+DIFF = "diff --git a/app.py b/app.py\n--- a/app.py\n+++ b/app.py\n@@ -1 +1 @@\n-x = 1\n+x = 2\n"
+ANSWER = "<think>The value changes.</think>\nSet x to 2\n\n- Matches the new default"
+
+
+class StubProvider(BaseProvider):
+    """Answers every request with ANSWER once `release` is set, counting the generations"""
+
+    default_model = "stub-model"
+
+    def __init__(self):
+        super().__init__()
+        self.generations = 0
+        self.release = threading.Event()
+        self.release.set()
+
+    def create_client(self, model, timeout_args: dict):
+        return None
+
+    def generate(self, request) -> str:
+        self.generations += 1
+        self.release.wait(5)
+        return request.send(lambda: ANSWER)
+
+
+class FailingProvider(StubProvider):
+    def generate(self, request) -> str:
+        raise RuntimeError("backend down")
+
+
+@pytest.fixture
+def provider() -> StubProvider:
+    register_provider("stub", StubProvider)
+    register_provider("stub_failing", FailingProvider)
+    return get_provider("stub")
+
+
+@pytest.fixture
+def service(provider) -> CommitCraftService:
+    def resolve_model(provider_name, model, diff) -> LModel:
+        return LModel(provider=provider_name or "stub", model=model)
+
+    return CommitCraftService(resolve_model, {}, EmojiConfig(), ServerConfig(port=0))
+
+
+@pytest.fixture
+def url(service):
+    server = make_server(service, "127.0.0.1", 0)
+    thread = threading.Thread(target=server.serve_forever, kwargs={"poll_interval": 0.05}, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{server.server_address[1]}"
+    server.shutdown()
+    server.server_close()
+
+
+def post(url: str, body: bytes) -> tuple[int, dict]:
+    request = urllib.request.Request(
+        f"{url}/generate", data=body, headers={"Content-Type": "application/json"}
+    )
+    try:
+        with urllib.request.urlopen(request, timeout=10) as response:
+            return response.status, json.loads(response.read())
+    except urllib.error.HTTPError as e:
+        return e.code, json.loads(e.read())
+
+
+def test_identical_requests_are_coalesced(service, provider):
+    provider.release.clear()
+    results = []
+
+    def generate():
+        results.append(service.generate(GenerateRequest(diff=DIFF)))
+
+    threads = [threading.Thread(target=generate) for _ in range(2)]
+    for thread in threads:
+        thread.start()
+    started = time.monotonic()
+    while service.metrics.counters["coalesced_total"] < 1 and time.monotonic() - started < 5:
+        time.sleep(0.01)
+    provider.release.set()
+    for thread in threads:
+        thread.join(5)
+
+    assert sorted(origin for _, origin in results) == ["coalesced", "generated"]
+    assert results[0][0] == results[1][0]
+    assert provider.generations == 1
+    assert service.generate(GenerateRequest(diff=DIFF)) == (results[0][0], "cache")
+    assert provider.generations == 1
+
+
+def test_different_requests_are_generated_apart(service, provider):
+    assert service.generate(GenerateRequest(diff=DIFF))[1] == "generated"
+    assert service.generate(GenerateRequest(diff=DIFF, bug="off by one"))[1] == "generated"
+    assert provider.generations == 2
+
+
+def test_generate_endpoint(url):
+    status, body = post(url, json.dumps({"diff": DIFF}).encode())
+    assert status == 200
+    assert body["origin"] == "generated"
+    assert body["thinking"] == "The value changes."
+    assert body["message"].startswith("Set x to 2")
+
+
+@pytest.mark.parametrize(
+    "body",
+    [b"{not json", b"{}", json.dumps({"diff": DIFF, "bug": 3}).encode(), json.dumps({"diff": DIFF, "provider": "missing"}).encode()],
+)
+def test_bad_request_body(url, service, provider, body):
+    status, response = post(url, body)
+    assert status == 400
+    assert response["error"]
+    assert provider.generations == 0
+    assert service.metrics.counters["errors_total"] == 1
+
+
+def test_provider_failure(url):
+    status, response = post(url, json.dumps({"diff": DIFF, "provider": "stub_failing"}).encode())
+    assert status == 502
+    assert response["error"] == "RuntimeError: backend down"
+
+
+def test_metrics(url):
+    post(url, json.dumps({"diff": DIFF}).encode())
+    post(url, json.dumps({"diff": DIFF}).encode())
+    with urllib.request.urlopen(f"{url}/metrics", timeout=10) as response:
+        metrics = response.read().decode()
+    assert "commitcraft_requests_total 2" in metrics
+    assert "commitcraft_cache_hits_total 1" in metrics
+    assert "commitcraft_cache_entries 1" in metrics
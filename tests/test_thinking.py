@@ -0,0 +1,35 @@
+import pytest
+
+from commitcraft.thinking import ThinkParser, split_thinking
+
+RESPONSE = "<think>The diff adds a flag.</think>\n✨ Add --dry-run flag\n\n- Print instead of committing"
+
+
+@pytest.mark.parametrize("size", [1, 2, 3, 7, len(RESPONSE)])
+def test_tags_split_across_chunks(size):
+    parser = ThinkParser()
+    chunks = [RESPONSE[i : i + size] for i in range(0, len(RESPONSE), size)]
+    streamed = "".join(parser.feed(chunk) for chunk in chunks) + parser.close()
+    assert "<" not in streamed
+    assert parser.thinking == "The diff adds a flag."
+    assert parser.content == "✨ Add --dry-run flag\n\n- Print instead of committing"
+    assert streamed.strip() == parser.content
+
+
+def test_partial_tag_is_released_when_it_is_not_a_tag():
+    parser = ThinkParser()
+    assert parser.feed("a <thi") == "a "
+    assert parser.feed("s> b") == "<this> b"
+    assert parser.thinking == ""
+
+
+def test_unterminated_thinking_stays_out_of_the_answer():
+    assert split_thinking("<think>still going") == ("still going", "")
+
+
+def test_split_thinking_from_chunks():
+    assert split_thinking(["<thi", "nk>hmm</th", "ink>Fix typo"]) == ("hmm", "Fix typo")
+
+
+def test_answer_without_thinking():
+    assert split_thinking("Fix typo\n") == ("", "Fix typo")